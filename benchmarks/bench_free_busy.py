@@ -0,0 +1,85 @@
+# bench_free_busy.py
+#
+# Compares the sweep-line free/busy engine with the previous nested-loop implementation on
+# synthetic calendars with thousands of busy blocks over a 90-day window. No API access needed:
+#   python benchmarks/bench_free_busy.py --events 1000 5000 20000
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from calendar_package.intervals import free_windows, merge_intervals, parse_busy
+
+
+def synthetic_busy(events, window_start, window_end, seed):
+    """Random, possibly overlapping busy blocks as returned by freebusy().query, sorted by start."""
+    rng = random.Random(seed)
+    span = (window_end - window_start).total_seconds()
+    blocks = []
+    for _ in range(events):
+        start = window_start + timedelta(seconds=rng.uniform(0, span))
+        end = start + timedelta(minutes=rng.choice([15, 30, 60, 90, 120, 240]))
+        blocks.append((start, end))
+    blocks.sort()
+    return [{"start": start.isoformat(), "end": end.isoformat()} for start, end in blocks]
+
+
+def legacy_free_times(busy_times, start_time, end_time):
+    """The nested loop FreeBusyTool used before the interval engine (ignores busy end times)."""
+    free_times = []
+    current_time = datetime.fromisoformat(start_time)
+    end_time_dt = datetime.fromisoformat(end_time)
+    while current_time < end_time_dt:
+        free_slot_start = current_time
+        next_busy_time = None
+        for busy_time in busy_times:
+            busy_start = datetime.fromisoformat(busy_time['start'])
+            if busy_start > current_time:
+                next_busy_time = busy_start
+                break
+        free_slot_end = next_busy_time if next_busy_time else end_time_dt
+        if free_slot_end > free_slot_start:
+            free_times.append((free_slot_start, free_slot_end))
+        current_time = free_slot_end
+    return free_times
+
+
+def engine_free_times(calendars, start_time, end_time):
+    busy = merge_intervals(*(parse_busy(busy_times) for busy_times in calendars))
+    return free_windows(busy, datetime.fromisoformat(start_time), datetime.fromisoformat(end_time), min_duration=timedelta(minutes=30))
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark free/busy computation")
+    parser.add_argument("--events", type=int, nargs="+", default=[1000, 5000, 20000], help="Busy blocks per calendar")
+    parser.add_argument("--calendars", type=int, default=3, help="Calendars merged by the engine")
+    parser.add_argument("--skip-legacy-above", type=int, default=5000, help="Skip the quadratic legacy loop above this many events")
+    args = parser.parse_args()
+
+    window_start = datetime(2024, 7, 1, tzinfo=timezone.utc)
+    window_end = window_start + timedelta(days=90)
+    start_time, end_time = window_start.isoformat(), window_end.isoformat()
+
+    for events in args.events:
+        calendars = [synthetic_busy(events, window_start, window_end, seed) for seed in range(args.calendars)]
+        free, elapsed = timed(engine_free_times, calendars, start_time, end_time)
+        line = f"{events:>6} events x {args.calendars} calendars  engine: {elapsed * 1000:8.1f} ms ({len(free)} windows)"
+        if events <= args.skip_legacy_above:
+            legacy, legacy_elapsed = timed(legacy_free_times, calendars[0], start_time, end_time)
+            line += f"  legacy, 1 calendar: {legacy_elapsed * 1000:8.1f} ms ({len(legacy)} windows)"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# bench_itinerary.py
+#
+# Benchmarks generate_itinerary_from_model_with_tools against recorded API traffic.
+#
+# Record fixtures once with network access and real credentials:
+#   HTTP_REPLAY_MODE=record python benchmarks/bench_itinerary.py --runs 1
+#
+# Replay them offline (any non-empty OPENAI_API_KEY / AMADEUS_* / TICKETMASTER_API_KEY values work):
+#   HTTP_REPLAY_MODE=replay HTTP_REPLAY_LATENCY_MS=recorded python benchmarks/bench_itinerary.py --runs 5
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+DEFAULT_PROMPT = "Create an itinerary for a trip to Paris, France, from 2024-07-01 to 2024-07-05, including activities such as concerts and museum visits, with 2 adults."
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the itinerary pipeline")
+    parser.add_argument("--runs", type=int, default=3, help="Number of itinerary runs")
+    parser.add_argument("--prompt", default=DEFAULT_PROMPT, help="Itinerary prompt to send")
+    parser.add_argument("--log", help="Append each run's turns, tool calls and totals to this JSON lines file")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    from generic_agent import RunMeter
+    from generic_agent.run_meter import RUN_METER_LOG
+    from http_client import replay_mode
+    from itinerary_package.generator import generate_itinerary_from_model_with_tools
+
+    print(f"HTTP replay mode: {replay_mode() or 'live'}")
+    timings = []
+    tokens = []
+    for run in range(args.runs):
+        meter = RunMeter()
+        started = time.perf_counter()
+        generate_itinerary_from_model_with_tools(args.prompt, meter=meter)
+        timings.append(time.perf_counter() - started)
+        tokens.append(meter.prompt_tokens + meter.completion_tokens)
+        print(f"Run {run + 1}: {timings[-1]:.2f}s  {meter.describe()}")
+        # With RUN_METER_LOG pointing at the same file the run has already been logged
+        if args.log and not (RUN_METER_LOG and os.path.abspath(args.log) == os.path.abspath(RUN_METER_LOG)):
+            meter.dump_jsonl(args.log)
+
+    print(f"Mean: {statistics.mean(timings):.2f}s  Min: {min(timings):.2f}s  Max: {max(timings):.2f}s  Mean tokens: {statistics.mean(tokens):.0f}")
+
+
+if __name__ == "__main__":
+    main()
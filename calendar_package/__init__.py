@@ -1,3 +1,7 @@
 from .add_calendar_events import AddCalendarEventTool
 from .update_or_cancel_calendar_events import UpdateOrCancelEventTool
-from .list_calendar_events import ListEventsTool
\ No newline at end of file
+from .list_calendar_events import ListEventsTool
+from .free_busy import FreeBusyTool
+from .calendar_service import CalendarService, get_calendar_service
+from .calendar_mirror import CalendarMirror, calendar_mirror
+from .itinerary_export import export_itinerary, itinerary_events
\ No newline at end of file
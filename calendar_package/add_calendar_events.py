@@ -1,39 +1,17 @@
+import asyncio
 from datetime import datetime
 from langchain.pydantic_v1 import BaseModel, Field
 from langchain.tools import BaseTool
 from typing import Optional, Type
-import os
-import pickle
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
 
 from langchain.callbacks.manager import (
     AsyncCallbackManagerForToolRun,
     CallbackManagerForToolRun,
 )
 
-SCOPES = ['https://www.googleapis.com/auth/calendar']
-CREDENTIALS_FILE = 'client_secret.json'
-CALENDAR_ID = 'primary'
-
-def get_calendar_service():
-    creds = None
-    if os.path.exists('token.pickle'):
-        with open('token.pickle', 'rb') as token:
-            creds = pickle.load(token)
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file(CREDENTIALS_FILE, SCOPES)
-            creds = flow.run_local_server(port=0)
-        with open('token.pickle', 'wb') as token:
-            pickle.dump(creds, token)
-    service = build('calendar', 'v3', credentials=creds)
-    return service
+from .calendar_service import execute, get_calendar_service
 
-service = get_calendar_service()
+CALENDAR_ID = 'primary'
 
 class AddEventInput(BaseModel):
     event_summary: str = Field(description="Summary of the event")
@@ -59,7 +37,8 @@ class AddCalendarEventTool(BaseTool):
             self, event_summary: str, event_location: str, event_description: str, start_time: str, end_time: str, start_time_zone: str, end_time_zone: str, run_manager: Optional[AsyncCallbackManagerForToolRun] = None
     ) -> str:
         """Use the tool asynchronously."""
-        raise NotImplementedError("add_calendar_event does not support async")
+        # The Google API client is synchronous, so run it on a worker thread to keep the event loop free
+        return await asyncio.to_thread(self.add_calendar_event, event_summary, event_location, event_description, start_time, end_time, start_time_zone, end_time_zone)
 
     def add_calendar_event(self, event_summary: str, event_location: str, event_description: str, start_time: str, end_time: str, start_time_zone: str, end_time_zone: str) -> str:
         event = {
@@ -77,7 +56,7 @@ class AddCalendarEventTool(BaseTool):
         }
         try:
             print(f"Created event '{event_summary}' at '{event_location}' starting from {start_time} to {end_time} in time zone {start_time_zone}.")
-            event_result = service.events().insert(calendarId=CALENDAR_ID, body=event).execute()
+            event_result = execute(get_calendar_service().events().insert(calendarId=CALENDAR_ID, body=event))
             return f"Event created: {event_result.get('htmlLink')}"
         except Exception as e:
             return f"An error occurred: {e}"
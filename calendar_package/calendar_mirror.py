@@ -0,0 +1,282 @@
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+import pytz
+from googleapiclient.errors import HttpError
+from termcolor import colored
+
+from http_client import replay_mode
+from .calendar_service import execute, get_calendar_service
+from .intervals import Interval, parse_timestamp
+
+# SQLite file holding the mirrored calendars; set CALENDAR_MIRROR_PATH=off to always query the API
+MIRROR_PATH = os.environ.get("CALENDAR_MIRROR_PATH", "calendar_mirror.sqlite")
+# Calendars synced less than this many seconds ago are served without a delta request
+MIRROR_MAX_AGE_SECONDS = float(os.environ.get("CALENDAR_MIRROR_MAX_AGE", 60))
+# A full sync downloads events from this many days back onwards, not the calendar's whole history
+MIRROR_HISTORY_DAYS = float(os.environ.get("CALENDAR_MIRROR_HISTORY_DAYS", 365))
+SYNC_PAGE_SIZE = 250
+# Everything the mirror stores per event, plus the page tokens
+SYNC_FIELDS = "nextPageToken,nextSyncToken,timeZone,items(id,status,summary,start,end,transparency,attendees(self,responseStatus))"
+# Fixed width UTC timestamps compare correctly as strings
+UTC_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    calendar_id TEXT NOT NULL,
+    event_id TEXT NOT NULL,
+    summary TEXT,
+    start_utc TEXT NOT NULL,
+    end_utc TEXT NOT NULL,
+    start_raw TEXT NOT NULL,
+    end_raw TEXT NOT NULL,
+    start_tz TEXT,
+    end_tz TEXT,
+    busy INTEGER NOT NULL,
+    PRIMARY KEY (calendar_id, event_id)
+);
+CREATE INDEX IF NOT EXISTS events_by_start ON events (calendar_id, start_utc);
+CREATE INDEX IF NOT EXISTS events_by_end ON events (calendar_id, end_utc);
+CREATE TABLE IF NOT EXISTS sync_state (
+    calendar_id TEXT PRIMARY KEY,
+    sync_token TEXT,
+    time_zone TEXT,
+    synced_at REAL NOT NULL,
+    history_from TEXT
+);
+"""
+
+
+class SyncTokenExpired(Exception):
+    """Raised when Google rejects a sync token (HTTP 410) and a full sync is required."""
+
+
+def _to_utc(value: datetime) -> str:
+    return value.astimezone(dt_timezone.utc).strftime(UTC_FORMAT)
+
+
+def _event_time(moment: Dict[str, str], calendar_tz: str) -> datetime:
+    if 'dateTime' in moment:
+        return parse_timestamp(moment['dateTime'])
+    # All-day events carry a date only; they span whole days in the calendar's timezone
+    return pytz.timezone(moment.get('timeZone') or calendar_tz).localize(datetime.fromisoformat(moment['date']))
+
+
+def _is_busy(event: Dict[str, Any]) -> bool:
+    """Mirror the freebusy endpoint: transparent and declined events do not block time."""
+    if event.get('transparency') == 'transparent':
+        return False
+    attendee = next((attendee for attendee in event.get('attendees', []) if attendee.get('self')), None)
+    return not (attendee and attendee.get('responseStatus') == 'declined')
+
+
+class CalendarMirror:
+    """
+    Local SQLite copy of Google calendars, kept current with incremental sync.
+
+    The first sync() of a calendar downloads all of its events once and stores the
+    nextSyncToken. Later calls send only that token, so Google returns just the events that
+    changed since, and the calendar is then answered from the start/end indexes. When the
+    token expires (HTTP 410) the calendar is cleared and fully synced again. Only events from
+    history_days back onwards are mirrored; earlier ranges are left to the API.
+
+    Example:
+        >>> from calendar_package.calendar_mirror import calendar_mirror
+        >>> calendar_mirror.sync('primary')
+        >>> calendar_mirror.busy_intervals('primary', '2024-05-01T00:00:00Z', '2024-05-08T00:00:00Z')
+    """
+
+    def __init__(self, path: str = MIRROR_PATH, max_age_seconds: float = MIRROR_MAX_AGE_SECONDS, history_days: float = MIRROR_HISTORY_DAYS):
+        self.path = path
+        self.max_age_seconds = max_age_seconds
+        self.history_days = history_days
+        self._connection = None
+        self._lock = threading.RLock()
+        self._calendar_locks: Dict[str, threading.Lock] = {}
+        # Calendars whose events this account cannot list, e.g. shared with free/busy access only
+        self._unavailable = set()
+
+    @property
+    def enabled(self) -> bool:
+        # Recorded fixtures hold time-bounded listings, so record/replay runs keep querying the API
+        return self.path.lower() not in ("", "off", "none") and replay_mode() is None
+
+    def _db(self) -> sqlite3.Connection:
+        with self._lock:
+            if self._connection is None:
+                self._connection = sqlite3.connect(self.path, check_same_thread=False)
+                self._connection.row_factory = sqlite3.Row
+                self._connection.executescript(SCHEMA)
+                try:
+                    # Mirrors created before history_from existed hold each calendar's full history (NULL)
+                    self._connection.execute("ALTER TABLE sync_state ADD COLUMN history_from TEXT")
+                except sqlite3.OperationalError:
+                    pass
+            return self._connection
+
+    def _calendar_lock(self, calendar_id: str) -> threading.Lock:
+        with self._lock:
+            return self._calendar_locks.setdefault(calendar_id, threading.Lock())
+
+    def sync(self, calendar_id: str = 'primary', force: bool = False) -> int:
+        """
+        Bring one calendar up to date. Returns the number of events changed, or 0 when the
+        calendar was synced within max_age_seconds. API errors (e.g. no read access) propagate.
+        """
+        with self._calendar_lock(calendar_id):
+            state = self._state(calendar_id)
+            if state and not force and time.time() - state['synced_at'] < self.max_age_seconds:
+                return 0
+            if state and state['sync_token']:
+                try:
+                    return self._sync(calendar_id, state['sync_token'], state['time_zone'], state['history_from'])
+                except SyncTokenExpired:
+                    print(colored(f"Sync token for calendar '{calendar_id}' expired, downloading it again.", "white", "on_grey"))
+            with self._lock:
+                db = self._db()
+                with db:
+                    db.execute("DELETE FROM events WHERE calendar_id = ?", (calendar_id,))
+                    db.execute("DELETE FROM sync_state WHERE calendar_id = ?", (calendar_id,))
+            history_from = _to_utc(datetime.now(dt_timezone.utc) - timedelta(days=self.history_days))
+            return self._sync(calendar_id, None, None, history_from)
+
+    def try_sync(self, calendar_id: str, start_time: Optional[str] = None) -> bool:
+        """
+        Sync a calendar if the mirror can hold it and, when start_time is given, it reaches back
+        that far. Returns False when callers should query the API instead.
+        """
+        if not self.enabled or calendar_id in self._unavailable:
+            return False
+        try:
+            self.sync(calendar_id)
+            return start_time is None or self.covers(calendar_id, start_time)
+        except HttpError as e:
+            if e.resp.status in (403, 404):
+                self._unavailable.add(calendar_id)
+            print(colored(f"Calendar '{calendar_id}' could not be mirrored: {e}", "white", "on_grey"))
+        except Exception as e:
+            print(colored(f"Calendar '{calendar_id}' could not be mirrored: {e}", "white", "on_grey"))
+        return False
+
+    def covers(self, calendar_id: str, start_time: str) -> bool:
+        """Whether the mirrored events of a calendar reach back to start_time."""
+        state = self._state(calendar_id)
+        return state is not None and (state['history_from'] is None or _to_utc(parse_timestamp(start_time)) >= state['history_from'])
+
+    def _state(self, calendar_id: str) -> Optional[sqlite3.Row]:
+        with self._lock:
+            return self._db().execute("SELECT * FROM sync_state WHERE calendar_id = ?", (calendar_id,)).fetchone()
+
+    def _pages(self, calendar_id: str, sync_token: Optional[str], time_min: Optional[str]) -> Iterator[Dict[str, Any]]:
+        page_token = None
+        # Google rejects timeMin alongside a sync token; the token already carries the full sync's bounds
+        time_min = None if sync_token else time_min
+        while True:
+            request = get_calendar_service().events().list(calendarId=calendar_id, singleEvents=True, maxResults=SYNC_PAGE_SIZE, syncToken=sync_token, timeMin=time_min, pageToken=page_token, fields=SYNC_FIELDS)
+            try:
+                page = execute(request)
+            except HttpError as e:
+                if e.resp.status == 410:
+                    raise SyncTokenExpired(calendar_id) from e
+                raise
+            yield page
+            page_token = page.get('nextPageToken')
+            if not page_token:
+                return
+
+    def _sync(self, calendar_id: str, sync_token: Optional[str], calendar_tz: Optional[str], history_from: Optional[str]) -> int:
+        changed = 0
+        next_sync_token = None
+        # Each page is written as it arrives, so a full sync never holds more than one page in memory
+        for page in self._pages(calendar_id, sync_token, history_from):
+            calendar_tz = page.get('timeZone') or calendar_tz or 'UTC'
+            next_sync_token = page.get('nextSyncToken', next_sync_token)
+            with self._lock:
+                db = self._db()
+                with db:
+                    for event in page.get('items', []):
+                        self._apply(db, calendar_id, event, calendar_tz)
+                        changed += 1
+
+        with self._lock:
+            db = self._db()
+            with db:
+                db.execute("INSERT OR REPLACE INTO sync_state (calendar_id, sync_token, time_zone, synced_at, history_from) VALUES (?, ?, ?, ?, ?)",
+                           (calendar_id, next_sync_token, calendar_tz, time.time(), history_from))
+        print(colored(f"Synced calendar '{calendar_id}' ({'incremental' if sync_token else 'full'}): {changed} events changed.", "white", "on_grey"))
+        return changed
+
+    def _apply(self, db: sqlite3.Connection, calendar_id: str, event: Dict[str, Any], calendar_tz: str) -> None:
+        if event.get('status') == 'cancelled' or 'start' not in event or 'end' not in event:
+            db.execute("DELETE FROM events WHERE calendar_id = ? AND event_id = ?", (calendar_id, event['id']))
+            return
+        start, end = event['start'], event['end']
+        db.execute(
+            "INSERT OR REPLACE INTO events (calendar_id, event_id, summary, start_utc, end_utc, start_raw, end_raw, start_tz, end_tz, busy) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (calendar_id, event['id'], event.get('summary'),
+             _to_utc(_event_time(start, calendar_tz)), _to_utc(_event_time(end, calendar_tz)),
+             start.get('dateTime', start.get('date')), end.get('dateTime', end.get('date')),
+             start.get('timeZone'), end.get('timeZone'), int(_is_busy(event))))
+
+    def events(self, calendar_id: str, start_time: str, end_time: str, max_results: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Events overlapping [start_time, end_time) in start time order, shaped like API event resources."""
+        query = ("SELECT * FROM events WHERE calendar_id = ? AND start_utc < ? AND end_utc > ? "
+                 "ORDER BY start_utc, end_utc")
+        params = [calendar_id, _to_utc(parse_timestamp(end_time)), _to_utc(parse_timestamp(start_time))]
+        if max_results is not None:
+            query += " LIMIT ?"
+            params.append(max_results)
+        with self._lock:
+            rows = self._db().execute(query, params).fetchall()
+        events = []
+        for row in rows:
+            time_key = 'dateTime' if 'T' in row['start_raw'] else 'date'
+            start = {time_key: row['start_raw'], **({'timeZone': row['start_tz']} if row['start_tz'] else {})}
+            end = {time_key: row['end_raw'], **({'timeZone': row['end_tz']} if row['end_tz'] else {})}
+            event = {'id': row['event_id'], 'start': start, 'end': end}
+            # The API leaves summary out of untitled events rather than sending null
+            if row['summary'] is not None:
+                event['summary'] = row['summary']
+            events.append(event)
+        return events
+
+    def busy_intervals(self, calendar_id: str, start_time: str, end_time: str) -> List[Interval]:
+        """Busy (start, end) intervals overlapping [start_time, end_time), the same blocks freebusy would return."""
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT start_utc, end_utc FROM events WHERE calendar_id = ? AND busy = 1 AND start_utc < ? AND end_utc > ? ORDER BY start_utc",
+                (calendar_id, _to_utc(parse_timestamp(end_time)), _to_utc(parse_timestamp(start_time)))).fetchall()
+        return [(parse_timestamp(row['start_utc']), parse_timestamp(row['end_utc'])) for row in rows if row['end_utc'] > row['start_utc']]
+
+    def expire(self, calendar_id: str) -> None:
+        """Make the next read of a calendar send a delta request, e.g. after adding events to it."""
+        if not self.enabled:
+            return
+        with self._lock:
+            db = self._db()
+            with db:
+                db.execute("UPDATE sync_state SET synced_at = 0 WHERE calendar_id = ?", (calendar_id,))
+
+    def clear(self) -> None:
+        with self._lock:
+            db = self._db()
+            with db:
+                db.execute("DELETE FROM events")
+                db.execute("DELETE FROM sync_state")
+            self._unavailable.clear()
+
+
+calendar_mirror = CalendarMirror()
+
+
+# Example usage
+if __name__ == "__main__":
+    calendar_mirror.sync('primary')
+    now = datetime.now(dt_timezone.utc)
+    for event in calendar_mirror.events('primary', now.isoformat(), (now + timedelta(days=7)).isoformat()):
+        print(event['start'], event.get('summary'))
@@ -0,0 +1,119 @@
+from datetime import datetime
+import os
+import pickle
+import threading
+import httplib2
+from google_auth_oauthlib.flow import InstalledAppFlow
+from google.auth.transport.requests import Request
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.discovery import build
+from termcolor import colored
+
+from http_client import ReplayGoogleHttp, replay_mode
+
+SCOPES = ['https://www.googleapis.com/auth/calendar']
+CREDENTIALS_FILE = 'client_secret.json'
+TOKEN_FILE = 'token.pickle'
+
+# Refresh the access token this many seconds before it expires
+REFRESH_AHEAD_SECONDS = 300
+# Shortest wait between background refresh attempts, also used after a failed refresh
+MIN_REFRESH_INTERVAL_SECONDS = 30
+
+
+class CalendarService:
+    """
+    Lazily created Google Calendar client shared by all calendar tools.
+
+    Nothing touches token.pickle, OAuth or the discovery document until a tool first calls
+    get(). Credentials are then refreshed on a background timer ahead of their expiry, and
+    execute() runs each request on an HTTP connection owned by the calling thread, because
+    httplib2 connections must not be shared between threads.
+    """
+
+    def __init__(self, credentials_file: str = CREDENTIALS_FILE, token_file: str = TOKEN_FILE, scopes=SCOPES):
+        self.credentials_file = credentials_file
+        self.token_file = token_file
+        self.scopes = scopes
+        self._service = None
+        self._credentials = None
+        self._refresh_timer = None
+        self._local = threading.local()
+        self._lock = threading.RLock()
+
+    def get(self):
+        """Return the shared calendar service, authorizing on first use."""
+        if self._service is None:
+            with self._lock:
+                if self._service is None:
+                    if replay_mode() == "replay":
+                        # Offline replay: no OAuth, every request is answered from recorded fixtures
+                        self._service = build('calendar', 'v3', http=ReplayGoogleHttp(mode="replay"))
+                    else:
+                        self._credentials = self._load_credentials()
+                        self._service = build('calendar', 'v3', credentials=self._credentials)
+                        self._schedule_refresh()
+        return self._service
+
+    def execute(self, request):
+        """Execute a request built from get() on the calling thread's own connection."""
+        mode = replay_mode()
+        if mode == "replay":
+            return request.execute(http=ReplayGoogleHttp(mode=mode))
+
+        http = getattr(self._local, "http", None)
+        if http is None or http.credentials is not self._credentials:
+            http = self._local.http = AuthorizedHttp(self._credentials, http=httplib2.Http())
+        if mode == "record":
+            return request.execute(http=ReplayGoogleHttp(http, mode=mode))
+        return request.execute(http=http)
+
+    def _load_credentials(self):
+        creds = None
+        if os.path.exists(self.token_file):
+            with open(self.token_file, 'rb') as token:
+                creds = pickle.load(token)
+        if not creds or not creds.valid:
+            if creds and creds.expired and creds.refresh_token:
+                creds.refresh(Request())
+            else:
+                flow = InstalledAppFlow.from_client_secrets_file(self.credentials_file, self.scopes)
+                creds = flow.run_local_server(port=0)
+            self._save_credentials(creds)
+        return creds
+
+    def _save_credentials(self, creds) -> None:
+        with open(self.token_file, 'wb') as token:
+            pickle.dump(creds, token)
+
+    def _schedule_refresh(self) -> None:
+        creds = self._credentials
+        if creds is None or not getattr(creds, 'refresh_token', None) or creds.expiry is None:
+            return
+        # google-auth keeps expiry as a naive UTC datetime
+        delay = (creds.expiry - datetime.utcnow()).total_seconds() - REFRESH_AHEAD_SECONDS
+        self._refresh_timer = threading.Timer(max(delay, MIN_REFRESH_INTERVAL_SECONDS), self._refresh_credentials)
+        self._refresh_timer.daemon = True
+        self._refresh_timer.start()
+
+    def _refresh_credentials(self) -> None:
+        with self._lock:
+            try:
+                self._credentials.refresh(Request())
+                self._save_credentials(self._credentials)
+            except Exception as e:
+                print(colored(f"Background refresh of Google credentials failed: {e}", "red"))
+        self._schedule_refresh()
+
+
+calendar_service = CalendarService()
+
+
+def get_calendar_service():
+    """Return the calendar service shared by all calendar tools, creating it on first use."""
+    return calendar_service.get()
+
+
+def execute(request):
+    """Execute a calendar API request on a connection owned by the calling thread."""
+    return calendar_service.execute(request)
@@ -1,14 +1,10 @@
-from datetime import datetime, timedelta, timezone
+import asyncio
+from datetime import datetime, time, timedelta
 from langchain.pydantic_v1 import BaseModel, Field
 from langchain.tools import BaseTool
-from typing import Optional, Type
+from typing import Any, Optional, Type, List, Dict, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor
 import pytz
-import os
-import pickle
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
-import sys
 import traceback
 import json
 from termcolor import colored
@@ -18,51 +14,49 @@ from langchain.callbacks.manager import (
     CallbackManagerForToolRun,
 )
 
-SCOPES = ['https://www.googleapis.com/auth/calendar']
-CREDENTIALS_FILE = 'client_secret.json'
-
-def get_calendar_service():
-    creds = None
-    if os.path.exists('token.pickle'):
-        with open('token.pickle', 'rb') as token:
-            creds = pickle.load(token)
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file(CREDENTIALS_FILE, SCOPES)
-            creds = flow.run_local_server(port=0)
-        with open('token.pickle', 'wb') as token:
-            pickle.dump(creds, token)
-    service = build('calendar', 'v3', credentials=creds)
-    return service
+from .calendar_mirror import calendar_mirror
+from .calendar_service import execute, get_calendar_service
+from .intervals import Interval, free_windows, merge_intervals, parse_busy
 
-service = get_calendar_service()
+# The freebusy endpoint accepts at most 50 calendars per request
+FREEBUSY_MAX_ITEMS = 50
+MAX_CONCURRENT_QUERIES = 4
 
 class FreeBusyInput(BaseModel):
     calendar_id: str = Field(default='primary', description="ID of the calendar to check for free/busy times")
+    calendar_ids: Optional[List[str]] = Field(default=None, description="IDs of several calendars, e.g. every household member; returns the windows when all of them are free")
     start_time: Optional[str] = Field(default=None, description="Start time in ISO 8601 format")
     end_time: Optional[str] = Field(default=None, description="End time in ISO 8601 format")
     timezone: str = Field(default='UTC', description="Timezone for the query")
+    min_duration_minutes: int = Field(default=0, description="Only return free windows at least this many minutes long")
+    working_hours_start: Optional[str] = Field(default=None, description="Start of working hours as HH:MM; free time outside working hours is ignored")
+    working_hours_end: Optional[str] = Field(default=None, description="End of working hours as HH:MM")
 
 class FreeBusyTool(BaseTool):
     name = "free_busy"
-    description = "Check free/busy times from Google Calendar within a specified time range and timezone"
+    description = "Check free/busy times from Google Calendar within a specified time range and timezone, for one calendar or the shared free time of several calendars"
     args_schema: Type[BaseModel] = FreeBusyInput
 
     def _run(
-            self, calendar_id: str = 'primary', start_time: Optional[str] = None, end_time: Optional[str] = None, timezone: str = 'UTC', run_manager: Optional[CallbackManagerForToolRun] = None
+            self, calendar_id: str = 'primary', start_time: Optional[str] = None, end_time: Optional[str] = None, timezone: str = 'UTC', min_duration_minutes: int = 0, working_hours_start: Optional[str] = None, working_hours_end: Optional[str] = None, calendar_ids: Optional[List[str]] = None, run_manager: Optional[CallbackManagerForToolRun] = None
     ) -> str:
         """Use the tool."""
-        return self.check_free_busy(calendar_id, start_time, end_time, timezone)
+        return self.check_free_busy(calendar_id, start_time, end_time, timezone, min_duration_minutes, working_hours_start, working_hours_end, calendar_ids)
 
     async def _arun(
-            self, calendar_id: str = 'primary', start_time: Optional[str] = None, end_time: Optional[str] = None, timezone: str = 'UTC', run_manager: Optional[AsyncCallbackManagerForToolRun] = None
+            self, calendar_id: str = 'primary', start_time: Optional[str] = None, end_time: Optional[str] = None, timezone: str = 'UTC', min_duration_minutes: int = 0, working_hours_start: Optional[str] = None, working_hours_end: Optional[str] = None, calendar_ids: Optional[List[str]] = None, run_manager: Optional[AsyncCallbackManagerForToolRun] = None
     ) -> str:
         """Use the tool asynchronously."""
-        raise NotImplementedError("free_busy does not support async")
-
-    def check_free_busy(self, calendar_id: str, start_time: Optional[str], end_time: Optional[str], timezone: str) -> str:
+        # The Google API client is synchronous, so run it on a worker thread to keep the event loop free
+        return await asyncio.to_thread(self.check_free_busy, calendar_id, start_time, end_time, timezone, min_duration_minutes, working_hours_start, working_hours_end, calendar_ids)
+
+    def check_free_busy(self, calendar_id: str, start_time: Optional[str], end_time: Optional[str], timezone: str, min_duration_minutes: int = 0, working_hours_start: Optional[str] = None, working_hours_end: Optional[str] = None, calendar_ids: Optional[List[str]] = None) -> Union[Dict[str, Any], str]:
+        """
+        Free windows common to every calendar in the range, as {"free_times": [{"start", "end"}, ...],
+        "calendars_not_checked": {calendar_id: reason}}, or an error string when no calendar could be read.
+        """
+        # Every calendar that has to be free, without repeats
+        calendar_ids = list(dict.fromkeys(calendar_ids or [calendar_id]))
         tz = pytz.timezone(timezone)
 
         if start_time is None:
@@ -71,7 +65,7 @@ class FreeBusyTool(BaseTool):
             try:
                 start_time = datetime.strptime(start_time, '%Y-%m-%dT%H:%M:%S%z').isoformat()
             except ValueError:
-                start_time = datetime.strptime(start_time, '%Y-%m-%dT%H:%M:%S').replace(tzinfo=tz).isoformat()
+                start_time = tz.localize(datetime.strptime(start_time, '%Y-%m-%dT%H:%M:%S')).isoformat()
 
         if end_time is None:
             end_time = (datetime.now(tz) + timedelta(days=90)).isoformat()
@@ -79,59 +73,96 @@ class FreeBusyTool(BaseTool):
             try:
                 end_time = datetime.strptime(end_time, '%Y-%m-%dT%H:%M:%S%z').isoformat()
             except ValueError:
-                end_time = datetime.strptime(end_time, '%Y-%m-%dT%H:%M:%S').replace(tzinfo=tz).isoformat()
+                end_time = tz.localize(datetime.strptime(end_time, '%Y-%m-%dT%H:%M:%S')).isoformat()
+
+        working_hours = None
+        if working_hours_start and working_hours_end:
+            try:
+                working_hours = (time.fromisoformat(working_hours_start), time.fromisoformat(working_hours_end))
+            except ValueError as e:
+                return f"Invalid working hours: {e}. Use HH:MM, e.g. working_hours_start '09:00' and working_hours_end '17:30'."
+            if working_hours[0] == working_hours[1]:
+                return "Invalid working hours: working_hours_start and working_hours_end must differ."
 
-        print(colored(f"Querying Google Calendar API for free/busy times in calendar '{calendar_id}' from '{start_time}' to '{end_time}' in timezone '{timezone}'.", "white", "on_grey"))
+        print(colored(f"Querying Google Calendar API for free/busy times in calendars {calendar_ids} from '{start_time}' to '{end_time}' in timezone '{timezone}'.", "white", "on_grey"))
 
         try:
+            busy_lists, calendar_errors = self._query_busy(calendar_ids, start_time, end_time, timezone)
+            if not busy_lists:
+                # Nothing was read, so reporting the whole range as free would be wrong
+                return f"Failed to check free/busy times: no calendar could be read ({json.dumps(calendar_errors)})"
+
+            # Merge overlaps across all calendars: the household is free only where nobody is busy
+            busy = merge_intervals(*busy_lists)
+
+            free_times = free_windows(
+                busy,
+                datetime.fromisoformat(start_time),
+                datetime.fromisoformat(end_time),
+                min_duration=timedelta(minutes=min_duration_minutes),
+                working_hours=working_hours,
+                tz=tz,
+            )
+
+            print("\nFree times:")
+            for free_start, free_end in free_times:
+                print(f"From {free_start.astimezone(tz)} to {free_end.astimezone(tz)}")
+
+            # Same shape whether or not some calendars failed; an empty free_times means no free time
+            return {
+                "free_times": [{"start": free_start.astimezone(tz).isoformat(), "end": free_end.astimezone(tz).isoformat()} for free_start, free_end in free_times],
+                "calendars_not_checked": calendar_errors,
+            }
+
+        except Exception as e:
+            print(f"An error occurred: {str(e)}")
+            traceback.print_exc()
+            # One failed batch among several must not end the agent run
+            return f"Failed to check free/busy times: {e}"
+
+    def _query_busy(self, calendar_ids: List[str], start_time: str, end_time: str, timezone: str) -> Tuple[List[List[Interval]], Dict[str, str]]:
+        """
+        Fetch busy intervals for every calendar, FREEBUSY_MAX_ITEMS calendars per freebusy request.
+        Requests beyond the first batch run in parallel. Calendars held in the local mirror are
+        answered from it after a delta sync. Calendars the API could not read are returned
+        separately with the reason.
+        """
+        busy_lists = []
+        calendar_errors = {}
+
+        if calendar_mirror.enabled:
+            with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENT_QUERIES, len(calendar_ids))) as executor:
+                mirrored = list(executor.map(lambda calendar_id: calendar_mirror.try_sync(calendar_id, start_time), calendar_ids))
+            for calendar_id, is_mirrored in zip(calendar_ids, mirrored):
+                if is_mirrored:
+                    busy_lists.append(calendar_mirror.busy_intervals(calendar_id, start_time, end_time))
+            calendar_ids = [calendar_id for calendar_id, is_mirrored in zip(calendar_ids, mirrored) if not is_mirrored]
+            if not calendar_ids:
+                return busy_lists, calendar_errors
+
+        def query(batch):
             request_body = {
                 "timeMin": start_time,
                 "timeMax": end_time,
                 "timeZone": timezone,
-                "items": [{"id": calendar_id}]
+                "items": [{"id": calendar_id} for calendar_id in batch]
             }
+            return execute(get_calendar_service().freebusy().query(body=request_body))
 
-            freebusy_result = service.freebusy().query(body=request_body).execute()
-
-            busy_times = freebusy_result['calendars'][calendar_id]['busy']
-
-            if not busy_times:
-                return 'No busy times found in that time span.'
-
-            free_times = []
-            current_time = datetime.fromisoformat(start_time)
-            end_time_dt = datetime.fromisoformat(end_time)
+        batches = [calendar_ids[i:i + FREEBUSY_MAX_ITEMS] for i in range(0, len(calendar_ids), FREEBUSY_MAX_ITEMS)]
+        if len(batches) == 1:
+            results = [query(batches[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENT_QUERIES, len(batches))) as executor:
+                results = list(executor.map(query, batches))
 
-            print("\nFree times:")
-            while current_time < end_time_dt:
-                free_slot_start = current_time
-                next_busy_time = None
-                for busy_time in busy_times:
-                    busy_start = datetime.fromisoformat(busy_time['start'])
-                    if busy_start > current_time:
-                        next_busy_time = busy_start
-                        break
-
-                if next_busy_time:
-                    free_slot_end = next_busy_time
+        for freebusy_result in results:
+            for calendar_id, calendar in freebusy_result['calendars'].items():
+                if calendar.get('errors'):
+                    calendar_errors[calendar_id] = ', '.join(error.get('reason', 'unknown') for error in calendar['errors'])
                 else:
-                    free_slot_end = end_time_dt
-
-                if free_slot_end > free_slot_start:
-                    free_times.append((free_slot_start, free_slot_end))
-                    print(f"From {free_slot_start} to {free_slot_end}")
-
-                current_time = free_slot_end
-
-            if not free_times:
-                return "No free times found."
-
-            return free_times
-
-        except Exception as e:
-            print(f"An error occurred: {str(e)}")
-            traceback.print_exc()
-            sys.exit(0)
+                    busy_lists.append(parse_busy(calendar.get('busy', [])))
+        return busy_lists, calendar_errors
 
 # Example usage
 if __name__ == "__main__":
@@ -0,0 +1,99 @@
+from datetime import datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+Interval = Tuple[datetime, datetime]
+
+
+def parse_timestamp(value: str) -> datetime:
+    """Parse an RFC 3339 timestamp as returned by the Calendar API, including the 'Z' suffix."""
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def parse_busy(busy_blocks: Iterable[Dict[str, str]]) -> List[Interval]:
+    """Parse freebusy 'busy' blocks into (start, end) intervals, once, dropping empty or inverted blocks."""
+    intervals = []
+    for block in busy_blocks:
+        start, end = parse_timestamp(block['start']), parse_timestamp(block['end'])
+        if end > start:
+            intervals.append((start, end))
+    return intervals
+
+
+def merge_intervals(*interval_lists: Iterable[Interval]) -> List[Interval]:
+    """
+    Merge busy intervals from any number of calendars into sorted, non-overlapping intervals.
+    Touching intervals are joined. Runs in O(n log n) for n intervals in total.
+    """
+    intervals = sorted(interval for interval_list in interval_lists for interval in interval_list)
+    merged: List[Interval] = []
+    for start, end in intervals:
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _at(day, clock: time, tz) -> datetime:
+    naive = datetime.combine(day, clock)
+    # pytz zones need localize() to pick the right UTC offset; zoneinfo zones accept tzinfo directly
+    if hasattr(tz, 'localize'):
+        return tz.localize(naive)
+    return naive.replace(tzinfo=tz)
+
+
+def _clip_to_working_hours(window: Interval, working_hours: Tuple[time, time], tz) -> List[Interval]:
+    start, end = window
+    work_start, work_end = working_hours
+    clipped = []
+    day = start.astimezone(tz).date()
+    if work_end <= work_start:
+        # An overnight shift that began the previous evening can cover the start of the window
+        day -= timedelta(days=1)
+    last_day = end.astimezone(tz).date()
+    while day <= last_day:
+        day_start, day_end = _at(day, work_start, tz), _at(day, work_end, tz)
+        if work_end <= work_start:
+            # Working hours that run past midnight
+            day_end = _at(day + timedelta(days=1), work_end, tz)
+        clipped_start, clipped_end = max(start, day_start), min(end, day_end)
+        if clipped_end > clipped_start:
+            clipped.append((clipped_start, clipped_end))
+        day += timedelta(days=1)
+    return clipped
+
+
+def free_windows(busy: List[Interval], window_start: datetime, window_end: datetime, min_duration: timedelta = timedelta(0), working_hours: Optional[Tuple[time, time]] = None, tz=None) -> List[Interval]:
+    """
+    Sweep the merged busy intervals once and return the gaps inside [window_start, window_end).
+
+    Args:
+        busy (list): Sorted, non-overlapping busy intervals, e.g. from merge_intervals.
+        window_start (datetime): Start of the time range to search (timezone-aware).
+        window_end (datetime): End of the time range to search (timezone-aware).
+        min_duration (timedelta): Free windows shorter than this are dropped.
+        working_hours (tuple): Optional (start, end) clock times; free time outside them is dropped.
+        tz: Timezone the working hours are expressed in, defaults to window_start's timezone.
+
+    Returns:
+        list: (start, end) tuples of free time in chronological order.
+    """
+    gaps = []
+    cursor = window_start
+    for busy_start, busy_end in busy:
+        if busy_end <= cursor:
+            continue
+        if busy_start >= window_end:
+            break
+        if busy_start > cursor:
+            gaps.append((cursor, busy_start))
+        cursor = max(cursor, busy_end)
+    if cursor < window_end:
+        gaps.append((cursor, window_end))
+
+    if working_hours is not None:
+        tz = tz or window_start.tzinfo
+        gaps = [clipped for gap in gaps for clipped in _clip_to_working_hours(gap, working_hours, tz)]
+
+    return [(start, end) for start, end in gaps if end - start >= min_duration and end > start]
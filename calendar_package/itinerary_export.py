@@ -0,0 +1,208 @@
+import hashlib
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Union
+
+from googleapiclient.errors import HttpError
+from termcolor import colored
+
+from .calendar_mirror import calendar_mirror
+from .calendar_service import execute, get_calendar_service
+
+# Google accepts at most 50 calls per calendar batch request
+BATCH_SIZE = 50
+MAX_ATTEMPTS = 3
+# Statuses worth retrying: rate limits and server errors
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+# A 403 is retried only for these reasons; forbidden or insufficientPermissions will not go away
+RATE_LIMIT_REASONS = {'rateLimitExceeded', 'userRateLimitExceeded'}
+ACTIVITY_DURATION = timedelta(hours=2)
+TRANSPORT_DURATION = timedelta(hours=1)
+
+
+def _parse_time(value: str) -> datetime:
+    return datetime.fromisoformat(value.strip())
+
+
+def _event_id(trip_id: str, key: str) -> str:
+    # Client-chosen ids make retries idempotent: re-inserting an event that did get created returns 409
+    return hashlib.sha1(f"{trip_id}:{key}".encode("utf-8")).hexdigest()
+
+
+def _error_reasons(error: HttpError) -> List[str]:
+    details = getattr(error, 'error_details', None)
+    if isinstance(details, list) and details:
+        return [detail.get('reason', '') for detail in details if isinstance(detail, dict)]
+    try:
+        content = json.loads(error.content.decode('utf-8') if isinstance(error.content, bytes) else error.content)
+        return [detail.get('reason', '') for detail in content['error'].get('errors', [])]
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return []
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Rate limits, server errors and failures that never reached the API (timeouts, dropped connections)"""
+    if not isinstance(error, HttpError):
+        return True
+    if error.resp.status == 403:
+        return bool(RATE_LIMIT_REASONS & set(_error_reasons(error)))
+    return error.resp.status in RETRYABLE_STATUSES
+
+
+def _timed_event(event_id: str, summary: str, location: str, description: str, start: datetime, end: datetime, timezone: str) -> Dict[str, Any]:
+    return {
+        'id': event_id,
+        'summary': summary,
+        'location': location,
+        'description': description,
+        'start': {'dateTime': start.isoformat(), 'timeZone': timezone},
+        'end': {'dateTime': end.isoformat(), 'timeZone': timezone},
+    }
+
+
+def itinerary_events(itinerary: Union[Dict[str, Any], Any], timezone: str = 'UTC') -> List[Dict[str, Any]]:
+    """
+    Builds calendar events for an itinerary: one per hotel stay, activity and transport leg.
+
+    Args:
+        itinerary (Itinerary or dict): The itinerary to export.
+        timezone (str): Time zone for times that carry no UTC offset.
+
+    Returns:
+        list: Event resources ready for events().insert. Entries whose times cannot be parsed
+              are returned as {"summary": ..., "error": ...} instead.
+    """
+    if hasattr(itinerary, 'dict'):
+        itinerary = itinerary.dict()
+    trip_id = itinerary.get('trip_id') or itinerary.get('trip_name', '')
+    trip_name = itinerary.get('trip_name', '')
+
+    events = []
+    for d, destination in enumerate(itinerary.get('destinations', [])):
+        location = destination.get('location', '')
+        accommodation = destination.get('accommodation')
+        if accommodation:
+            summary = f"Stay at {accommodation.get('name', 'hotel')}"
+            try:
+                events.append(_timed_event(_event_id(trip_id, f"{d}:stay"), summary, accommodation.get('address', location),
+                                           f"{trip_name}: check-in {accommodation['check_in']}, check-out {accommodation['check_out']}",
+                                           _parse_time(accommodation['check_in']), _parse_time(accommodation['check_out']), timezone))
+            except (KeyError, ValueError) as e:
+                events.append({'summary': summary, 'error': f"Invalid check-in/check-out time: {e}"})
+
+        for a, activity in enumerate(destination.get('activities', [])):
+            summary = activity.get('name', 'Activity')
+            try:
+                start = _parse_time(f"{activity['date']}T{activity.get('time') or '09:00'}")
+                description = "\n".join(part for part in (trip_name, activity.get('notes', ''), activity.get('purchase_url', '')) if part)
+                events.append(_timed_event(_event_id(trip_id, f"{d}:activity:{a}"), summary, activity.get('location', location),
+                                           description, start, start + ACTIVITY_DURATION, timezone))
+            except (KeyError, ValueError) as e:
+                events.append({'summary': summary, 'error': f"Invalid activity date/time: {e}"})
+
+        for t, leg in enumerate(destination.get('transportation', [])):
+            summary = f"{leg.get('type', 'Transport')}: {leg.get('pickup_location', '')} to {leg.get('dropoff_location', '')}"
+            try:
+                start = _parse_time(leg['pickup_time'])
+                events.append(_timed_event(_event_id(trip_id, f"{d}:transport:{t}"), summary, leg.get('pickup_location', location),
+                                           f"{trip_name}: {leg.get('provider', '')}", start, start + TRANSPORT_DURATION, timezone))
+            except (KeyError, ValueError) as e:
+                events.append({'summary': summary, 'error': f"Invalid pickup time: {e}"})
+    return events
+
+
+def _insert_batch(calendar_id: str, events: List[Dict[str, Any]], results: Dict[str, Dict[str, Any]]) -> None:
+    """Inserts up to BATCH_SIZE events in one HTTP round trip, recording each event's outcome."""
+    service = get_calendar_service()
+
+    def callback(request_id, response, exception):
+        event = events[int(request_id)]
+        if exception is None:
+            results[event['id']] = {'summary': event['summary'], 'status': 'created', 'link': response.get('htmlLink')}
+        elif isinstance(exception, HttpError) and exception.resp.status == 409:
+            # Created by an earlier attempt whose response was lost, or by an earlier export of this trip
+            results[event['id']] = {'summary': event['summary'], 'status': 'exists', 'link': None}
+        else:
+            results[event['id']] = {'summary': event['summary'], 'status': 'failed', 'error': str(exception), 'retryable': _is_retryable(exception)}
+
+    batch = service.new_batch_http_request(callback=callback)
+    for index, event in enumerate(events):
+        batch.add(service.events().insert(calendarId=calendar_id, body=event), request_id=str(index))
+    execute(batch)
+
+
+def export_itinerary(itinerary: Union[Dict[str, Any], Any], calendar_id: str = 'primary', timezone: str = 'UTC', max_attempts: int = MAX_ATTEMPTS) -> List[Dict[str, Any]]:
+    """
+    Adds every event of an itinerary to Google Calendar using batch requests.
+
+    Events are sent BATCH_SIZE per HTTP request. Events that fail with a rate limit or server
+    error are retried, on their own, up to max_attempts times with backoff; events that
+    already succeeded are never sent again.
+
+    Args:
+        itinerary (Itinerary or dict): The itinerary to export.
+        calendar_id (str): Calendar to add the events to.
+        timezone (str): Time zone for itinerary times that carry no UTC offset.
+        max_attempts (int): Attempts per event, including the first.
+
+    Returns:
+        list: One result per event, in itinerary order, with 'summary', 'status' ('created',
+              'exists' when it was already in the calendar, or 'failed') and 'link' or 'error'.
+
+    Example:
+        >>> from calendar_package import export_itinerary
+        >>> for result in export_itinerary(itinerary, timezone='Europe/Paris'):
+        ...     print(result['status'], result['summary'])
+    """
+    events = itinerary_events(itinerary, timezone)
+    pending = [event for event in events if 'error' not in event]
+    results: Dict[str, Dict[str, Any]] = {}
+
+    print(colored(f"Exporting {len(pending)} itinerary events to calendar '{calendar_id}' in batches of {BATCH_SIZE}.", "white", "on_grey"))
+    for attempt in range(max_attempts):
+        if attempt:
+            time.sleep(min(2 ** attempt, 8))
+        for i in range(0, len(pending), BATCH_SIZE):
+            batch = pending[i:i + BATCH_SIZE]
+            try:
+                _insert_batch(calendar_id, batch, results)
+            except Exception as e:
+                # The batch request itself failed, so none of its events were inserted
+                for event in batch:
+                    results[event['id']] = {'summary': event['summary'], 'status': 'failed', 'error': str(e), 'retryable': _is_retryable(e)}
+        pending = [event for event in pending
+                   if results[event['id']]['status'] == 'failed' and results[event['id']]['retryable']]
+        if not pending:
+            break
+
+    # The next read of this calendar should pick up the new events instead of serving the mirror as is
+    calendar_mirror.expire(calendar_id)
+
+    report = []
+    for event in events:
+        if 'error' in event:
+            report.append({'summary': event['summary'], 'status': 'failed', 'error': event['error']})
+        else:
+            result = results[event['id']]
+            result.pop('retryable', None)
+            report.append(result)
+    exported = sum(result['status'] != 'failed' for result in report)
+    print(colored(f"Exported {exported} of {len(events)} itinerary events.", "white", "on_grey"))
+    return report
+
+
+# Example usage
+if __name__ == "__main__":
+    itinerary = {
+        "trip_id": "123456",
+        "trip_name": "Summer Vacation",
+        "destinations": [{
+            "location": "Paris, France",
+            "accommodation": {"name": "Hotel Paris", "address": "123 Paris St, Paris, France", "check_in": "2024-07-01T15:00", "check_out": "2024-07-05T11:00"},
+            "activities": [{"name": "Eiffel Tower Visit", "date": "2024-07-02", "time": "10:00", "location": "Champ de Mars, 75007 Paris, France", "notes": "Pre-book tickets online."}],
+            "transportation": [{"type": "Taxi", "provider": "Paris Taxi", "pickup_location": "Hotel Paris", "dropoff_location": "Eiffel Tower", "pickup_time": "2024-07-02T09:30"}]
+        }]
+    }
+    for result in export_itinerary(itinerary, timezone='Europe/Paris'):
+        print(result)
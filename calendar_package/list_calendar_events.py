@@ -1,13 +1,9 @@
+import asyncio
 from datetime import datetime, timedelta
 from langchain.pydantic_v1 import BaseModel, Field
 from langchain.tools import BaseTool
-from typing import Optional, Type
+from typing import Any, Dict, Iterator, Optional, Type
 import pytz
-import os
-import pickle
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
 import sys
 import traceback
 import json
@@ -18,26 +14,45 @@ from langchain.callbacks.manager import (
     CallbackManagerForToolRun,
 )
 
-SCOPES = ['https://www.googleapis.com/auth/calendar']
-CREDENTIALS_FILE = 'client_secret.json'
-
-def get_calendar_service():
-    creds = None
-    if os.path.exists('token.pickle'):
-        with open('token.pickle', 'rb') as token:
-            creds = pickle.load(token)
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file(CREDENTIALS_FILE, SCOPES)
-            creds = flow.run_local_server(port=0)
-        with open('token.pickle', 'wb') as token:
-            pickle.dump(creds, token)
-    service = build('calendar', 'v3', credentials=creds)
-    return service
-
-service = get_calendar_service()
+from .calendar_mirror import calendar_mirror
+from .calendar_service import execute, get_calendar_service
+
+# The events endpoint returns at most 250 events per page
+EVENTS_PAGE_SIZE = 250
+# Events the tool lists when the model asks for no particular number; iter_events(max_results=None) lists them all
+DEFAULT_MAX_RESULTS = 20
+# Only the fields the tools read, which keeps each page small
+EVENT_FIELDS = "nextPageToken,items(id,status,summary,start,end)"
+
+def iter_events(calendar_id: str, time_min: str, time_max: str, max_results: Optional[int] = None, fields: str = EVENT_FIELDS) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily yields the events of a calendar between time_min and time_max in start time order.
+
+    Pages are requested one at a time as the caller consumes events, so only one page of raw
+    events is held in memory. Iteration stops once max_results events have been yielded,
+    without fetching further pages; None lists the whole range.
+
+    Example:
+        >>> from calendar_package.list_calendar_events import iter_events
+        >>> for event in iter_events('primary', '2024-05-01T00:00:00Z', '2024-06-01T00:00:00Z', max_results=50):
+        ...     print(event.get('summary'))
+    """
+    remaining = max_results
+    page_token = None
+    while remaining is None or remaining > 0:
+        page_size = EVENTS_PAGE_SIZE if remaining is None else min(EVENTS_PAGE_SIZE, remaining)
+        page = execute(get_calendar_service().events().list(calendarId=calendar_id, timeMin=time_min, timeMax=time_max,
+                                                            maxResults=page_size, singleEvents=True, orderBy='startTime',
+                                                            pageToken=page_token, fields=fields))
+        for event in page.get('items', []):
+            yield event
+            if remaining is not None:
+                remaining -= 1
+                if remaining == 0:
+                    return
+        page_token = page.get('nextPageToken')
+        if not page_token:
+            return
 
 def format_event_time(event_time_str, timezone_str):
     event_time = datetime.fromisoformat(event_time_str)
@@ -47,7 +62,7 @@ def format_event_time(event_time_str, timezone_str):
 
 class ListEventsInput(BaseModel):
     calendar_id: str = Field(default='primary', description="ID of the calendar to list events from")
-    max_results: int = Field(default=10, description="Maximum number of events to list")
+    max_results: int = Field(default=DEFAULT_MAX_RESULTS, description="Maximum number of events to list")
     start_time: Optional[str] = Field(default=None, description="Start time in ISO 8601 format")
     end_time: Optional[str] = Field(default=None, description="End time in ISO 8601 format")
     timezone: str = Field(default='UTC', description="Timezone for the events")
@@ -58,22 +73,20 @@ class ListEventsTool(BaseTool):
     args_schema: Type[BaseModel] = ListEventsInput
 
     def _run(
-            self, calendar_id: str = 'primary', max_results: int = 20, start_time: Optional[str] = None, end_time: Optional[str] = None, timezone: str = 'UTC', run_manager: Optional[CallbackManagerForToolRun] = None
+            self, calendar_id: str = 'primary', max_results: int = DEFAULT_MAX_RESULTS, start_time: Optional[str] = None, end_time: Optional[str] = None, timezone: str = 'UTC', run_manager: Optional[CallbackManagerForToolRun] = None
     ) -> str:
         """Use the tool."""
         return self.list_events(calendar_id, max_results, start_time, end_time, timezone)
 
     async def _arun(
-            self, calendar_id: str = 'primary', max_results: int = 20, start_time: Optional[str] = None, end_time: Optional[str] = None, timezone: str = 'UTC', run_manager: Optional[AsyncCallbackManagerForToolRun] = None
+            self, calendar_id: str = 'primary', max_results: int = DEFAULT_MAX_RESULTS, start_time: Optional[str] = None, end_time: Optional[str] = None, timezone: str = 'UTC', run_manager: Optional[AsyncCallbackManagerForToolRun] = None
     ) -> str:
         """Use the tool asynchronously."""
-        raise NotImplementedError("list_events does not support async")
+        # The Google API client is synchronous, so run it on a worker thread to keep the event loop free
+        return await asyncio.to_thread(self.list_events, calendar_id, max_results, start_time, end_time, timezone)
 
     def list_events(self, calendar_id: str, max_results: int, start_time: Optional[str], end_time: Optional[str], timezone: str) -> str:
 
-        # hard code max results at 20 for now
-        max_results = 20
-
         tz = pytz.timezone(timezone)
 
         if start_time is None:
@@ -96,12 +109,11 @@ class ListEventsTool(BaseTool):
         print(colored(f"Querying Google Calendar API for events in calendar '{calendar_id}' from '{start_time}' to '{end_time}' with a maximum of {max_results} results in timezone '{timezone}'.", "white", "on_grey"))
 
         try:
-            events_result = service.events().list(calendarId=calendar_id, timeMin=start_time, timeMax=end_time,
-                                                  maxResults=max_results, singleEvents=True,
-                                                  orderBy='startTime').execute()
-            events = events_result.get('items', [])
-            if not events:
-                return 'No events found in that time span.'
+            # Answer from the local mirror when it can hold this calendar, otherwise page through the API
+            if calendar_mirror.try_sync(calendar_id, start_time):
+                events = calendar_mirror.events(calendar_id, start_time, end_time, max_results)
+            else:
+                events = iter_events(calendar_id, start_time, end_time, max_results)
 
             event_details = []
             for event in events:
@@ -122,6 +134,9 @@ class ListEventsTool(BaseTool):
                 }
                 event_details.append(event_detail)
 
+            if not event_details:
+                return 'No events found in that time span.'
+
             return event_details
 
         except Exception as e:
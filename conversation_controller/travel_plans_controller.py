@@ -67,5 +67,10 @@ class TravelPlansController(ConversationController):
         else:
             description = "Create a general itinerary."
 
-        itinerary_details = generate_itinerary_from_model_with_tools(description)
+        # Show each destination as soon as it is planned instead of waiting for the whole itinerary
+        itinerary_details = generate_itinerary_from_model_with_tools(description, on_destination=self.show_destination)
         self.state['itinerary'] = itinerary_details
+
+    def show_destination(self, destination):
+        print(f"Planned {destination.location} ({destination.arrival_date} to {destination.departure_date}): "
+              f"{destination.accommodation.name}, {len(destination.activities)} activities")
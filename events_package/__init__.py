@@ -1 +1,2 @@
-from .ticketmaster import TicketmasterEventsTool
+from .ticketmaster import TicketmasterEventsTool, EventSummary
+from .event_cache import EventCache, ticketmaster_event_cache
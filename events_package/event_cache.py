@@ -0,0 +1,140 @@
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+# Events fetched for a city and date window are reused for this long
+DEFAULT_TTL_SECONDS = float(os.environ.get("TICKETMASTER_EVENT_CACHE_TTL", 30 * 60))
+DEFAULT_MAX_WINDOWS = int(os.environ.get("TICKETMASTER_EVENT_CACHE_SIZE", 64))
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase words with accents removed, so 'Café' and 'cafe' index the same."""
+    text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode("ascii")
+    return _WORD.findall(text.lower())
+
+
+def normalize_city(city: str) -> str:
+    return " ".join(tokenize(city))
+
+
+def event_key(event: Any) -> Any:
+    """Identity of an event: its id, or when Ticketmaster sent none, its name, date, time and venue."""
+    return event.event_id or (event.name, event.date, event.time, event.venue)
+
+
+class EventWindow:
+    """
+    All events fetched for one city and date window, with an inverted index from the words
+    of each event's name, genre and venue to its key (see event_key).
+
+    complete is False when the API had more events than were fetched, in which case a
+    keyword with no local match may still exist upstream.
+    """
+
+    def __init__(self, city: str, start: datetime, end: datetime, complete: bool):
+        self.city = city
+        self.start = start
+        self.end = end
+        self.complete = complete
+        self.fetched_at = time.monotonic()
+        self._events: Dict[Any, Any] = {}
+        self._index: Dict[str, Set[Any]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def covers(self, start: datetime, end: datetime) -> bool:
+        return self.start <= start and end <= self.end
+
+    def add(self, events: Iterable[Any]) -> None:
+        """Index events (objects with event_id, name, date, time, genre and venue), ignoring events already present."""
+        with self._lock:
+            for event in events:
+                key = event_key(event)
+                if key in self._events:
+                    continue
+                self._events[key] = event
+                for word in set(tokenize(f"{event.name} {event.genre} {event.venue}")):
+                    self._index[word].add(key)
+
+    def search(self, keyword: str, start: datetime, end: datetime) -> List[Any]:
+        """
+        Events matching every word of keyword, or failing that any of its words ranked by how
+        many they match, limited to local dates between start and end and sorted by date.
+        An empty keyword returns every event in the range.
+        """
+        words = tokenize(keyword)
+        with self._lock:
+            if not words:
+                scored = {key: 0 for key in self._events}
+            else:
+                scored = defaultdict(int)
+                for word in words:
+                    for key in self._index.get(word, ()):
+                        scored[key] += 1
+                every_word = {key: score for key, score in scored.items() if score == len(words)}
+                if every_word:
+                    scored = every_word
+            events = [(score, self._events[key]) for key, score in scored.items()]
+
+        first_day, last_day = start.date().isoformat(), end.date().isoformat()
+        matches = [(score, event) for score, event in events if not event.date or first_day <= event.date <= last_day]
+        matches.sort(key=lambda match: (-match[0], match[1].date, match[1].time))
+        return [event for _, event in matches]
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+
+class EventCache:
+    """
+    TTL cache of Ticketmaster event windows keyed by city.
+
+    A keyword search is served locally when an unexpired window for the same city covers
+    the requested dates, so different keywords for one trip share a single set of API calls.
+    """
+
+    def __init__(self, ttl_seconds: float = DEFAULT_TTL_SECONDS, max_windows: int = DEFAULT_MAX_WINDOWS):
+        self.ttl_seconds = ttl_seconds
+        self.max_windows = max_windows
+        self._windows: "OrderedDict[Tuple[str, datetime, datetime], EventWindow]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, city: str, start: datetime, end: datetime) -> Optional[EventWindow]:
+        """Return the newest unexpired window for the city that covers [start, end], if any."""
+        city = normalize_city(city)
+        now = time.monotonic()
+        with self._lock:
+            best = None
+            for key, window in list(self._windows.items()):
+                if now - window.fetched_at > self.ttl_seconds:
+                    del self._windows[key]
+                elif window.city == city and window.covers(start, end):
+                    if best is None or window.fetched_at > best.fetched_at:
+                        best = window
+            if best is not None:
+                self._windows.move_to_end((best.city, best.start, best.end))
+            return best
+
+    def store(self, city: str, start: datetime, end: datetime, events: Iterable[Any], complete: bool) -> EventWindow:
+        window = EventWindow(normalize_city(city), start, end, complete)
+        window.add(events)
+        with self._lock:
+            self._windows[(window.city, start, end)] = window
+            self._windows.move_to_end((window.city, start, end))
+            while len(self._windows) > self.max_windows:
+                self._windows.popitem(last=False)
+        return window
+
+    def clear(self) -> None:
+        with self._lock:
+            self._windows.clear()
+
+
+# Shared by every TicketmasterEventsTool in the process
+ticketmaster_event_cache = EventCache()
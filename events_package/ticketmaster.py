@@ -1,9 +1,12 @@
-from datetime import datetime
+import asyncio
+import math
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from langchain.pydantic_v1 import BaseModel, Field
 from langchain.tools import BaseTool
-from typing import Optional, Type
+from typing import Optional, Type, List, Dict, Any, Tuple
 import os
-import requests
+from http_client import get_session, get_async_client
 from termcolor import colored
 
 from langchain.callbacks.manager import (
@@ -11,56 +14,220 @@ from langchain.callbacks.manager import (
     CallbackManagerForToolRun,
 )
 
+from .event_cache import event_key, ticketmaster_event_cache
+
+TICKETMASTER_EVENTS_URL = "https://app.ticketmaster.com/discovery/v2/events.json"
+# Events per page requested from the Discovery API (its maximum is 200)
+EVENTS_PER_PAGE = 50
+# The Discovery API refuses pages past the first 1000 results (size * page < 1000)
+MAX_DEEP_PAGING = 1000
+# Page requests in flight at once for one tool call
+MAX_CONCURRENT_REQUESTS = 4
+# Cold city windows are fetched in the largest pages the API allows, up to the paging limit
+WINDOW_PAGE_SIZE = 200
+
 class TicketmasterQueryInput(BaseModel):
     keyword: str = Field(description="Keyword for event search")
     location: str = Field(description="Location for event search")
     start_date: str = Field(description="Start date for event search in ISO 8601 format")
     end_date: str = Field(description="End date for event search in ISO 8601 format")
+    pages: int = Field(default=1, description="Number of result pages to return, 50 events per page")
+
+class EventSummary(BaseModel):
+    """The parts of a Ticketmaster event needed to fill in an Activity."""
+    event_id: str
+    name: str
+    date: str
+    time: str
+    venue: str
+    url: str
+    min_price: Optional[float]
+    currency: str
+    image_url: str
+    genre: str
+
+def _parse_date(value: Any) -> datetime:
+    """Parse an ISO 8601 date or date-time as UTC; dates without an offset are taken to be UTC."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+def _pick_image(images: List[Dict[str, Any]]) -> str:
+    # One landscape image at a reasonable size instead of the ten or so variants Ticketmaster sends
+    landscape = [image for image in images if image.get('ratio') == '16_9' and image.get('width', 0) <= 1024]
+    candidates = landscape or images
+    if not candidates:
+        return ''
+    return max(candidates, key=lambda image: image.get('width', 0)).get('url', '')
+
+def summarize_event(event: Dict[str, Any]) -> EventSummary:
+    """Project one raw Discovery API event onto an EventSummary"""
+    start = event.get('dates', {}).get('start', {})
+    venues = event.get('_embedded', {}).get('venues', [])
+    venue = ''
+    if venues:
+        venue = ', '.join(part for part in (venues[0].get('name', ''), venues[0].get('city', {}).get('name', '')) if part)
+    prices = event.get('priceRanges', [])
+    min_price = min((price['min'] for price in prices if price.get('min') is not None), default=None)
+    classification = (event.get('classifications') or [{}])[0]
+    genre = classification.get('genre', {}).get('name') or classification.get('segment', {}).get('name', '')
+    return EventSummary(
+        event_id=event.get('id', ''),
+        name=event.get('name', ''),
+        date=start.get('localDate', ''),
+        time=start.get('localTime', ''),
+        venue=venue,
+        url=event.get('url', ''),
+        min_price=min_price,
+        currency=prices[0].get('currency', '') if prices else '',
+        image_url=_pick_image(event.get('images', [])),
+        genre='' if genre == 'Undefined' else genre,
+    )
 
 class TicketmasterEventsTool(BaseTool):
     name = "ticketmaster_events"
     description = "Useful for querying Ticketmaster for scheduled event listings and dates"
     args_schema: Type[BaseModel] = TicketmasterQueryInput
+    page_size: int = EVENTS_PER_PAGE
+    max_concurrency: int = MAX_CONCURRENT_REQUESTS
 
     def _run(
-            self, keyword: str, location: str, start_date: str, end_date: str, run_manager: Optional[CallbackManagerForToolRun] = None
-    ) -> str:
+            self, keyword: str, location: str, start_date: str, end_date: str, pages: int = 1, run_manager: Optional[CallbackManagerForToolRun] = None
+    ) -> List[Dict[str, Any]]:
         """Use the tool."""
-        return self.query_ticketmaster_events(keyword, location, start_date, end_date)
+        return self.query_ticketmaster_events(keyword, location, start_date, end_date, pages)
 
     async def _arun(
-            self, keyword: str, location: str, start_date: str, end_date: str, run_manager: Optional[AsyncCallbackManagerForToolRun] = None
-    ) -> str:
+            self, keyword: str, location: str, start_date: str, end_date: str, pages: int = 1, run_manager: Optional[AsyncCallbackManagerForToolRun] = None
+    ) -> List[Dict[str, Any]]:
         """Use the tool asynchronously."""
-        raise NotImplementedError("ticketmaster_events does not support async")
+        return await self.aquery_ticketmaster_events(keyword, location, start_date, end_date, pages)
 
-    def query_ticketmaster_events(self, keyword: str, location: str, start_date: str, end_date: str) -> str:
-        """Query Ticketmaster events API for scheduled event listings and dates"""
+    def query_ticketmaster_events(self, keyword: str, location: str, start_date: str, end_date: str, pages: int = 1) -> List[Dict[str, Any]]:
+        """Query Ticketmaster for scheduled event listings and dates, answering from the cached events of the city when possible"""
+        start, end = _parse_date(start_date), _parse_date(end_date)
+        window = ticketmaster_event_cache.lookup(location, start, end)
+        if window is None:
+            # Cold window: fetch the city's events for these dates once, without the keyword
+            params = self._query_params('', location, start, end, WINDOW_PAGE_SIZE)
+            events, total = self._fetch_pages(params, [0])
+            if isinstance(events, str):
+                return events
+            if total > len(events):
+                more, _ = self._fetch_pages(params, self._page_numbers(math.ceil(total / WINDOW_PAGE_SIZE), WINDOW_PAGE_SIZE)[1:])
+                events += more if isinstance(more, list) else []
+            window = ticketmaster_event_cache.store(location, start, end, events, complete=len(events) >= total)
 
-        print(colored(f"Received arguments - Keyword: {keyword}, Location: {location}, Start Date: {start_date}, End Date: {end_date}", "white", "on_grey"))
+        matches = window.search(keyword, start, end)
+        if not matches and not window.complete:
+            # The window was cut off at the paging limit, so ask the API for this keyword directly
+            events, _ = self._fetch_pages(self._query_params(keyword, location, start, end, self.page_size), self._page_numbers(pages, self.page_size))
+            if isinstance(events, str):
+                return events
+            window.add(events)
+            matches = window.search(keyword, start, end)
+        return self._to_output(matches, pages)
+
+    async def aquery_ticketmaster_events(self, keyword: str, location: str, start_date: str, end_date: str, pages: int = 1) -> List[Dict[str, Any]]:
+        """Query Ticketmaster for scheduled event listings and dates without blocking the event loop"""
+        start, end = _parse_date(start_date), _parse_date(end_date)
+        window = ticketmaster_event_cache.lookup(location, start, end)
+        if window is None:
+            params = self._query_params('', location, start, end, WINDOW_PAGE_SIZE)
+            events, total = await self._afetch_pages(params, [0])
+            if isinstance(events, str):
+                return events
+            if total > len(events):
+                more, _ = await self._afetch_pages(params, self._page_numbers(math.ceil(total / WINDOW_PAGE_SIZE), WINDOW_PAGE_SIZE)[1:])
+                events += more if isinstance(more, list) else []
+            window = ticketmaster_event_cache.store(location, start, end, events, complete=len(events) >= total)
+
+        matches = window.search(keyword, start, end)
+        if not matches and not window.complete:
+            events, _ = await self._afetch_pages(self._query_params(keyword, location, start, end, self.page_size), self._page_numbers(pages, self.page_size))
+            if isinstance(events, str):
+                return events
+            window.add(events)
+            matches = window.search(keyword, start, end)
+        return self._to_output(matches, pages)
+
+    def _fetch_pages(self, params: Dict[str, Any], page_numbers: List[int]) -> Tuple[List[EventSummary], int]:
+        """Fetch result pages in parallel; returns the merged events and the API's total event count"""
+        def fetch_page(page):
+            response = get_session().get(TICKETMASTER_EVENTS_URL, params={**params, 'page': page})
+            return self._handle_response(response)
 
-        # Convert start_date and end_date from ISO 8601 string to datetime objects if they are not already
-        if isinstance(start_date, str):
-            start_date = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
-        if isinstance(end_date, str):
-            end_date = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
+        if len(page_numbers) <= 1:
+            return self._merge_results([fetch_page(page) for page in page_numbers])
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(page_numbers))) as executor:
+            results = list(executor.map(fetch_page, page_numbers))
+        return self._merge_results(results)
+
+    async def _afetch_pages(self, params: Dict[str, Any], page_numbers: List[int]) -> Tuple[List[EventSummary], int]:
+        """Fetch result pages with concurrent requests on the event loop"""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def fetch_page(page):
+            async with semaphore:
+                response = await get_async_client().get(TICKETMASTER_EVENTS_URL, params={**params, 'page': page})
+            return self._handle_response(response)
+
+        results = await asyncio.gather(*(fetch_page(page) for page in page_numbers))
+        return self._merge_results(results)
+
+    def _page_numbers(self, pages: int, page_size: int) -> List[int]:
+        # Stay inside the API's deep paging limit
+        max_pages = max(1, (MAX_DEEP_PAGING - 1) // page_size + 1)
+        return list(range(min(max(pages, 1), max_pages)))
+
+    def _merge_results(self, results: List[Any]) -> Tuple[List[EventSummary], int]:
+        """Merge the per-page event lists into one list without repeated events"""
+        merged: Dict[Any, EventSummary] = {}
+        errors = []
+        total = 0
+        for result in results:
+            if isinstance(result, str):
+                errors.append(result)
+                continue
+            events, page_total = result
+            total = max(total, page_total)
+            for event in events:
+                # Events without an id must not all collapse into one
+                merged.setdefault(event_key(event), event)
+
+        # Only report a failure when no page returned anything
+        if errors and not merged:
+            return errors[0], 0
+        return list(merged.values()), total
+
+    def _to_output(self, events: List[EventSummary], pages: int) -> List[Dict[str, Any]]:
+        if not events:
+            return "No events found for the specified query."
+        return [event.dict() for event in events[:max(pages, 1) * self.page_size]]
+
+    def _query_params(self, keyword: str, location: str, start_date: datetime, end_date: datetime, page_size: int) -> Dict[str, Any]:
+        print(colored(f"Received arguments - Keyword: {keyword}, Location: {location}, Start Date: {start_date}, End Date: {end_date}", "white", "on_grey"))
 
-        base_url = "https://app.ticketmaster.com/discovery/v2/events.json"
         params = {
             'apikey': os.environ['TICKETMASTER_API_KEY'],
-            'keyword': keyword,
             'locale': '*',
             'city': location,
             'startDateTime': datetime.strftime(start_date, "%Y-%m-%dT%H:%M:%SZ"),
-            'endDateTime': datetime.strftime(end_date, "%Y-%m-%dT%H:%M:%SZ")
+            'endDateTime': datetime.strftime(end_date, "%Y-%m-%dT%H:%M:%SZ"),
+            'size': page_size
         }
+        if keyword:
+            params['keyword'] = keyword
+        return params
 
-        response = requests.get(base_url, params=params)
+    def _handle_response(self, response) -> Tuple[List[EventSummary], int]:
         if response.status_code == 200:
             data = response.json()
-            if data['page']['totalElements'] == 0:
-                return "No events found for the specified query."
-            return data
+            # Pages past the last one come back without the _embedded block
+            events = [summarize_event(event) for event in data.get('_embedded', {}).get('events', [])]
+            return events, data.get('page', {}).get('totalElements', len(events))
         else:
             return f"Failed to retrieve data: {response.status_code}"
 
@@ -1,10 +1,11 @@
 from calendar_package.list_calendar_events import ListEventsTool
+from calendar_package.free_busy import FreeBusyTool
 from .models import PromptsList
 from datetime import date
 import json
 from generic_agent import GenericAgent
 
-def generate_prompts_from_model(prompt, personal_preferences=None, model_name="gpt-4o", pydantic_model=PromptsList, tools=[ListEventsTool()]):
+def generate_prompts_from_model(prompt, personal_preferences=None, model_name="gpt-4o", pydantic_model=PromptsList, tools=[ListEventsTool(), FreeBusyTool()]):
     """
     Generates a list of prompts based on a user-provided seed prompt and optional personal preferences
     using a specified language model.
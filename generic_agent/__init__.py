@@ -1,3 +1,6 @@
 from .generic_agent import GenericAgent
+from .partial_json import PartialJSONParser
+from .response_cache import ResponseCache, response_cache
+from .run_meter import Budget, RunMeter
 
-__all__ = ["GenericAgent"]
+__all__ = ["GenericAgent", "PartialJSONParser", "ResponseCache", "response_cache", "Budget", "RunMeter"]
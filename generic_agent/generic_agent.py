@@ -1,19 +1,69 @@
 # generic_agent.py
 
-from langchain.agents import AgentExecutor
-from langchain.agents.format_scratchpad import format_to_openai_function_messages
-from langchain_core.agents import AgentActionMessageLog, AgentFinish
+from langchain.agents.format_scratchpad.openai_tools import format_to_openai_tool_messages
+from langchain.agents.output_parsers.openai_tools import OpenAIToolAgentAction
+from langchain_core.agents import AgentFinish
+from langchain_core.messages import AIMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.runnables import RunnableLambda
 from langchain_openai import ChatOpenAI
+from http_client import openai_client_kwargs, replay_mode
+import asyncio
 import json
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from termcolor import colored
 
+from .partial_json import PartialJSONParser
+from .response_cache import LLM_CACHE_ENABLED, response_cache, response_key, schema_hash
+from .run_meter import RunMeter, active_meter
+
+# Compiled agents kept for reuse; the least recently built are dropped past this
+MAX_CACHED_AGENTS = 64
+# Tool calls from one model turn that run at the same time
+MAX_PARALLEL_TOOL_CALLS = 8
+
+# One ChatOpenAI client (and its HTTP connection pool) per model, shared by every GenericAgent
+_llms = {}
+# Compiled prompt | llm runnables keyed by (model, pydantic model, tool schemas)
+_agents = {}
+_lock = threading.Lock()
+
+
+def _get_llm(model_name):
+    # Replay mode swaps the HTTP transport, so it is part of the key
+    key = (model_name, replay_mode())
+    llm = _llms.get(key)
+    if llm is None:
+        with _lock:
+            llm = _llms.get(key)
+            if llm is None:
+                # stream_usage makes streamed responses report token usage to the run meter too
+                llm = _llms[key] = ChatOpenAI(model=model_name, temperature=0, stream_usage=True, **openai_client_kwargs())
+    return llm
+
+
+class MalformedToolCall(OpenAIToolAgentAction):
+    """A tool call whose arguments were not valid JSON; the error is sent back instead of running a tool"""
+    error: str
+
+
+def _remember(cache, key, value):
+    cache[key] = value
+    while len(cache) > MAX_CACHED_AGENTS:
+        cache.pop(next(iter(cache)))
+    return value
+
+
 class GenericAgent:
-    def __init__(self, model_name="gpt-4o", pydantic_model=None, tools=None):
+    def __init__(self, model_name="gpt-4o", pydantic_model=None, tools=None, cache_responses=None):
         self.model_name = model_name
         self.pydantic_model = pydantic_model
         self.tools = tools or []
+        # Answer repeated identical model calls from the on-disk response cache; defaults to the LLM_CACHE setting
+        self.cache_responses = LLM_CACHE_ENABLED if cache_responses is None else cache_responses
         self._validate_tools()
 
     def _validate_tools(self):
@@ -22,7 +72,26 @@ class GenericAgent:
                 raise ValueError(f"Invalid tool: {tool}. Each tool must have 'name', 'description', and 'args' attributes.")
 
 
+    def _agent_key(self):
+        return (self.model_name, replay_mode(), self.cache_responses, self.pydantic_model, tuple((type(tool), tool.name, tool.description) for tool in self.tools))
+
     def create_agent(self):
+        """Return the agent for this model, pydantic model and tool set, reusing the compiled prompt and model"""
+        return self._planner() | self.parse
+
+    def _planner(self):
+        # The prompt and bound model without the parser, so streaming runs can read the raw chunks
+        key = self._agent_key()
+        with _lock:
+            planner = _agents.get(key)
+        if planner is None:
+            # Built outside the lock: bind_tools serializing every schema is the slow part
+            planner = self._build_planner()
+            with _lock:
+                planner = _remember(_agents, key, _agents.get(key) or planner)
+        return planner
+
+    def _build_planner(self):
         agent_prompt = ChatPromptTemplate.from_messages(
             [
                 ("system", "You are a helpful assistant"),
@@ -31,42 +100,292 @@ class GenericAgent:
             ]
         )
 
-        llm = ChatOpenAI(model=self.model_name, temperature=0)
+        llm = _get_llm(self.model_name)
         tools_and_model = self.tools + [self.pydantic_model]
-        llm_with_tools = llm.bind_functions(tools_and_model)
-
+        llm_with_tools = llm.bind_tools(tools_and_model)
+        if self.cache_responses:
+            llm_with_tools = self._cached(llm_with_tools)
 
-        agent = (
+        planner = (
                 {
                     "input": lambda x: x["input"],
                     # Format agent scratchpad from intermediate steps
-                    "agent_scratchpad": lambda x: format_to_openai_function_messages(
+                    "agent_scratchpad": lambda x: format_to_openai_tool_messages(
                         x["intermediate_steps"]
                     ),
                 }
                 | agent_prompt
                 | llm_with_tools
-                | self.parse
         )
 
-        return agent
+        return planner
+
+    def _cached(self, llm_with_tools):
+        """Wrap the bound model so identical message lists are answered from the response cache"""
+        schemas = schema_hash(llm_with_tools.kwargs.get("tools"))
+        model_name = self.model_name
 
-    def generate_response(self, prompt):
+        def key_for(prompt_value):
+            # Only what the model sees: run ids and token usage of earlier responses would defeat exact matching
+            messages = [
+                {"type": message.type, "content": message.content, "name": getattr(message, "name", None),
+                 "tool_call_id": getattr(message, "tool_call_id", None), "additional_kwargs": message.additional_kwargs}
+                for message in prompt_value.to_messages()
+            ]
+            return response_key(model_name, messages, schemas)
 
-        # Create and use the agent
-        agent = self.create_agent()
-        agent_executor = AgentExecutor(tools=self.tools, agent=agent)
+        def to_message(cached):
+            data = json.loads(cached)
+            return AIMessage(content=data["content"], additional_kwargs=data["additional_kwargs"],
+                             tool_calls=data.get("tool_calls", []), invalid_tool_calls=data.get("invalid_tool_calls", []))
 
-        response = agent_executor.invoke(
-            {"input": prompt},
-            return_only_outputs=True,
-        )
+        def to_cached(message):
+            return json.dumps({"content": message.content, "additional_kwargs": message.additional_kwargs,
+                               "tool_calls": message.tool_calls, "invalid_tool_calls": message.invalid_tool_calls})
+
+        def invoke(prompt_value, config):
+            key = key_for(prompt_value)
+            cached = response_cache.get(key)
+            if cached is not None:
+                return to_message(cached)
+            message = llm_with_tools.invoke(prompt_value, config=config)
+            response_cache.put(key, model_name, to_cached(message))
+            return message
+
+        async def ainvoke(prompt_value, config):
+            key = key_for(prompt_value)
+            cached = await asyncio.to_thread(response_cache.get, key)
+            if cached is not None:
+                return to_message(cached)
+            message = await llm_with_tools.ainvoke(prompt_value, config=config)
+            await asyncio.to_thread(response_cache.put, key, model_name, to_cached(message))
+            return message
+
+        return RunnableLambda(invoke, afunc=ainvoke)
+
+    def generate_response(self, prompt, meter=None):
+        """
+        Run the agent until it answers with pydantic_model, returning the answer's fields as a dict.
+
+        meter (RunMeter, optional) records the run's turns, tokens and tool timings and carries its
+        Budget; once a limit is reached the run stops with a partial result (see _stopped).
+        """
+        meter = self._start_meter(meter)
+        # Reuse the compiled prompt and model; it is safe to invoke from several threads at once
+        planner = self._planner()
+        tools = {tool.name: tool for tool in self.tools}
+
+        intermediate_steps = []
+        while True:
+            reason = meter.exceeded()
+            if reason:
+                return self._stopped(reason, meter, intermediate_steps)
+            started = time.perf_counter()
+            message = planner.invoke({"input": prompt, "intermediate_steps": intermediate_steps})
+            output = self.parse(message)
+            meter.record_turn(message, time.perf_counter() - started, self._tool_names(output))
+            if isinstance(output, AgentFinish):
+                return self._finished(output.return_values, meter)
+            intermediate_steps.extend(self._run_tools(output, tools, meter))
 
-        return response
+    async def agenerate_response(self, prompt, meter=None):
+        """
+        Async counterpart of generate_response, returning the answer's fields as a dict.
+
+        The model is awaited and the tool calls of each turn run concurrently through the tools'
+        _arun implementations. meter (RunMeter, optional) records the run and carries its Budget
+        exactly as in generate_response.
+        """
+        meter = self._start_meter(meter)
+        # Reuse the compiled prompt and model; tools run through their async _arun implementations
+        planner = self._planner()
+        tools = {tool.name: tool for tool in self.tools}
+
+        intermediate_steps = []
+        while True:
+            reason = meter.exceeded()
+            if reason:
+                return self._stopped(reason, meter, intermediate_steps)
+            started = time.perf_counter()
+            message = await planner.ainvoke({"input": prompt, "intermediate_steps": intermediate_steps})
+            output = self.parse(message)
+            meter.record_turn(message, time.perf_counter() - started, self._tool_names(output))
+            if isinstance(output, AgentFinish):
+                return self._finished(output.return_values, meter)
+            intermediate_steps.extend(await self._arun_tools(output, tools, meter))
+
+    def stream_response(self, prompt, paths=(), meter=None):
+        """
+        Run the agent like generate_response, yielding parts of the final answer while the model writes it.
+
+        The final pydantic_model call is streamed and scanned as its arguments arrive. Every object or
+        array found at one of paths (tuples of keys and indexes, with partial_json.ANY as a wildcard) is
+        yielded as (path, value) the moment it is complete. The last item is ((), answer), where answer
+        is the dict generate_response would have returned. The meter's budget is also checked between
+        streamed chunks, so a run that runs out of time keeps the parts it already yielded.
+
+        Example:
+            >>> from generic_agent.partial_json import ANY
+            >>> for path, value in agent.stream_response(prompt, paths=[("destinations", ANY)]):
+            ...     print(path, value)
+        """
+        meter = self._start_meter(meter)
+        planner = self._planner()
+        tools = {tool.name: tool for tool in self.tools}
+        paths = [tuple(path) for path in paths if tuple(path) != ()]
+
+        intermediate_steps = []
+        while True:
+            reason = meter.exceeded()
+            if reason:
+                yield (), self._stopped(reason, meter, intermediate_steps)
+                return
+            completed = []
+            parser = PartialJSONParser(paths, lambda path, value: completed.append((path, value)))
+            answer_indexes = set()
+            yielded = []
+            output = None
+            started = time.perf_counter()
+            for chunk in planner.stream({"input": prompt, "intermediate_steps": intermediate_steps}):
+                # Checked before each chunk, so a turn that delivers its last chunk in time is never cut off
+                reason = meter.exceeded()
+                if reason:
+                    break
+                output = chunk if output is None else output + chunk
+                # Only the name's first chunk carries it; later argument chunks share its index
+                for tool_call_chunk in getattr(chunk, "tool_call_chunks", None) or []:
+                    if tool_call_chunk.get("name") == self.pydantic_model.__name__:
+                        answer_indexes.add(tool_call_chunk.get("index"))
+                    if tool_call_chunk.get("index") in answer_indexes and tool_call_chunk.get("args"):
+                        parser.feed(tool_call_chunk["args"])
+                yielded.extend(completed)
+                yield from completed
+                completed.clear()
+
+            if reason:
+                meter.record_turn(output, time.perf_counter() - started, [])
+                # Whatever the model had written of its answer, closed off as far as it parses
+                answer = next((tool_call["args"] for tool_call in getattr(output, "tool_calls", None) or []
+                               if tool_call["name"] == self.pydantic_model.__name__), None)
+                yield (), self._stopped(reason, meter, intermediate_steps, answer)
+                return
+
+            if output is None:
+                # The stream ended without a single chunk: ask for the whole response instead
+                output = planner.invoke({"input": prompt, "intermediate_steps": intermediate_steps})
+            result = self.parse(output)
+            meter.record_turn(output, time.perf_counter() - started, self._tool_names(result))
+            if isinstance(result, AgentFinish):
+                if paths and (not parser.text or parser.failed):
+                    # The answer arrived whole (a cached response or JSON content) or did not scan cleanly
+                    PartialJSONParser(paths, lambda path, value: completed.append((path, value))).feed(json.dumps(result.return_values))
+                    yield from (item for item in completed if item not in yielded)
+                yield (), self._finished(result.return_values, meter)
+                return
+            intermediate_steps.extend(self._run_tools(result, tools, meter))
+
+    def _start_meter(self, meter):
+        # A run started by another run's tool is metered as part of that run too
+        meter = meter or RunMeter(parent=active_meter.get())
+        meter.model_name = meter.model_name or self.model_name
+        meter.start()
+        return meter
+
+    def _tool_names(self, output):
+        return [] if isinstance(output, AgentFinish) else [action.tool for action in output]
+
+    def _finished(self, answer, meter):
+        meter.finish()
+        print(colored(f"Agent finished: {meter.describe()}.", "white", "on_grey"))
+        return answer
+
+    def _stopped(self, reason, meter, intermediate_steps, answer=None):
+        """The result of a run cut short by its budget: what the tools returned so far, and any partial answer"""
+        meter.finish(stopped=reason)
+        print(colored(f"Agent stopped without a final answer, {reason}: {meter.describe()}.", "red"))
+        return {
+            "output": "Agent stopped due to iteration limit or time limit.",
+            "stopped": reason,
+            "partial": {
+                "answer": answer,
+                "tool_results": [{"tool": action.tool, "tool_input": action.tool_input, "observation": observation}
+                                 for action, observation in intermediate_steps],
+            },
+        }
+
+    def _run_tools(self, actions, tools, meter):
+        """Run every tool call of one model turn, concurrently when there are several, returning (action, observation) pairs in call order"""
+        if len(actions) == 1:
+            return [(actions[0], self._run_tool(actions[0], tools, meter))]
+        print(colored(f"Running {len(actions)} tool calls in parallel.", "yellow"))
+        with ThreadPoolExecutor(max_workers=min(len(actions), MAX_PARALLEL_TOOL_CALLS)) as pool:
+            observations = list(pool.map(lambda action: self._run_tool(action, tools, meter), actions))
+        return list(zip(actions, observations))
+
+    async def _arun_tools(self, actions, tools, meter):
+        if len(actions) > 1:
+            print(colored(f"Running {len(actions)} tool calls in parallel.", "yellow"))
+        semaphore = asyncio.Semaphore(MAX_PARALLEL_TOOL_CALLS)
+
+        async def run(action):
+            async with semaphore:
+                return await self._arun_tool(action, tools, meter)
+
+        observations = await asyncio.gather(*(run(action) for action in actions))
+        return list(zip(actions, observations))
+
+    def _run_tool(self, action, tools, meter):
+        if isinstance(action, MalformedToolCall):
+            return action.error
+        tool = tools.get(action.tool)
+        if tool is None:
+            return self._invalid_tool(action, tools)
+        started = time.perf_counter()
+        # Set in the thread running the tool, so an agent the tool runs records into this run's meter
+        token = active_meter.set(meter)
+        try:
+            observation = tool.run(action.tool_input)
+        except Exception as e:
+            meter.record_tool(action.tool, time.perf_counter() - started, error=str(e))
+            return self._tool_error(action, e)
+        finally:
+            active_meter.reset(token)
+        meter.record_tool(action.tool, time.perf_counter() - started)
+        return observation
+
+    async def _arun_tool(self, action, tools, meter):
+        if isinstance(action, MalformedToolCall):
+            return action.error
+        tool = tools.get(action.tool)
+        if tool is None:
+            return self._invalid_tool(action, tools)
+        started = time.perf_counter()
+        # Each gathered call runs in its own copy of the context, so this only reaches the agents this tool runs
+        token = active_meter.set(meter)
+        try:
+            observation = await tool.arun(action.tool_input)
+        except Exception as e:
+            meter.record_tool(action.tool, time.perf_counter() - started, error=str(e))
+            return self._tool_error(action, e)
+        finally:
+            active_meter.reset(token)
+        meter.record_tool(action.tool, time.perf_counter() - started)
+        return observation
+
+    def _tool_error(self, action, error):
+        # Sent back to the model like any other observation: one failing tool must not cancel the calls
+        # running beside it or end the run
+        print(colored(f"Tool {action.tool} failed: {error}", "red"))
+        return f"Error running {action.tool}: {type(error).__name__}: {error}"
+
+    def _invalid_tool(self, action, tools):
+        # Sent back to the model as AgentExecutor did, so it can correct the call
+        return f"{action.tool} is not a valid tool, try one of [{', '.join(tools)}]."
 
     def parse(self, output):
+        invalid_tool_calls = getattr(output, "invalid_tool_calls", None) or []
         # If no function was invoked, return to user
-        if "function_call" not in output.additional_kwargs:
+        if not output.tool_calls and not invalid_tool_calls:
             print(colored("No function call detected in the output. Attempting to parse output content as JSON.", "blue"))
             try:
                 # Try to parse the output content as JSON
@@ -79,20 +398,31 @@ class GenericAgent:
                 print(colored(f"JSON decode error: {e}", "red"))
                 sys.exit()
 
-        # Parse out the function call
-        print(colored("Function call detected. Extracting function name and arguments.", "yellow"))
-        function_call = output.additional_kwargs["function_call"]
-        name = function_call["name"]
-        inputs = json.loads(function_call["arguments"])
-        print(colored(f"Function name: {name}", "yellow"))
-        print(colored(f"Function inputs: {inputs}", "yellow"))
-
-        # If the function corresponding to pydantic_model was invoked, return to the user with the function inputs
-        if name != self.pydantic_model.__name__:
-            print(colored("Function name does not match pydantic model. Returning agent action.", "yellow"))
-            return AgentActionMessageLog(
-                tool=name, tool_input=inputs, log="", message_log=[output]
-            )
-        else:
-            print(colored("Function name matches pydantic model. Returning function inputs to the user.", "green"))
-            return AgentFinish(return_values=inputs, log=str(function_call))
+        # Parse out the tool calls; the model may request several independent ones in one turn
+        print(colored(f"{len(output.tool_calls) + len(invalid_tool_calls)} tool call(s) detected. Extracting tool names and arguments.", "yellow"))
+        actions = []
+        for tool_call in output.tool_calls:
+            name = tool_call["name"]
+            inputs = tool_call["args"]
+            print(colored(f"Function name: {name}", "yellow"))
+            print(colored(f"Function inputs: {inputs}", "yellow"))
+
+            # If the function corresponding to pydantic_model was invoked, return to the user with the function inputs
+            if name == self.pydantic_model.__name__:
+                print(colored("Function name matches pydantic model. Returning function inputs to the user.", "green"))
+                return AgentFinish(return_values=inputs, log=str(tool_call))
+            actions.append(OpenAIToolAgentAction(
+                tool=name, tool_input=inputs, log="", message_log=[output], tool_call_id=tool_call["id"]
+            ))
+
+        # Calls whose arguments are not valid JSON go back to the model as errors so it can send them again
+        for tool_call in invalid_tool_calls:
+            name = tool_call.get("name") or "unknown"
+            print(colored(f"Malformed arguments for {name}: {tool_call.get('error')}", "red"))
+            actions.append(MalformedToolCall(
+                tool=name, tool_input=tool_call.get("args") or "", log="", message_log=[output], tool_call_id=tool_call.get("id") or "",
+                error=f"Could not parse the arguments of {name}: {tool_call.get('error') or 'invalid JSON'}. Call {name} again with valid JSON arguments.",
+            ))
+
+        print(colored("Function names do not match pydantic model. Returning agent actions.", "yellow"))
+        return actions
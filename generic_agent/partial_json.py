@@ -0,0 +1,134 @@
+# partial_json.py
+
+import json
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+
+# Matches any array index or object key in a watched path
+ANY = "*"
+
+Path = Tuple[Any, ...]
+
+_WHITESPACE = " \t\r\n"
+
+
+class _Frame:
+    __slots__ = ("kind", "key", "index", "expect_key", "start", "path")
+
+    def __init__(self, kind: str, path: Path, start: Optional[int]):
+        self.kind = kind
+        self.path = path
+        # Offset of the opening bracket when this container is watched, else None
+        self.start = start
+        self.key = None
+        self.index = 0
+        self.expect_key = kind == "{"
+
+
+class PartialJSONParser:
+    """
+    Incremental scanner that reports JSON objects and arrays as soon as they close.
+
+    Feed it the text of one JSON document in arbitrary chunks, e.g. the argument fragments
+    of a streamed tool call. Every container whose path matches one of the watched paths is
+    decoded and passed to on_value(path, value) the moment its closing bracket arrives, so
+    the first destination of an itinerary is available long before the last one is written.
+    Paths are tuples of keys and indexes, with ANY matching any of them; () is the document.
+
+    Each character is scanned once, so feeding a document costs O(len) however it is split.
+
+    Example:
+        >>> parser = PartialJSONParser([("destinations", ANY)], lambda path, value: print(path, value))
+        >>> parser.feed('{"destinations": [{"location": "Par')
+        >>> parser.feed('is"}, {"location"')
+        ('destinations', 0) {'location': 'Paris'}
+    """
+
+    def __init__(self, paths: Iterable[Path], on_value: Callable[[Path, Any], None]):
+        self.paths = [tuple(path) for path in paths]
+        self.on_value = on_value
+        self.failed = False
+        self._text = ""
+        self._offset = 0
+        self._stack: List[_Frame] = []
+        self._in_string = False
+        self._escaped = False
+        self._string_start = 0
+        self._done = False
+
+    def _watched(self, path: Path) -> bool:
+        return any(
+            len(pattern) == len(path) and all(part == ANY or part == step for part, step in zip(pattern, path))
+            for pattern in self.paths
+        )
+
+    def _value_path(self) -> Path:
+        if not self._stack:
+            return ()
+        frame = self._stack[-1]
+        return frame.path + ((frame.key if frame.kind == "{" else frame.index),)
+
+    def feed(self, chunk: str) -> None:
+        """Scan the next piece of the document, reporting every watched container it completes."""
+        if self.failed or self._done or not chunk:
+            return
+        self._text += chunk
+        completed: List[Tuple[Path, Any]] = []
+        try:
+            self._scan(completed)
+        except (ValueError, IndexError):
+            # Malformed output: stop reporting and leave it to whoever parses the complete document
+            self.failed = True
+        # Reported outside the scan so errors raised by on_value reach the caller
+        for path, value in completed:
+            self.on_value(path, value)
+
+    def _scan(self, completed: List[Tuple[Path, Any]]) -> None:
+        text = self._text
+        for position in range(self._offset, len(text)):
+            char = text[position]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    frame = self._stack[-1] if self._stack else None
+                    if frame is not None and frame.kind == "{" and frame.expect_key:
+                        frame.key = json.loads(text[self._string_start:position + 1])
+                        frame.expect_key = False
+                continue
+
+            if char in _WHITESPACE or char == ":":
+                continue
+            if char == ",":
+                frame = self._stack[-1]
+                if frame.kind == "{":
+                    frame.expect_key = True
+                else:
+                    frame.index += 1
+                continue
+            if char in "}]":
+                frame = self._stack.pop()
+                if char != ("}" if frame.kind == "{" else "]"):
+                    raise ValueError(f"Mismatched {char!r} at offset {position}")
+                if frame.start is not None:
+                    completed.append((frame.path, json.loads(text[frame.start:position + 1])))
+                if not self._stack:
+                    self._done = True
+                    break
+                continue
+            if char == '"':
+                self._in_string = True
+                self._string_start = position
+                continue
+            if char in "{[":
+                path = self._value_path()
+                self._stack.append(_Frame(char, path, position if self._watched(path) else None))
+            # Numbers, true, false and null need no tracking: only containers are reported
+        self._offset = len(text)
+
+    @property
+    def text(self) -> str:
+        """Everything fed so far."""
+        return self._text
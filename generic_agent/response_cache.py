@@ -0,0 +1,191 @@
+# response_cache.py
+
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+# Opt in with LLM_CACHE=1 (or GenericAgent(cache_responses=True)); responses are stored in LLM_CACHE_PATH
+LLM_CACHE_ENABLED = os.environ.get("LLM_CACHE", "").strip().lower() in ("1", "true", "yes", "on")
+LLM_CACHE_PATH = os.environ.get("LLM_CACHE_PATH", "llm_cache.sqlite")
+# Entries older than this are evicted
+DEFAULT_MAX_AGE_SECONDS = float(os.environ.get("LLM_CACHE_MAX_AGE", 7 * 24 * 60 * 60))
+# Least recently used entries are evicted once the stored responses exceed this size
+DEFAULT_MAX_BYTES = int(float(os.environ.get("LLM_CACHE_MAX_MB", 100)) * 1024 * 1024)
+# Eviction runs after this many writes rather than on every one
+EVICT_EVERY_WRITES = 50
+# Hit and miss counts and last-use times are kept in memory and written to the file once this many lookups have accumulated
+COUNTER_FLUSH_EVERY = 50
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_by_used_at ON responses (used_at);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def response_key(model_name: str, messages: List[Dict[str, Any]], schema_hash: str) -> str:
+    """Hash of everything that determines a temperature 0 response: model, full message list and bound schemas."""
+    payload = json.dumps({"model": model_name, "messages": messages, "schemas": schema_hash}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def schema_hash(schemas: Any) -> str:
+    return hashlib.sha256(json.dumps(schemas, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    On-disk exact-match cache of model responses.
+
+    Entries expire after max_age_seconds, and once the stored responses grow past max_bytes
+    the least recently used are dropped. Lookups only read: hits, misses and the time each
+    entry was last used are kept in memory and written to the file every COUNTER_FLUSH_EVERY
+    lookups, before eviction and at exit, so the stats cover every process and session that
+    used it.
+
+    Example:
+        >>> from generic_agent.response_cache import response_cache
+        >>> response_cache.stats()
+        {'hits': 42, 'misses': 17, 'entries': 17, 'bytes': 80213}
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH, max_age_seconds: float = DEFAULT_MAX_AGE_SECONDS, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_age_seconds = max_age_seconds
+        self.max_bytes = max_bytes
+        self._initialized = False
+        self._writes = 0
+        self._pending = {"hits": 0, "misses": 0}
+        self._used: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=10)
+        if not self._initialized:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+            self._initialized = True
+        return connection
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the stored response for a key, or None. Counts a hit or a miss."""
+        connection = self._connect()
+        try:
+            row = connection.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+        finally:
+            connection.close()
+        now = time.time()
+        # Expired entries are left for evict() to delete
+        if row is not None and now - row[1] > self.max_age_seconds:
+            row = None
+        with self._lock:
+            self._pending["hits" if row else "misses"] += 1
+            if row is not None:
+                self._used[key] = now
+            flush = sum(self._pending.values()) >= COUNTER_FLUSH_EVERY
+        if flush:
+            self.flush()
+        return row[0] if row else None
+
+    def put(self, key: str, model_name: str, response: str) -> None:
+        now = time.time()
+        connection = self._connect()
+        try:
+            with connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO responses (key, model, response, size, created_at, used_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, model_name, response, len(response.encode("utf-8")), now, now),
+                )
+        finally:
+            connection.close()
+        with self._lock:
+            self._writes += 1
+            evict = self._writes % EVICT_EVERY_WRITES == 1
+        if evict:
+            self.evict()
+
+    def evict(self) -> int:
+        """Drop expired entries, then least recently used ones until the cache fits max_bytes. Returns entries removed."""
+        self.flush()
+        connection = self._connect()
+        try:
+            with connection:
+                removed = connection.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.max_age_seconds,)).rowcount
+                total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+                if total > self.max_bytes:
+                    excess = total - self.max_bytes
+                    freed = 0
+                    stale = []
+                    for key, size in connection.execute("SELECT key, size FROM responses ORDER BY used_at"):
+                        if freed >= excess:
+                            break
+                        stale.append((key,))
+                        freed += size
+                    connection.executemany("DELETE FROM responses WHERE key = ?", stale)
+                    removed += len(stale)
+        finally:
+            connection.close()
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        self.flush()
+        connection = self._connect()
+        try:
+            counters = dict(connection.execute("SELECT name, value FROM counters").fetchall())
+            entries, size = connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        finally:
+            connection.close()
+        return {"hits": counters.get("hits", 0), "misses": counters.get("misses", 0), "entries": entries, "bytes": size}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pending = {"hits": 0, "misses": 0}
+            self._used = {}
+        connection = self._connect()
+        try:
+            with connection:
+                connection.execute("DELETE FROM responses")
+                connection.execute("DELETE FROM counters")
+        finally:
+            connection.close()
+
+    def flush(self) -> None:
+        """Write the hits, misses and last-use times recorded in memory to the file."""
+        with self._lock:
+            pending = {name: count for name, count in self._pending.items() if count}
+            used = self._used
+            self._pending = {"hits": 0, "misses": 0}
+            self._used = {}
+        if not pending and not used:
+            return
+        connection = self._connect()
+        try:
+            with connection:
+                connection.executemany(
+                    "INSERT INTO counters (name, value) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                    list(pending.items()),
+                )
+                connection.executemany("UPDATE responses SET used_at = MAX(used_at, ?) WHERE key = ?",
+                                       [(used_at, key) for key, used_at in used.items()])
+        finally:
+            connection.close()
+
+
+# Shared by every GenericAgent in the process that has caching enabled
+response_cache = ResponseCache()
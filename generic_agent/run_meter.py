@@ -0,0 +1,187 @@
+# run_meter.py
+
+import json
+import os
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Any, Dict, List, NamedTuple, Optional
+
+# Model turns allowed when a run sets no budget of its own, as AgentExecutor did
+DEFAULT_MAX_TURNS = 15
+# When set, every metered run is appended to this JSON lines file
+RUN_METER_LOG = os.environ.get("RUN_METER_LOG", "")
+# USD per million (prompt, completion) tokens; runs on other models report no cost
+PRICES_PER_MILLION_TOKENS = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+}
+
+
+class Budget(NamedTuple):
+    """Hard limits for one agent run; None means unlimited."""
+    max_turns: Optional[int] = DEFAULT_MAX_TURNS
+    max_tokens: Optional[int] = None
+    max_seconds: Optional[float] = None
+
+
+# The meter of the run whose tool is executing; an agent run started by the tool records into it as well
+active_meter: ContextVar[Optional["RunMeter"]] = ContextVar("active_meter", default=None)
+
+
+def token_usage(message: Any) -> Dict[str, int]:
+    """Prompt and completion tokens of one model response, 0 when the response carries no usage (e.g. a cached one)."""
+    usage = getattr(message, "usage_metadata", None)
+    if usage:
+        return {"prompt_tokens": usage.get("input_tokens", 0), "completion_tokens": usage.get("output_tokens", 0)}
+    usage = (getattr(message, "response_metadata", None) or {}).get("token_usage") or {}
+    return {"prompt_tokens": usage.get("prompt_tokens", 0), "completion_tokens": usage.get("completion_tokens", 0)}
+
+
+def token_cost(model_name: Optional[str], prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+    prices = PRICES_PER_MILLION_TOKENS.get(model_name)
+    if prices is None:
+        return None
+    return (prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1_000_000
+
+
+class RunMeter:
+    """
+    Records what one GenericAgent run spends and enforces its Budget.
+
+    Every model turn is recorded with its latency, token usage and the tools it asked for,
+    and every tool call with its wall time. The agent checks exceeded() before each turn (and
+    between streamed chunks), and stops with a partial result once a limit is reached. Each
+    run starts the meter over, so after a run it holds that run only.
+
+    A run started inside a tool (LocationCoordinatesTool runs an agent of its own) gets a meter
+    whose parent is the calling run's. Its turns and tool calls are recorded in the parent too,
+    marked nested: they add to the parent's tokens, cost and tool time but not to its turn
+    count. The parent's budget stops the nested run as well, and only the outermost meter is
+    written to RUN_METER_LOG.
+
+    Example:
+        >>> from generic_agent import Budget, GenericAgent, RunMeter
+        >>> meter = RunMeter(Budget(max_turns=6, max_tokens=50000, max_seconds=90))
+        >>> result = GenericAgent(pydantic_model=Itinerary, tools=tools).generate_response(prompt, meter=meter)
+        >>> meter.summary()
+        {'run_id': '...', 'model': 'gpt-4o', 'turns': 4, 'prompt_tokens': 21304, ...}
+        >>> meter.dump_jsonl("runs.jsonl")
+    """
+
+    def __init__(self, budget: Optional[Budget] = None, model_name: Optional[str] = None, parent: Optional["RunMeter"] = None):
+        self.budget = budget or Budget()
+        self.model_name = model_name
+        self.parent = parent
+        self.run_id = uuid.uuid4().hex
+        self.steps: List[Dict[str, Any]] = []
+        self.tool_calls: List[Dict[str, Any]] = []
+        self.stopped: Optional[str] = None
+        self._started: Optional[float] = None
+        self._finished: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Begin a run. A meter passed to several runs measures each one afresh, against the full budget."""
+        with self._lock:
+            self.run_id = uuid.uuid4().hex
+            self.steps = []
+            self.tool_calls = []
+            self.stopped = None
+            self._finished = None
+            self._started = time.perf_counter()
+
+    def finish(self, stopped: Optional[str] = None) -> None:
+        self._finished = time.perf_counter()
+        self.stopped = stopped
+        if RUN_METER_LOG and self.parent is None:
+            self.dump_jsonl(RUN_METER_LOG)
+
+    @property
+    def elapsed(self) -> float:
+        if self._started is None:
+            return 0.0
+        return (self._finished or time.perf_counter()) - self._started
+
+    @property
+    def turns(self) -> int:
+        """Model turns of this run itself, without those of nested runs."""
+        return sum(1 for step in self.steps if not step["nested"])
+
+    @property
+    def prompt_tokens(self) -> int:
+        return sum(step["prompt_tokens"] for step in self.steps)
+
+    @property
+    def completion_tokens(self) -> int:
+        return sum(step["completion_tokens"] for step in self.steps)
+
+    def record_turn(self, message: Any, seconds: float, tool_names: List[str], nested: bool = False) -> None:
+        usage = token_usage(message)
+        with self._lock:
+            self.steps.append({
+                "turn": len(self.steps) + 1,
+                "seconds": round(seconds, 4),
+                **usage,
+                "cost_usd": token_cost(self.model_name, usage["prompt_tokens"], usage["completion_tokens"]),
+                "tool_calls": tool_names,
+                "nested": nested,
+            })
+        if self.parent is not None:
+            self.parent.record_turn(message, seconds, tool_names, nested=True)
+
+    def record_tool(self, name: str, seconds: float, error: Optional[str] = None, nested: bool = False) -> None:
+        with self._lock:
+            self.tool_calls.append({"turn": len(self.steps), "tool": name, "seconds": round(seconds, 4), "error": error, "nested": nested})
+        if self.parent is not None:
+            self.parent.record_tool(name, seconds, error, nested=True)
+
+    def exceeded(self) -> Optional[str]:
+        """Which limit the run has reached, or None while it is within budget."""
+        budget = self.budget
+        if budget.max_turns is not None and self.turns >= budget.max_turns:
+            return f"max_turns ({budget.max_turns}) reached"
+        if budget.max_tokens is not None and self.prompt_tokens + self.completion_tokens >= budget.max_tokens:
+            return f"max_tokens ({budget.max_tokens}) reached"
+        if budget.max_seconds is not None and self.elapsed >= budget.max_seconds:
+            return f"max_seconds ({budget.max_seconds}) reached"
+        return self.parent.exceeded() if self.parent is not None else None
+
+    def summary(self) -> Dict[str, Any]:
+        tool_seconds: Dict[str, float] = {}
+        for call in self.tool_calls:
+            tool_seconds[call["tool"]] = round(tool_seconds.get(call["tool"], 0.0) + call["seconds"], 4)
+        prompt_tokens, completion_tokens = self.prompt_tokens, self.completion_tokens
+        return {
+            "run_id": self.run_id,
+            "model": self.model_name,
+            "turns": self.turns,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "cost_usd": token_cost(self.model_name, prompt_tokens, completion_tokens),
+            "tool_calls": len(self.tool_calls),
+            "tool_seconds": tool_seconds,
+            "model_seconds": round(sum(step["seconds"] for step in self.steps), 4),
+            "seconds": round(self.elapsed, 4),
+            "stopped": self.stopped,
+        }
+
+    def records(self) -> List[Dict[str, Any]]:
+        """One record per model turn, one per tool call, then the run summary."""
+        return ([{"run_id": self.run_id, "type": "turn", **step} for step in self.steps]
+                + [{"run_id": self.run_id, "type": "tool", **call} for call in self.tool_calls]
+                + [{"type": "run", **self.summary()}])
+
+    def dump_jsonl(self, path: str) -> None:
+        """Append this run's records to a JSON lines file."""
+        with open(path, "a", encoding="utf-8") as log:
+            for record in self.records():
+                log.write(json.dumps(record) + "\n")
+
+    def describe(self) -> str:
+        summary = self.summary()
+        cost = f", ${summary['cost_usd']:.4f}" if summary["cost_usd"] is not None else ""
+        return (f"{summary['turns']} model turns, {summary['prompt_tokens']} prompt + {summary['completion_tokens']} completion tokens{cost}, "
+                f"{summary['tool_calls']} tool calls, {summary['seconds']:.2f}s")
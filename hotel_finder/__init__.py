@@ -1,3 +1,6 @@
 from .amadeus_list import AmadeusHotelListTool
-from .amadeus_offers import AmadeusHotelOffersTool
+from .amadeus_offers import AmadeusHotelOffersTool, HotelOfferSummary
 from .amadeus_book import AmadeusHotelBookingTool
+from .amadeus_auth import AmadeusTokenProvider, amadeus_token_provider
+from .geo_cache import HotelGeoCache, hotel_geo_cache
+from .offers_cache import OffersCache, hotel_offers_cache
@@ -0,0 +1,123 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+import requests
+
+from http_client import get_session
+
+AMADEUS_TOKEN_URL = "https://test.api.amadeus.com/v1/security/oauth2/token"  # Use "https://api.amadeus.com" for production
+
+# Treat a token as expired this many seconds before Amadeus does
+REFRESH_MARGIN_SECONDS = 60
+# Start refreshing in the background this many seconds before the refresh margin is reached
+BACKGROUND_REFRESH_SECONDS = 300
+
+
+class AmadeusTokenProvider:
+    """
+    Caches Amadeus OAuth access tokens per API key until shortly before they expire.
+
+    Tokens that are close to expiry are refreshed on a background thread while the
+    current token keeps being served. Concurrent refreshes of the same credentials are
+    collapsed into a single request to the token endpoint.
+    """
+
+    def __init__(self, token_url: str = AMADEUS_TOKEN_URL, refresh_margin: float = REFRESH_MARGIN_SECONDS, background_refresh: float = BACKGROUND_REFRESH_SECONDS):
+        self.token_url = token_url
+        self.refresh_margin = refresh_margin
+        self.background_refresh = background_refresh
+        self._tokens: Dict[Tuple[str, str], Tuple[str, float]] = {}
+        self._key_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._background: set = set()
+        self._lock = threading.Lock()
+
+    def get_access_token(self, api_key: str, api_secret: str) -> Optional[str]:
+        """Return a valid access token, fetching a new one only when the cached token is missing or expiring."""
+        key = (api_key, api_secret)
+        cached = self._tokens.get(key)
+        if cached:
+            token, expires_at = cached
+            remaining = expires_at - self.refresh_margin - time.monotonic()
+            if remaining > 0:
+                if remaining < self.background_refresh:
+                    self._refresh_in_background(key, token)
+                return token
+        return self._refresh(key, cached[0] if cached else None)
+
+    async def aget_access_token(self, api_key: str, api_secret: str) -> Optional[str]:
+        """Async variant of get_access_token. Only a cache miss leaves the event loop, to fetch on a worker thread."""
+        cached = self._tokens.get((api_key, api_secret))
+        if cached and cached[1] - self.refresh_margin - time.monotonic() > 0:
+            return self.get_access_token(api_key, api_secret)
+        return await asyncio.to_thread(self.get_access_token, api_key, api_secret)
+
+    def invalidate(self, api_key: str, api_secret: str) -> None:
+        """Drop the cached token, e.g. after the API rejected it with a 401."""
+        with self._lock:
+            self._tokens.pop((api_key, api_secret), None)
+
+    def _key_lock(self, key: Tuple[str, str]) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _refresh(self, key: Tuple[str, str], seen_token: Optional[str]) -> Optional[str]:
+        with self._key_lock(key):
+            # Another thread may have refreshed the token while we were waiting for the lock
+            cached = self._tokens.get(key)
+            if cached and cached[0] != seen_token and cached[1] - self.refresh_margin > time.monotonic():
+                return cached[0]
+            return self._fetch(key)
+
+    def _refresh_in_background(self, key: Tuple[str, str], seen_token: str) -> None:
+        with self._lock:
+            if key in self._background:
+                return
+            self._background.add(key)
+
+        def refresh():
+            try:
+                self._refresh(key, seen_token)
+            finally:
+                with self._lock:
+                    self._background.discard(key)
+
+        threading.Thread(target=refresh, name="amadeus-token-refresh", daemon=True).start()
+
+    def _fetch(self, key: Tuple[str, str]) -> Optional[str]:
+        api_key, api_secret = key
+        headers = {
+            "Content-Type": "application/x-www-form-urlencoded"
+        }
+        data = {
+            "grant_type": "client_credentials",
+            "client_id": api_key,
+            "client_secret": api_secret
+        }
+        try:
+            response = get_session().post(self.token_url, headers=headers, data=data)
+        except requests.RequestException:
+            return None
+        if response.status_code != 200:
+            return None
+        body = response.json()
+        token = body.get("access_token")
+        if token:
+            expires_at = time.monotonic() + float(body.get("expires_in", 0))
+            with self._lock:
+                self._tokens[key] = (token, expires_at)
+        return token
+
+
+def amadeus_credentials() -> Optional[Tuple[str, str]]:
+    """Read the Amadeus API key and secret from the environment, or None if either is missing."""
+    api_key = os.environ.get('AMADEUS_API_KEY')
+    api_secret = os.environ.get('AMADEUS_API_SECRET')
+    if not api_key or not api_secret:
+        return None
+    return api_key, api_secret
+
+
+# Shared by every hotel_finder tool in the process
+amadeus_token_provider = AmadeusTokenProvider()
@@ -1,14 +1,17 @@
 from langchain.pydantic_v1 import BaseModel, Field
 from langchain.tools import BaseTool
-from typing import Optional, Type, List, Dict, Any
-import os
-import requests
+from typing import Optional, Type, List, Dict, Any, Tuple
+from http_client import get_session, get_async_client
 
 from langchain.callbacks.manager import (
     AsyncCallbackManagerForToolRun,
     CallbackManagerForToolRun,
 )
 
+from .amadeus_auth import amadeus_credentials, amadeus_token_provider
+
+HOTEL_BOOKINGS_URL = "https://test.api.amadeus.com/v1/booking/hotel-bookings"  # Use "https://api.amadeus.com" for production
+
 class HotelBookingParams(BaseModel):
     offer_id: str = Field(description="Offer ID for hotel booking")
     guests: List[Dict[str, Any]] = Field(description="Guest information for booking")
@@ -29,46 +32,51 @@ class AmadeusHotelBookingTool(BaseTool):
             self, offer_id: str, guests: List[Dict[str, Any]], payment: Dict[str, Any], run_manager: Optional[AsyncCallbackManagerForToolRun] = None
     ) -> Dict[str, Any]:
         """Use the tool asynchronously."""
-        raise NotImplementedError("amadeus_hotel_booking does not support async")
-
-    def get_access_token(self, api_key: str, api_secret: str) -> Optional[str]:
-        url = "https://test.api.amadeus.com/v1/security/oauth2/token"  # Use "https://api.amadeus.com" for production
-        headers = {
-            "Content-Type": "application/x-www-form-urlencoded"
-        }
-        data = {
-            "grant_type": "client_credentials",
-            "client_id": api_key,
-            "client_secret": api_secret
-        }
-        response = requests.post(url, headers=headers, data=data)
-        if response.status_code == 200:
-            return response.json().get("access_token")
-        return None
+        return await self.abook_hotel(offer_id, guests, payment)
 
     def book_hotel(self, offer_id: str, guests: List[Dict[str, Any]], payment: Dict[str, Any]) -> Dict[str, Any]:
         """Book a hotel offer"""
-        api_key = os.environ.get('AMADEUS_API_KEY')
-        api_secret = os.environ.get('AMADEUS_API_SECRET')
-        base_url = "https://test.api.amadeus.com/v1/booking/hotel-bookings"  # Use "https://api.amadeus.com" for production
+        credentials = amadeus_credentials()
+        if not credentials:
+            return "Amadeus API key and secret must be set in environment variables."
 
-        if not api_key or not api_secret:
+        access_token = amadeus_token_provider.get_access_token(*credentials)
+        if not access_token:
+            return "Failed to retrieve access token."
+
+        response = get_session().post(HOTEL_BOOKINGS_URL, headers=self._headers(access_token), json=self._payload(offer_id, guests, payment))
+        return self._handle_response(response, credentials)
+
+    async def abook_hotel(self, offer_id: str, guests: List[Dict[str, Any]], payment: Dict[str, Any]) -> Dict[str, Any]:
+        """Book a hotel offer without blocking the event loop"""
+        credentials = amadeus_credentials()
+        if not credentials:
             return "Amadeus API key and secret must be set in environment variables."
 
-        access_token = self.get_access_token(api_key, api_secret)
+        access_token = await amadeus_token_provider.aget_access_token(*credentials)
         if not access_token:
             return "Failed to retrieve access token."
 
-        headers = {
+        response = await get_async_client().post(HOTEL_BOOKINGS_URL, headers=self._headers(access_token), json=self._payload(offer_id, guests, payment))
+        return self._handle_response(response, credentials)
+
+    def _headers(self, access_token: str) -> Dict[str, str]:
+        return {
             "Authorization": f"Bearer {access_token}",
             "Content-Type": "application/json"
         }
-        payload = {
+
+    def _payload(self, offer_id: str, guests: List[Dict[str, Any]], payment: Dict[str, Any]) -> Dict[str, Any]:
+        return {
             "offerId": offer_id,
             "guests": guests,
             "payments": [payment]
         }
-        response = requests.post(base_url, headers=headers, json=payload)
+
+    def _handle_response(self, response, credentials: Tuple[str, str]) -> Dict[str, Any]:
+        if response.status_code == 401:
+            # Token was revoked or expired early, make the next call fetch a new one
+            amadeus_token_provider.invalidate(*credentials)
         if response.status_code == 200:
             return response.json()
         else:
@@ -1,8 +1,7 @@
 from langchain.pydantic_v1 import BaseModel, Field
 from langchain.tools import BaseTool
-from typing import Optional, Type, List
-import os
-import requests
+from typing import Optional, Type, List, Dict, Any, Tuple
+from http_client import get_session, get_async_client
 from termcolor import colored
 
 from langchain.callbacks.manager import (
@@ -10,6 +9,11 @@ from langchain.callbacks.manager import (
     CallbackManagerForToolRun,
 )
 
+from .amadeus_auth import amadeus_credentials, amadeus_token_provider
+from .geo_cache import hotel_geo_cache
+
+HOTELS_BY_GEOCODE_URL = "https://test.api.amadeus.com/v1/reference-data/locations/hotels/by-geocode"  # Use "https://api.amadeus.com" for production
+
 class HotelListParams(BaseModel):
     latitude: float = Field(description="Latitude for hotel search")
     longitude: float = Field(description="Longitude for hotel search")
@@ -30,49 +34,64 @@ class AmadeusHotelListTool(BaseTool):
             self, latitude: float, longitude: float, radius: int, run_manager: Optional[AsyncCallbackManagerForToolRun] = None
     ) -> List[str]:
         """Use the tool asynchronously."""
-        raise NotImplementedError("amadeus_hotel_list does not support async")
-
-    def get_access_token(self, api_key: str, api_secret: str) -> Optional[str]:
-        url = "https://test.api.amadeus.com/v1/security/oauth2/token"  # Use "https://api.amadeus.com" for production
-        headers = {
-            "Content-Type": "application/x-www-form-urlencoded"
-        }
-        data = {
-            "grant_type": "client_credentials",
-            "client_id": api_key,
-            "client_secret": api_secret
-        }
-        response = requests.post(url, headers=headers, data=data)
-        if response.status_code == 200:
-            return response.json().get("access_token")
-        return None
+        return await self.ahotels_list(latitude, longitude, radius)
 
     def hotels_list(self, latitude: float, longitude: float, radius: int) -> List[str]:
         """Get list of hotel IDs based on location and radius"""
-        api_key = os.environ.get('AMADEUS_API_KEY')
-        api_secret = os.environ.get('AMADEUS_API_SECRET')
-        base_url = "https://test.api.amadeus.com/v1/reference-data/locations/hotels/by-geocode"  # Use "https://api.amadeus.com" for production
+        cached_hotels = hotel_geo_cache.lookup(latitude, longitude, radius)
+        if cached_hotels is not None:
+            return [hotel['hotelId'] for hotel in cached_hotels]
 
-        if not api_key or not api_secret:
+        credentials = amadeus_credentials()
+        if not credentials:
             return "Amadeus API key and secret must be set in environment variables."
 
-        access_token = self.get_access_token(api_key, api_secret)
+        access_token = amadeus_token_provider.get_access_token(*credentials)
         if not access_token:
             return "Failed to retrieve access token."
 
-        headers = {
-            "Authorization": f"Bearer {access_token}"
-        }
-        query_params = {
+        response = get_session().get(HOTELS_BY_GEOCODE_URL, headers={"Authorization": f"Bearer {access_token}"}, params=self._query_params(latitude, longitude, radius))
+        return self._handle_response(response, credentials, latitude, longitude, radius)
+
+    async def ahotels_list(self, latitude: float, longitude: float, radius: int) -> List[str]:
+        """Get list of hotel IDs based on location and radius without blocking the event loop"""
+        cached_hotels = hotel_geo_cache.lookup(latitude, longitude, radius)
+        if cached_hotels is not None:
+            return [hotel['hotelId'] for hotel in cached_hotels]
+
+        credentials = amadeus_credentials()
+        if not credentials:
+            return "Amadeus API key and secret must be set in environment variables."
+
+        access_token = await amadeus_token_provider.aget_access_token(*credentials)
+        if not access_token:
+            return "Failed to retrieve access token."
+
+        response = await get_async_client().get(HOTELS_BY_GEOCODE_URL, headers={"Authorization": f"Bearer {access_token}"}, params=self._query_params(latitude, longitude, radius))
+        return self._handle_response(response, credentials, latitude, longitude, radius)
+
+    def _query_params(self, latitude: float, longitude: float, radius: int) -> Dict[str, Any]:
+        return {
             "latitude": latitude,
             "longitude": longitude,
             "radius": radius
         }
-        response = requests.get(base_url, headers=headers, params=query_params)
+
+    def _handle_response(self, response, credentials: Tuple[str, str], latitude: float, longitude: float, radius: int) -> List[str]:
+        if response.status_code == 401:
+            # Token was revoked or expired early, make the next call fetch a new one
+            amadeus_token_provider.invalidate(*credentials)
         if response.status_code == 200:
             data = response.json()
             hotel_ids = [hotel['hotelId'] for hotel in data['data']]
-            hotel_ids = hotel_ids[:10]  # Truncate the list to the first 10 hotel IDs
+            hotel_geo_cache.store(latitude, longitude, radius, [
+                {
+                    'hotelId': hotel['hotelId'],
+                    'latitude': hotel.get('geoCode', {}).get('latitude'),
+                    'longitude': hotel.get('geoCode', {}).get('longitude'),
+                }
+                for hotel in data['data']
+            ])
             return hotel_ids
         else:
             return f"Failed to retrieve data: {response.status_code}"
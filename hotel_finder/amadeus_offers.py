@@ -1,8 +1,9 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from langchain.pydantic_v1 import BaseModel, Field
 from langchain.tools import BaseTool
-from typing import Optional, Type, List, Dict, Any
-import os
-import requests
+from typing import Optional, Type, List, Dict, Any, Tuple
+from http_client import get_session, get_async_client
 from termcolor import colored
 
 from langchain.callbacks.manager import (
@@ -10,6 +11,15 @@ from langchain.callbacks.manager import (
     CallbackManagerForToolRun,
 )
 
+from .amadeus_auth import amadeus_credentials, amadeus_token_provider
+from .offers_cache import hotel_offers_cache, offers_cache_key
+
+HOTEL_OFFERS_URL = "https://test.api.amadeus.com/v3/shopping/hotel-offers"  # Use "https://api.amadeus.com" for production
+# Hotel IDs sent in a single hotel-offers request
+HOTEL_IDS_PER_REQUEST = 20
+# Hotel-offers requests in flight at once for one tool call
+MAX_CONCURRENT_REQUESTS = 4
+
 class HotelOffersParams(BaseModel):
     hotel_ids: List[str] = Field(description="List of hotel IDs for offer search")
     start_date: str = Field(description="Start date for hotel search in ISO 8601 format")
@@ -17,10 +27,49 @@ class HotelOffersParams(BaseModel):
     number_of_adults: int
     number_of_children: int
 
+class HotelOfferSummary(BaseModel):
+    """The parts of an Amadeus hotel offer needed to fill in an Accommodation."""
+    hotel_id: str
+    offer_id: str
+    name: str
+    check_in: str
+    check_out: str
+    price_total: str
+    currency: str
+    room: str
+
+def summarize_offer(hotel: Dict[str, Any], offer: Dict[str, Any]) -> HotelOfferSummary:
+    """Project one raw offer of a hotel-offers response onto a HotelOfferSummary"""
+    room = offer.get('room', {})
+    estimated = room.get('typeEstimated', {})
+    room_parts = [estimated.get('category', '').replace('_', ' ').title()]
+    if estimated.get('beds'):
+        room_parts.append(f"{estimated['beds']} {estimated.get('bedType', 'bed').lower()}")
+    room_summary = ', '.join(part for part in room_parts if part)
+    if not room_summary:
+        # Fall back to the first line of the free-text description
+        room_summary = room.get('description', {}).get('text', '').split('\n')[0][:80]
+    price = offer.get('price', {})
+    return HotelOfferSummary(
+        hotel_id=hotel.get('hotelId', ''),
+        offer_id=offer.get('id', ''),
+        name=hotel.get('name', ''),
+        check_in=offer.get('checkInDate', ''),
+        check_out=offer.get('checkOutDate', ''),
+        # 'base' may be present but null, and the summary needs a string
+        price_total=str(price.get('total') or price.get('base') or ''),
+        currency=price.get('currency', ''),
+        room=room_summary,
+    )
+
 class AmadeusHotelOffersTool(BaseTool):
     name = "amadeus_hotel_offers"
-    description = "Useful for searching hotel offers using the Amadeus API"
+    description = "Useful for searching hotel offers using the Amadeus API. Accepts any number of hotel IDs"
     args_schema: Type[BaseModel] = HotelOffersParams
+    batch_size: int = HOTEL_IDS_PER_REQUEST
+    max_concurrency: int = MAX_CONCURRENT_REQUESTS
+    # Print full requests and raw responses; off by default because the payloads are large
+    log_requests: bool = False
 
     def _run(
             self, hotel_ids: List[str], start_date: str, end_date: str, number_of_adults: int, number_of_children: int, run_manager: Optional[CallbackManagerForToolRun] = None
@@ -32,42 +81,121 @@ class AmadeusHotelOffersTool(BaseTool):
             self, hotel_ids: List[str], start_date: str, end_date: str, number_of_adults: int, number_of_children: int, run_manager: Optional[AsyncCallbackManagerForToolRun] = None
     ) -> List[Dict[str, Any]]:
         """Use the tool asynchronously."""
-        raise NotImplementedError("amadeus_hotel_offers does not support async")
+        return await self.ahotel_offers(hotel_ids, start_date, end_date, number_of_adults, number_of_children)
+
+    def hotel_offers(self, hotel_ids: List[str], start_date: str, end_date: str, number_of_adults: int, number_of_children: int) -> List[Dict[str, Any]]:
+        """Get hotel offers based on hotel IDs and booking parameters, reusing recent results for the same search"""
+        offers = hotel_offers_cache.get_or_fetch(
+            offers_cache_key(hotel_ids, start_date, end_date, number_of_adults),
+            lambda: self._fetch_offers(hotel_ids, start_date, end_date, number_of_adults),
+            lambda result: isinstance(result, list),
+        )
+        return self._to_output(offers)
+
+    async def ahotel_offers(self, hotel_ids: List[str], start_date: str, end_date: str, number_of_adults: int, number_of_children: int) -> List[Dict[str, Any]]:
+        """Get hotel offers based on hotel IDs and booking parameters without blocking the event loop"""
+        offers = await hotel_offers_cache.aget_or_fetch(
+            offers_cache_key(hotel_ids, start_date, end_date, number_of_adults),
+            lambda: self._afetch_offers(hotel_ids, start_date, end_date, number_of_adults),
+            lambda result: isinstance(result, list),
+        )
+        return self._to_output(offers)
+
+    def _fetch_offers(self, hotel_ids: List[str], start_date: str, end_date: str, number_of_adults: int) -> List[HotelOfferSummary]:
+        """Fetch hotel offers from Amadeus, requesting batches of hotel IDs in parallel"""
+        credentials = amadeus_credentials()
+        if not credentials:
+            return "Amadeus API key and secret must be set in environment variables."
+
+        access_token = amadeus_token_provider.get_access_token(*credentials)
+        if not access_token:
+            return "Failed to retrieve access token."
 
-    def get_access_token(self, api_key: str, api_secret: str) -> Optional[str]:
-        url = "https://test.api.amadeus.com/v1/security/oauth2/token"  # Use "https://api.amadeus.com" for production
         headers = {
-            "Content-Type": "application/x-www-form-urlencoded"
-        }
-        data = {
-            "grant_type": "client_credentials",
-            "client_id": api_key,
-            "client_secret": api_secret
+            "Authorization": f"Bearer {access_token}"
         }
-        response = requests.post(url, headers=headers, data=data)
-        if response.status_code == 200:
-            return response.json().get("access_token")
-        return None
 
-    def hotel_offers(self, hotel_ids: List[str], start_date: str, end_date: str, number_of_adults: int, number_of_children: int) -> List[Dict[str, Any]]:
-        """Get hotel offers based on hotel IDs and booking parameters"""
-        api_key = os.environ.get('AMADEUS_API_KEY')
-        api_secret = os.environ.get('AMADEUS_API_SECRET')
-        base_url = "https://test.api.amadeus.com/v3/shopping/hotel-offers"  # Use "https://api.amadeus.com" for production
+        def fetch_batch(batch):
+            query_params = self._query_params(batch, start_date, end_date, number_of_adults)
+            self._log_request(headers, query_params)
+            try:
+                response = get_session().get(HOTEL_OFFERS_URL, headers=headers, params=query_params)
+            except Exception as e:
+                # A timeout or connection error fails this batch only; the other batches still count
+                return f"Failed to retrieve data: {e}"
+            return self._handle_response(response, credentials)
+
+        batches = self._batches(hotel_ids)
+        if len(batches) == 1:
+            return self._merge_results([fetch_batch(batches[0])])
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(batches))) as executor:
+            results = list(executor.map(fetch_batch, batches))
+        return self._merge_results(results)
 
-        if not api_key or not api_secret:
+    async def _afetch_offers(self, hotel_ids: List[str], start_date: str, end_date: str, number_of_adults: int) -> List[HotelOfferSummary]:
+        """Fetch hotel offers from Amadeus with concurrent batch requests on the event loop"""
+        credentials = amadeus_credentials()
+        if not credentials:
             return "Amadeus API key and secret must be set in environment variables."
 
-        access_token = self.get_access_token(api_key, api_secret)
+        access_token = await amadeus_token_provider.aget_access_token(*credentials)
         if not access_token:
             return "Failed to retrieve access token."
 
         headers = {
             "Authorization": f"Bearer {access_token}"
         }
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def fetch_batch(batch):
+            query_params = self._query_params(batch, start_date, end_date, number_of_adults)
+            async with semaphore:
+                self._log_request(headers, query_params)
+                try:
+                    response = await get_async_client().get(HOTEL_OFFERS_URL, headers=headers, params=query_params)
+                except Exception as e:
+                    # A timeout or connection error fails this batch only; the other batches still count
+                    return f"Failed to retrieve data: {e}"
+            return self._handle_response(response, credentials)
 
-        hotel_ids = hotel_ids[:10]  # Truncate the list to the first 10 hotel IDs
-        query_params = {
+        batches = self._batches(hotel_ids)
+        if len(batches) == 1:
+            return self._merge_results([await fetch_batch(batches[0])])
+        results = await asyncio.gather(*(fetch_batch(batch) for batch in batches))
+        return self._merge_results(results)
+
+    def _batches(self, hotel_ids: List[str]) -> List[List[str]]:
+        # Drop repeated IDs but keep the caller's order, then split into API-sized requests
+        hotel_ids = list(dict.fromkeys(hotel_ids))
+        return [hotel_ids[i:i + self.batch_size] for i in range(0, len(hotel_ids), self.batch_size)] or [[]]
+
+    def _merge_results(self, results: List[Any]) -> List[HotelOfferSummary]:
+        """Merge the per-batch offer lists into one list without repeated offers"""
+        merged: Dict[str, HotelOfferSummary] = {}
+        errors = []
+        succeeded = False
+        for result in results:
+            if isinstance(result, str):
+                errors.append(result)
+                continue
+            succeeded = True
+            for offer in result:
+                # Offers without an id must not all collapse into one
+                key = offer.offer_id or f"{offer.hotel_id}|{offer.room}|{offer.price_total}|{offer.currency}"
+                merged.setdefault(key, offer)
+
+        # Only report a failure when every batch failed; a batch with no offers is still an answer
+        if errors and not succeeded:
+            return errors[0]
+        return list(merged.values())
+
+    def _to_output(self, offers: Any) -> List[Dict[str, Any]]:
+        if isinstance(offers, str):
+            return offers
+        return [offer.dict() for offer in offers]
+
+    def _query_params(self, hotel_ids: List[str], start_date: str, end_date: str, number_of_adults: int) -> Dict[str, Any]:
+        return {
             "hotelIds": ','.join(hotel_ids),
             "checkInDate": start_date,
             "checkOutDate": end_date,
@@ -75,20 +203,30 @@ class AmadeusHotelOffersTool(BaseTool):
             #"childAges": ','.join(['10'] * number_of_children)  # Assuming average child age of 10
         }
 
-        # Print the request details for verbosity
-        print(colored("Request URL: " + base_url, 'white', 'on_grey'))
-        print(colored("Request Headers: " + str(headers), 'white', 'on_grey'))
+    def _log_request(self, headers: Dict[str, str], query_params: Dict[str, Any]) -> None:
+        if not self.log_requests:
+            return
+        # Print the request details for verbosity, without leaking the bearer token
+        print(colored("Request URL: " + HOTEL_OFFERS_URL, 'white', 'on_grey'))
+        print(colored("Request Headers: " + str({**headers, "Authorization": "Bearer ***"}), 'white', 'on_grey'))
         print(colored("Request Parameters: " + str(query_params), 'white', 'on_grey'))
 
-        response = requests.get(base_url, headers=headers, params=query_params)
-
-        # Print the response status and content for verbosity
-        print(colored("Response Status Code: " + str(response.status_code), 'white', 'on_grey'))
-        print(colored("Response Content: " + str(response.content), 'white', 'on_grey'))
+    def _handle_response(self, response, credentials: Tuple[str, str]) -> List[HotelOfferSummary]:
+        if self.log_requests:
+            # Print the response status and content for verbosity
+            print(colored("Response Status Code: " + str(response.status_code), 'white', 'on_grey'))
+            print(colored("Response Content: " + str(response.content), 'white', 'on_grey'))
 
+        if response.status_code == 401:
+            # Token was revoked or expired early, make the next call fetch a new one
+            amadeus_token_provider.invalidate(*credentials)
         if response.status_code == 200:
             data = response.json()
-            return data['data']
+            return [
+                summarize_offer(hotel_offers['hotel'], offer)
+                for hotel_offers in data.get('data', [])
+                for offer in hotel_offers.get('offers', [])
+            ]
         else:
             return f"Failed to retrieve data: {response.status_code}"
 
@@ -0,0 +1,126 @@
+import math
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LATITUDE = 111.32
+
+# Cached hotel lists stay valid this long; hotel reference data changes rarely
+DEFAULT_TTL_SECONDS = float(os.environ.get("AMADEUS_HOTEL_CACHE_TTL", 6 * 60 * 60))
+# Size of a grid cell in degrees; each cached search is indexed in every cell its circle touches
+DEFAULT_CELL_DEGREES = 0.25
+DEFAULT_MAX_SEARCHES = 512
+
+
+def haversine_km(latitude1: float, longitude1: float, latitude2: float, longitude2: float) -> float:
+    """Great-circle distance between two points in kilometers."""
+    phi1, phi2 = math.radians(latitude1), math.radians(latitude2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(longitude2 - longitude1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class _CachedSearch:
+    __slots__ = ("latitude", "longitude", "radius", "fetched_at", "hotels", "cells")
+
+    def __init__(self, latitude: float, longitude: float, radius: float, hotels: List[Dict[str, Any]], cells: List[Tuple[int, int]]):
+        self.latitude = latitude
+        self.longitude = longitude
+        self.radius = radius
+        self.fetched_at = time.monotonic()
+        self.hotels = hotels
+        self.cells = cells
+
+
+class HotelGeoCache:
+    """
+    Grid-indexed cache of hotel-by-geocode searches.
+
+    A query is answered locally when its circle lies entirely inside a cached, unexpired
+    search circle: the cached hotels are filtered down to those within the query radius.
+    Radii are in kilometers, matching the Amadeus default radiusUnit.
+    """
+
+    def __init__(self, ttl_seconds: float = DEFAULT_TTL_SECONDS, cell_degrees: float = DEFAULT_CELL_DEGREES, max_searches: int = DEFAULT_MAX_SEARCHES):
+        self.ttl_seconds = ttl_seconds
+        self.cell_degrees = cell_degrees
+        self.max_searches = max_searches
+        self._searches: Dict[int, _CachedSearch] = {}
+        self._grid: Dict[Tuple[int, int], set] = defaultdict(set)
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def lookup(self, latitude: float, longitude: float, radius: float) -> Optional[List[Dict[str, Any]]]:
+        """Return the cached hotels within radius of the point, or None if no cached search covers the circle."""
+        now = time.monotonic()
+        with self._lock:
+            best = None
+            for search_id in list(self._grid.get(self._cell(latitude, longitude), ())):
+                search = self._searches[search_id]
+                if now - search.fetched_at > self.ttl_seconds:
+                    self._remove(search_id)
+                    continue
+                # The query circle is contained when the center distance plus its radius fits in the cached radius
+                if haversine_km(latitude, longitude, search.latitude, search.longitude) + radius <= search.radius:
+                    if best is None or search.fetched_at > best.fetched_at:
+                        best = search
+            if best is None:
+                return None
+            hotels = best.hotels
+
+        return [
+            hotel for hotel in hotels
+            if haversine_km(latitude, longitude, hotel['latitude'], hotel['longitude']) <= radius
+        ]
+
+    def store(self, latitude: float, longitude: float, radius: float, hotels: List[Dict[str, Any]]) -> None:
+        """Cache the hotels returned for a search; hotels without coordinates are skipped."""
+        hotels = [hotel for hotel in hotels if hotel.get('latitude') is not None and hotel.get('longitude') is not None]
+        cells = self._covering_cells(latitude, longitude, radius)
+        with self._lock:
+            while len(self._searches) >= self.max_searches:
+                oldest = min(self._searches, key=lambda search_id: self._searches[search_id].fetched_at)
+                self._remove(oldest)
+            search_id = self._next_id
+            self._next_id += 1
+            self._searches[search_id] = _CachedSearch(latitude, longitude, radius, hotels, cells)
+            for cell in cells:
+                self._grid[cell].add(search_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._searches.clear()
+            self._grid.clear()
+
+    def _remove(self, search_id: int) -> None:
+        search = self._searches.pop(search_id)
+        for cell in search.cells:
+            ids = self._grid.get(cell)
+            if ids is not None:
+                ids.discard(search_id)
+                if not ids:
+                    del self._grid[cell]
+
+    def _cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        return math.floor(latitude / self.cell_degrees), math.floor(longitude / self.cell_degrees)
+
+    def _covering_cells(self, latitude: float, longitude: float, radius: float) -> List[Tuple[int, int]]:
+        # Bounding box of the circle; longitude degrees shrink towards the poles
+        d_latitude = radius / KM_PER_DEGREE_LATITUDE
+        cos_latitude = max(math.cos(math.radians(min(abs(latitude) + d_latitude, 89.9))), 1e-6)
+        d_longitude = min(radius / (KM_PER_DEGREE_LATITUDE * cos_latitude), 180.0)
+        min_cell = self._cell(latitude - d_latitude, longitude - d_longitude)
+        max_cell = self._cell(latitude + d_latitude, longitude + d_longitude)
+        return [
+            (cell_latitude, cell_longitude)
+            for cell_latitude in range(min_cell[0], max_cell[0] + 1)
+            for cell_longitude in range(min_cell[1], max_cell[1] + 1)
+        ]
+
+
+# Shared by every AmadeusHotelListTool in the process
+hotel_geo_cache = HotelGeoCache()
@@ -0,0 +1,125 @@
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, List, Optional, Tuple
+
+# Offers are served from the cache without revalidation for this long
+DEFAULT_TTL_SECONDS = float(os.environ.get("AMADEUS_OFFERS_CACHE_TTL", 300))
+# After the TTL, stale offers are still served for this long while a refresh runs in the background
+DEFAULT_STALE_SECONDS = float(os.environ.get("AMADEUS_OFFERS_CACHE_STALE", 900))
+DEFAULT_MAX_ENTRIES = int(os.environ.get("AMADEUS_OFFERS_CACHE_SIZE", 256))
+
+
+def offers_cache_key(hotel_ids: List[str], start_date: str, end_date: str, number_of_adults: int) -> Tuple[Hashable, ...]:
+    """Normalize hotel offer search parameters so equivalent searches share a cache entry."""
+    return (
+        tuple(sorted({hotel_id.strip().upper() for hotel_id in hotel_ids})),
+        start_date.strip()[:10],
+        end_date.strip()[:10],
+        int(number_of_adults),
+    )
+
+
+class OffersCache:
+    """
+    Size-bounded LRU cache for hotel offer results with stale-while-revalidate.
+
+    Fresh entries are returned directly. Entries past their TTL but inside the stale window
+    are returned immediately while a single background refresh replaces them. Anything
+    older is fetched in the foreground.
+    """
+
+    def __init__(self, ttl_seconds: float = DEFAULT_TTL_SECONDS, stale_seconds: float = DEFAULT_STALE_SECONDS, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._refreshing: set = set()
+        self._tasks: set = set()
+        self._lock = threading.Lock()
+
+    def get_or_fetch(self, key: Hashable, fetch: Callable[[], Any], should_cache: Callable[[Any], bool]) -> Any:
+        value, state = self._lookup(key)
+        if state == "fresh":
+            return value
+        if state == "stale":
+            if self._begin_refresh(key):
+                threading.Thread(target=self._refresh, args=(key, fetch, should_cache), name="offers-cache-refresh", daemon=True).start()
+            return value
+        value = fetch()
+        if should_cache(value):
+            self.put(key, value)
+        return value
+
+    async def aget_or_fetch(self, key: Hashable, fetch: Callable[[], Awaitable[Any]], should_cache: Callable[[Any], bool]) -> Any:
+        value, state = self._lookup(key)
+        if state == "fresh":
+            return value
+        if state == "stale":
+            if self._begin_refresh(key):
+                task = asyncio.get_running_loop().create_task(self._arefresh(key, fetch, should_cache))
+                # Keep a reference so the task is not garbage collected before it finishes
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            return value
+        value = await fetch()
+        if should_cache(value):
+            self.put(key, value)
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _lookup(self, key: Hashable) -> Tuple[Optional[Any], str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, "missing"
+            stored_at, value = entry
+            age = time.monotonic() - stored_at
+            if age > self.ttl_seconds + self.stale_seconds:
+                del self._entries[key]
+                return None, "missing"
+            self._entries.move_to_end(key)
+            return value, "fresh" if age <= self.ttl_seconds else "stale"
+
+    def _begin_refresh(self, key: Hashable) -> bool:
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def _end_refresh(self, key: Hashable) -> None:
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def _refresh(self, key: Hashable, fetch: Callable[[], Any], should_cache: Callable[[Any], bool]) -> None:
+        try:
+            value = fetch()
+            if should_cache(value):
+                self.put(key, value)
+        finally:
+            self._end_refresh(key)
+
+    async def _arefresh(self, key: Hashable, fetch: Callable[[], Awaitable[Any]], should_cache: Callable[[Any], bool]) -> None:
+        try:
+            value = await fetch()
+            if should_cache(value):
+                self.put(key, value)
+        finally:
+            self._end_refresh(key)
+
+
+# Shared by every AmadeusHotelOffersTool in the process
+hotel_offers_cache = OffersCache()
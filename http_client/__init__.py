@@ -0,0 +1,9 @@
+from .http_client import configure, get_session, reset_session, get_async_client, aclose_async_client
+from .rate_limiter import TokenBucket, configure_rate_limit, get_rate_limiter
+from .replay import FixtureNotFoundError, ReplayGoogleHttp, ReplayTransport, openai_client_kwargs, replay_mode
+
+__all__ = [
+    "configure", "get_session", "reset_session", "get_async_client", "aclose_async_client",
+    "TokenBucket", "configure_rate_limit", "get_rate_limiter",
+    "FixtureNotFoundError", "ReplayGoogleHttp", "ReplayTransport", "openai_client_kwargs", "replay_mode",
+]
@@ -0,0 +1,242 @@
+# http_client.py
+
+import asyncio
+import os
+import threading
+import time
+import weakref
+from typing import Dict, Optional
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from requests.structures import CaseInsensitiveDict
+
+from .rate_limiter import rate_limiter_for_url, retry_after_seconds
+from .replay import ReplayTransport, fixture_store, replay_latency, replay_mode, response_body
+
+DEFAULT_HEADERS = {
+    "Accept-Encoding": "gzip, deflate",
+    "Connection": "keep-alive",
+}
+
+_config = {
+    # Number of distinct hosts to keep connection pools for
+    "pool_connections": int(os.environ.get("HTTP_POOL_CONNECTIONS", 10)),
+    # Keep-alive connections kept open per host
+    "pool_maxsize": int(os.environ.get("HTTP_POOL_MAXSIZE", 10)),
+    # Block instead of opening throwaway connections once a host's pool is exhausted
+    "pool_block": os.environ.get("HTTP_POOL_BLOCK", "false").lower() == "true",
+    # Retries for failed connection attempts (never for requests that reached the server)
+    "max_retries": int(os.environ.get("HTTP_MAX_RETRIES", 2)),
+    # (connect, read) timeout in seconds applied when a call does not pass its own
+    "timeout": (float(os.environ.get("HTTP_CONNECT_TIMEOUT", 5)), float(os.environ.get("HTTP_READ_TIMEOUT", 30))),
+    # Per-host overrides of pool_maxsize, e.g. {"test.api.amadeus.com": 20}
+    "host_pool_maxsize": {},
+    # Times a request answered with 429 Too Many Requests is queued again before the 429 is returned
+    "rate_limit_retries": int(os.environ.get("HTTP_RATE_LIMIT_RETRIES", 3)),
+}
+
+_session: Optional[requests.Session] = None
+# httpx.AsyncClient connections belong to the event loop that opened them, so keep one client per loop
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+class PooledSession(requests.Session):
+    """requests.Session that applies a default timeout to every call."""
+
+    def __init__(self, timeout):
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(method, url, **kwargs)
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    """HTTPAdapter that waits for the target API's rate limiter before sending and re-queues requests rejected with 429."""
+
+    def __init__(self, rate_limit_retries: int = 0, **kwargs):
+        self.rate_limit_retries = rate_limit_retries
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        limiter = rate_limiter_for_url(request.url)
+        attempt = 0
+        while True:
+            if limiter is not None:
+                limiter.acquire()
+            response = super().send(request, **kwargs)
+            if response.status_code != 429 or attempt >= self.rate_limit_retries:
+                return response
+            delay = retry_after_seconds(response.headers, attempt)
+            response.close()
+            time.sleep(delay)
+            attempt += 1
+
+
+class RateLimitedAsyncTransport(httpx.AsyncBaseTransport):
+    """Async counterpart of RateLimitedAdapter wrapping an httpx transport."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, rate_limit_retries: int = 0):
+        self.transport = transport
+        self.rate_limit_retries = rate_limit_retries
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        limiter = rate_limiter_for_url(request.url)
+        attempt = 0
+        while True:
+            if limiter is not None:
+                await limiter.aacquire()
+            response = await self.transport.handle_async_request(request)
+            if response.status_code != 429 or attempt >= self.rate_limit_retries:
+                return response
+            delay = retry_after_seconds(response.headers, attempt)
+            await response.aclose()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+class ReplayAdapter(RateLimitedAdapter):
+    """Adapter used when HTTP_REPLAY_MODE is set: records live responses to fixtures or serves them back offline."""
+
+    def __init__(self, mode: str, **kwargs):
+        self.mode = mode
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        body = request.body.encode("utf-8") if isinstance(request.body, str) else request.body
+        content_type = request.headers.get("Content-Type", "")
+        if self.mode == "replay":
+            entry = fixture_store.load(request.method, request.url, body, content_type)
+            time.sleep(replay_latency(entry.get("elapsed", 0.0)))
+            response = requests.Response()
+            response.status_code = entry["status"]
+            response.headers = CaseInsensitiveDict(entry["headers"])
+            response._content = response_body(entry)
+            response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+            response.url = request.url
+            response.request = request
+            return response
+
+        started = time.perf_counter()
+        response = super().send(request, **kwargs)
+        fixture_store.save(request.method, request.url, body, content_type, response.status_code, dict(response.headers), response.content, time.perf_counter() - started)
+        return response
+
+
+def _build_session() -> requests.Session:
+    session = PooledSession(_config["timeout"])
+    session.headers.update(DEFAULT_HEADERS)
+
+    mode = replay_mode()
+
+    def adapter(pool_maxsize):
+        options = dict(
+            rate_limit_retries=_config["rate_limit_retries"],
+            pool_connections=_config["pool_connections"],
+            pool_maxsize=pool_maxsize,
+            pool_block=_config["pool_block"],
+            max_retries=_config["max_retries"],
+        )
+        if mode is not None:
+            return ReplayAdapter(mode, **options)
+        return RateLimitedAdapter(**options)
+
+    session.mount("https://", adapter(_config["pool_maxsize"]))
+    session.mount("http://", adapter(_config["pool_maxsize"]))
+    for host, pool_maxsize in _config["host_pool_maxsize"].items():
+        session.mount(f"https://{host}/", adapter(pool_maxsize))
+    return session
+
+
+def _build_async_client() -> httpx.AsyncClient:
+    connect_timeout, read_timeout = _config["timeout"] if isinstance(_config["timeout"], tuple) else (_config["timeout"], _config["timeout"])
+    transport = RateLimitedAsyncTransport(httpx.AsyncHTTPTransport(retries=_config["max_retries"]), _config["rate_limit_retries"])
+    mode = replay_mode()
+    if mode is not None:
+        transport = ReplayTransport(transport, mode)
+    return httpx.AsyncClient(
+        headers=DEFAULT_HEADERS,
+        timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+        limits=httpx.Limits(
+            max_connections=_config["pool_connections"] * _config["pool_maxsize"],
+            max_keepalive_connections=_config["pool_maxsize"],
+        ),
+        transport=transport,
+    )
+
+
+def configure(pool_connections: Optional[int] = None, pool_maxsize: Optional[int] = None, pool_block: Optional[bool] = None, max_retries: Optional[int] = None, timeout=None, host_pool_maxsize: Optional[Dict[str, int]] = None, rate_limit_retries: Optional[int] = None) -> None:
+    """
+    Updates the settings of the shared HTTP clients. Takes effect for the next client that is created,
+    so call this before the first request or follow it with reset_session().
+
+    Args:
+        pool_connections (int): Number of hosts to keep connection pools for.
+        pool_maxsize (int): Maximum keep-alive connections per host.
+        pool_block (bool): Wait for a free connection instead of opening an extra one when a pool is full.
+        max_retries (int): Retries for connection failures.
+        timeout (float or tuple): Default (connect, read) timeout in seconds.
+        host_pool_maxsize (dict): Per-host overrides of pool_maxsize.
+        rate_limit_retries (int): Times a request rejected with 429 is queued again.
+
+    Example:
+        >>> from http_client import configure, get_session
+        >>> configure(pool_maxsize=20, host_pool_maxsize={"app.ticketmaster.com": 5})
+        >>> response = get_session().get("https://app.ticketmaster.com/discovery/v2/events.json", params={...})
+    """
+    updates = {
+        "pool_connections": pool_connections,
+        "pool_maxsize": pool_maxsize,
+        "pool_block": pool_block,
+        "max_retries": max_retries,
+        "timeout": timeout,
+        "host_pool_maxsize": host_pool_maxsize,
+        "rate_limit_retries": rate_limit_retries,
+    }
+    with _lock:
+        _config.update({name: value for name, value in updates.items() if value is not None})
+
+
+def get_session() -> requests.Session:
+    """Returns the process-wide pooled session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Returns the pooled async client for the running event loop, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _async_clients.get(loop)
+        if client is None or client.is_closed:
+            client = _async_clients[loop] = _build_async_client()
+    return client
+
+
+async def aclose_async_client() -> None:
+    """Closes the async client of the running event loop, e.g. before the loop shuts down."""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _async_clients.pop(loop, None)
+    if client is not None:
+        await client.aclose()
+
+
+def reset_session() -> None:
+    """Closes the shared session so the next get_session() call builds a new one with the current settings."""
+    global _session
+    with _lock:
+        session, _session = _session, None
+    if session is not None:
+        session.close()
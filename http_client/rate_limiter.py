@@ -0,0 +1,141 @@
+# rate_limiter.py
+
+import asyncio
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+try:
+    import fcntl
+except ImportError:  # Windows: budgets are shared between threads and tasks, but not processes
+    fcntl = None
+
+# Requests per second and burst size per API; the Amadeus test tier allows 10 TPS, Ticketmaster 5 TPS
+DEFAULT_BUDGETS: Dict[str, Tuple[float, float]] = {
+    "amadeus": (float(os.environ.get("AMADEUS_RATE_LIMIT", 10)), float(os.environ.get("AMADEUS_RATE_BURST", 10))),
+    "ticketmaster": (float(os.environ.get("TICKETMASTER_RATE_LIMIT", 5)), float(os.environ.get("TICKETMASTER_RATE_BURST", 5))),
+}
+
+HOST_APIS = {
+    "test.api.amadeus.com": "amadeus",
+    "api.amadeus.com": "amadeus",
+    "app.ticketmaster.com": "ticketmaster",
+}
+
+# When set, every bucket keeps its state in <dir>/<api>.bucket so several processes draw from one budget
+STATE_DIR = os.environ.get("RATE_LIMIT_STATE_DIR")
+
+
+class TokenBucket:
+    """
+    Token bucket that queues callers instead of rejecting them.
+
+    Each acquire reserves a token immediately, letting the balance go negative, and then
+    waits until the reservation is covered by the refill rate. Callers are therefore served
+    in arrival order and bursts are smoothed to the configured rate. acquire() blocks the
+    calling thread, aacquire() suspends the calling task.
+
+    With a state_file the balance lives in a small JSON file guarded by an exclusive
+    file lock, so every process pointing at the same file shares the budget.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None, state_file: Optional[str] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self.state_file = state_file if fcntl is not None else None
+        self._tokens = self.capacity
+        self._updated = time.time()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Block until the tokens are available. Returns the time spent waiting in seconds."""
+        delay = self._reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    async def aacquire(self, tokens: float = 1.0) -> float:
+        """Wait without blocking the event loop until the tokens are available."""
+        delay = self._reserve(tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+    def _reserve(self, tokens: float) -> float:
+        with self._lock:
+            if self.state_file:
+                return self._reserve_shared(tokens)
+            self._tokens, self._updated, delay = self._take(self._tokens, self._updated, tokens)
+            return delay
+
+    def _take(self, available: float, updated: float, tokens: float) -> Tuple[float, float, float]:
+        now = time.time()
+        available = min(self.capacity, available + (now - updated) * self.rate) - tokens
+        delay = -available / self.rate if available < 0 else 0.0
+        return available, now, delay
+
+    def _reserve_shared(self, tokens: float) -> float:
+        os.makedirs(os.path.dirname(os.path.abspath(self.state_file)), exist_ok=True)
+        with open(self.state_file, "a+") as state:
+            fcntl.flock(state.fileno(), fcntl.LOCK_EX)
+            try:
+                state.seek(0)
+                try:
+                    saved = json.loads(state.read() or "{}")
+                except json.JSONDecodeError:
+                    saved = {}
+                available, updated, delay = self._take(saved.get("tokens", self.capacity), saved.get("updated", time.time()), tokens)
+                state.seek(0)
+                state.truncate()
+                state.write(json.dumps({"tokens": available, "updated": updated}))
+                state.flush()
+            finally:
+                fcntl.flock(state.fileno(), fcntl.LOCK_UN)
+        return delay
+
+
+_limiters: Dict[str, TokenBucket] = {}
+_lock = threading.Lock()
+
+
+def configure_rate_limit(api: str, rate: float, capacity: Optional[float] = None, state_file: Optional[str] = None) -> TokenBucket:
+    """
+    Sets the request budget for an API, replacing any existing limiter.
+
+    Example:
+        >>> from http_client import configure_rate_limit
+        >>> configure_rate_limit("amadeus", rate=5, state_file="/tmp/travel_cli/amadeus.bucket")
+    """
+    limiter = TokenBucket(rate, capacity, state_file)
+    with _lock:
+        _limiters[api] = limiter
+    return limiter
+
+
+def get_rate_limiter(api: str) -> Optional[TokenBucket]:
+    """Returns the shared limiter for an API, or None if the API has no budget."""
+    with _lock:
+        limiter = _limiters.get(api)
+        if limiter is None and api in DEFAULT_BUDGETS:
+            rate, capacity = DEFAULT_BUDGETS[api]
+            state_file = os.path.join(STATE_DIR, f"{api}.bucket") if STATE_DIR else None
+            limiter = _limiters[api] = TokenBucket(rate, capacity, state_file)
+        return limiter
+
+
+def rate_limiter_for_url(url: str) -> Optional[TokenBucket]:
+    api = HOST_APIS.get(urlparse(str(url)).hostname or "")
+    return get_rate_limiter(api) if api else None
+
+
+def retry_after_seconds(headers, attempt: int) -> float:
+    """Delay before retrying a 429: the Retry-After header when it is in seconds, else exponential backoff."""
+    try:
+        return max(0.0, float(headers.get("Retry-After")))
+    except (TypeError, ValueError):
+        return min(0.5 * (2 ** attempt), 8.0)
@@ -0,0 +1,248 @@
+# replay.py
+
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+import httpx
+
+# Query parameters and form fields that carry secrets; they are left out of fixture keys and files
+SECRET_FIELDS = {"apikey", "key", "client_id", "client_secret", "access_token", "refresh_token"}
+# Headers that no longer describe the stored body, which is kept decoded
+DROPPED_HEADERS = {"content-encoding", "transfer-encoding", "content-length", "connection", "set-cookie"}
+
+
+class FixtureNotFoundError(LookupError):
+    """Raised in replay mode when no fixture was recorded for a request."""
+
+
+def replay_mode() -> Optional[str]:
+    """The HTTP_REPLAY_MODE setting: "record", "replay" or None for live traffic."""
+    mode = os.environ.get("HTTP_REPLAY_MODE", "").strip().lower()
+    if mode in ("", "off", "live"):
+        return None
+    if mode not in ("record", "replay"):
+        raise ValueError(f"Invalid HTTP_REPLAY_MODE: {mode}. Use 'record', 'replay' or leave it unset.")
+    return mode
+
+
+def fixtures_dir() -> str:
+    return os.environ.get("HTTP_FIXTURES_DIR", os.path.join("fixtures", "http"))
+
+
+def replay_latency(recorded_seconds: float) -> float:
+    """
+    Delay injected before a replayed response is returned. HTTP_REPLAY_LATENCY_MS is either a
+    number of milliseconds or "recorded" to reproduce the latency observed while recording.
+    """
+    setting = os.environ.get("HTTP_REPLAY_LATENCY_MS", "0").strip().lower()
+    if setting == "recorded":
+        return recorded_seconds
+    return float(setting) / 1000.0
+
+
+def _normalize_url(url: str) -> str:
+    parsed = urlparse(url)
+    query = sorted((name, value) for name, value in parse_qsl(parsed.query, keep_blank_values=True) if name.lower() not in SECRET_FIELDS)
+    return urlunparse((parsed.scheme, parsed.netloc, parsed.path, "", urlencode(query), ""))
+
+
+def _normalize_body(body: Optional[bytes], content_type: str) -> bytes:
+    if not body:
+        return b""
+    if "application/x-www-form-urlencoded" in content_type:
+        fields = sorted((name, value) for name, value in parse_qsl(body.decode("utf-8"), keep_blank_values=True) if name.lower() not in SECRET_FIELDS)
+        return urlencode(fields).encode("utf-8")
+    if "json" in content_type:
+        try:
+            return json.dumps(json.loads(body), sort_keys=True).encode("utf-8")
+        except ValueError:
+            pass
+    return body
+
+
+def _redact_body(body: bytes) -> bytes:
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return body
+    if isinstance(data, dict) and any(field in data for field in SECRET_FIELDS):
+        data = {name: ("replay-" + name if name in SECRET_FIELDS else value) for name, value in data.items()}
+        return json.dumps(data).encode("utf-8")
+    return body
+
+
+class FixtureStore:
+    """
+    Stores recorded HTTP interactions as JSON files, one file per distinct request.
+
+    Requests are keyed on method, URL and body with secrets removed. Repeated identical
+    requests append to the file's response list and are replayed in the same order; once the
+    list is exhausted the last response keeps being served.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory
+        self._positions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, method: str, url: str, body: Optional[bytes], content_type: str) -> Tuple[str, str]:
+        normalized_url = _normalize_url(url)
+        digest = hashlib.sha256(b"\n".join([method.upper().encode(), normalized_url.encode(), _normalize_body(body, content_type)])).hexdigest()[:20]
+        host = urlparse(url).netloc.replace(":", "_") or "local"
+        directory = self.directory or fixtures_dir()
+        return os.path.join(directory, host, f"{method.lower()}_{digest}.json"), normalized_url
+
+    def load(self, method: str, url: str, body: Optional[bytes], content_type: str = "") -> Dict[str, Any]:
+        path, normalized_url = self._path(method, url, body, content_type)
+        try:
+            with open(path) as fixture_file:
+                fixture = json.load(fixture_file)
+        except FileNotFoundError:
+            raise FixtureNotFoundError(f"No fixture recorded for {method.upper()} {normalized_url} (expected {path})")
+        with self._lock:
+            position = self._positions.get(path, 0)
+            self._positions[path] = position + 1
+        responses = fixture["responses"]
+        return responses[min(position, len(responses) - 1)]
+
+    def save(self, method: str, url: str, body: Optional[bytes], content_type: str, status: int, headers: Dict[str, str], content: bytes, elapsed: float) -> None:
+        path, normalized_url = self._path(method, url, body, content_type)
+        entry = {
+            "status": status,
+            "headers": {name: value for name, value in headers.items() if name.lower() not in DROPPED_HEADERS},
+            "elapsed": round(elapsed, 4),
+        }
+        content = _redact_body(content)
+        try:
+            entry["body"] = content.decode("utf-8")
+        except UnicodeDecodeError:
+            entry["body_base64"] = base64.b64encode(content).decode("ascii")
+
+        with self._lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fixture = {"request": {"method": method.upper(), "url": normalized_url}, "responses": []}
+            if os.path.exists(path):
+                with open(path) as fixture_file:
+                    fixture = json.load(fixture_file)
+            fixture["responses"].append(entry)
+            with open(path, "w") as fixture_file:
+                json.dump(fixture, fixture_file, indent=2)
+
+
+def response_body(entry: Dict[str, Any]) -> bytes:
+    if "body_base64" in entry:
+        return base64.b64decode(entry["body_base64"])
+    return entry.get("body", "").encode("utf-8")
+
+
+fixture_store = FixtureStore()
+
+
+class ReplayTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """
+    httpx transport that records traffic through the wrapped transport or replays it from fixtures.
+    Works for both httpx.Client and httpx.AsyncClient, e.g. the OpenAI client used by ChatOpenAI.
+    """
+
+    def __init__(self, transport=None, mode: Optional[str] = None, store: FixtureStore = fixture_store):
+        self.transport = transport
+        self.mode = mode or replay_mode()
+        self.store = store
+
+    def _replayed(self, request: httpx.Request) -> Tuple[httpx.Response, float]:
+        entry = self.store.load(request.method, str(request.url), request.content, request.headers.get("content-type", ""))
+        response = httpx.Response(entry["status"], headers=entry["headers"], content=response_body(entry), request=request)
+        return response, replay_latency(entry.get("elapsed", 0.0))
+
+    def _save(self, request: httpx.Request, response: httpx.Response, elapsed: float) -> None:
+        self.store.save(request.method, str(request.url), request.content, request.headers.get("content-type", ""), response.status_code, dict(response.headers), response.content, elapsed)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.read()
+        if self.mode == "replay":
+            response, delay = self._replayed(request)
+            time.sleep(delay)
+            return response
+        started = time.perf_counter()
+        response = self.transport.handle_request(request)
+        response.read()
+        self._save(request, response, time.perf_counter() - started)
+        return response
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        if self.mode == "replay":
+            response, delay = self._replayed(request)
+            await asyncio.sleep(delay)
+            return response
+        started = time.perf_counter()
+        response = await self.transport.handle_async_request(request)
+        await response.aread()
+        self._save(request, response, time.perf_counter() - started)
+        return response
+
+    def close(self) -> None:
+        if self.transport is not None:
+            self.transport.close()
+
+    async def aclose(self) -> None:
+        if self.transport is not None:
+            await self.transport.aclose()
+
+
+class ReplayGoogleHttp:
+    """
+    httplib2-compatible object for the Google API client. In replay mode it serves fixtures;
+    in record mode it forwards to the wrapped (authorized) http and records the result.
+    """
+
+    def __init__(self, http=None, mode: Optional[str] = None, store: FixtureStore = fixture_store):
+        self.http = http
+        self.mode = mode or replay_mode()
+        self.store = store
+        # googleapiclient reads these attributes from the http object it is given
+        self.credentials = getattr(http, "credentials", None)
+        self.timeout = getattr(http, "timeout", None)
+
+    def request(self, uri, method="GET", body=None, headers=None, redirections=5, connection_type=None):
+        import httplib2
+
+        headers = headers or {}
+        content_type = next((value for name, value in headers.items() if name.lower() == "content-type"), "")
+        body_bytes = body.encode("utf-8") if isinstance(body, str) else body
+        if self.mode == "replay":
+            entry = self.store.load(method, uri, body_bytes, content_type)
+            time.sleep(replay_latency(entry.get("elapsed", 0.0)))
+            response = httplib2.Response({"status": entry["status"], **{name.lower(): value for name, value in entry["headers"].items()}})
+            return response, response_body(entry)
+
+        started = time.perf_counter()
+        response, content = self.http.request(uri, method=method, body=body, headers=headers, redirections=redirections, connection_type=connection_type)
+        response_headers = {name: value for name, value in response.items() if name not in ("status",) and not name.startswith("-")}
+        self.store.save(method, uri, body_bytes, content_type, response.status, response_headers, content, time.perf_counter() - started)
+        return response, content
+
+    def close(self):
+        if self.http is not None and hasattr(self.http, "close"):
+            self.http.close()
+
+
+def openai_client_kwargs() -> Dict[str, Any]:
+    """
+    Extra ChatOpenAI arguments that route model calls through the record/replay transport.
+    Empty when HTTP_REPLAY_MODE is unset, so live runs keep the client's defaults.
+    """
+    mode = replay_mode()
+    if mode is None:
+        return {}
+    return {
+        "http_client": httpx.Client(transport=ReplayTransport(httpx.HTTPTransport(), mode)),
+        "http_async_client": httpx.AsyncClient(transport=ReplayTransport(httpx.AsyncHTTPTransport(), mode)),
+    }
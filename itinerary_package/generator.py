@@ -5,7 +5,11 @@ from hotel_finder.amadeus_list import AmadeusHotelListTool
 from hotel_finder.amadeus_offers import AmadeusHotelOffersTool
 from location_coordinates.location_coordinates import LocationCoordinatesTool
 
+from langchain_core.pydantic_v1 import ValidationError
+from termcolor import colored
+
 from generic_agent import GenericAgent
+from generic_agent.partial_json import ANY
 
 def generate_sample_itinerary():
     """
@@ -56,7 +60,7 @@ def generate_sample_itinerary():
     )
     return itinerary.json()
 
-def generate_itinerary_from_model_with_tools(prompt, model_name="gpt-4o", pydantic_model=Itinerary, tools=[TicketmasterEventsTool(), AmadeusHotelListTool(), AmadeusHotelOffersTool(), LocationCoordinatesTool()]):
+def generate_itinerary_from_model_with_tools(prompt, model_name="gpt-4o", pydantic_model=Itinerary, tools=[TicketmasterEventsTool(), AmadeusHotelListTool(), AmadeusHotelOffersTool(), LocationCoordinatesTool()], on_destination=None, on_activity=None, meter=None):
     """
     Generates an itinerary based on a user-provided prompt using a specified language model.
 
@@ -65,25 +69,47 @@ def generate_itinerary_from_model_with_tools(prompt, model_name="gpt-4o", pydant
         model_name (str): The name of the model to use, defaults to 'gpt-4o'.
         pydantic_model (Pydantic Model): The Pydantic model to use for structured output.
         tools (list): A list of functions to use for post-processing.
+        on_destination (callable, optional): Called with each Destination as soon as the model has written it.
+        on_activity (callable, optional): Called with each Activity as soon as the model has written it,
+                                          before the Destination that contains it.
+        meter (RunMeter, optional): Records turns, tokens and tool timings of the run and enforces its Budget.
+                                    When a limit is reached the partial result is returned instead.
 
     Returns:
         dict: A dictionary representation of the generated itinerary.
 
     Example:
-        >>> details = generate_itinerary_from_model_with_tools("Create an itinerary for a summer vacation in Hawaii")
+        >>> details = generate_itinerary_from_model_with_tools("Create an itinerary for a summer vacation in Hawaii",
+        ...                                                    on_destination=lambda destination: print(destination.location))
         >>> print(details)
     """
 
     # Create an instance of GenericAgent
     generic_agent = GenericAgent(model_name=model_name, pydantic_model=pydantic_model, tools=tools)
 
-    append_this = " Respond with final answer using a single instance of the Itinerary output format and only the Itinerary output format."
+    append_this = " Look up the coordinates of all destinations in one location_coordinates call using location_descriptions. Request independent lookups, such as hotels and events for different destinations, together in the same turn. Respond with final answer using a single instance of the Itinerary output format and only the Itinerary output format."
 
     # Append the string
     prompt += append_this
 
-    # Generate the response using the agent
-    result = generic_agent.generate_response(prompt)
+    if on_destination is None and on_activity is None:
+        # Generate the response using the agent
+        return generic_agent.generate_response(prompt, meter=meter)
+
+    # Stream the final itinerary, handing over each destination and activity as it completes
+    streamed = {("destinations", ANY): (Destination, on_destination), ("destinations", ANY, "activities", ANY): (Activity, on_activity)}
+    paths = [path for path, (_, callback) in streamed.items() if callback]
+    result = None
+    for path, value in generic_agent.stream_response(prompt, paths=paths, meter=meter):
+        if path == ():
+            result = value
+            continue
+        model, callback = streamed[tuple(ANY if isinstance(step, int) else step for step in path)]
+        try:
+            callback(model.parse_obj(value))
+        except ValidationError as e:
+            # Still part of the returned itinerary; only the early hand-off is skipped
+            print(colored(f"Skipping incomplete {model.__name__} at {path}: {e}", "white", "on_grey"))
 
     return result
 
@@ -109,7 +135,7 @@ def generate_itinerary_request_from_model_with_tools(prompt, model_name="gpt-4o"
     # Create an instance of GenericAgent
     generic_agent = GenericAgent(model_name=model_name, pydantic_model=pydantic_model, tools=tools)
 
-    append_this = "  Respond with final answer using a single instance of the ItineraryRequest output format and only the ItineraryRequest format."
+    append_this = "  Look up the coordinates of all destinations in one location_coordinates call using location_descriptions. Respond with final answer using a single instance of the ItineraryRequest output format and only the ItineraryRequest format."
 
     # Append the string
     prompt += append_this
@@ -0,0 +1,241 @@
+# gazetteer.py
+
+import mmap
+import os
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+
+# Tab-separated: name, alternate names (|-separated), admin area, country code, country, latitude, longitude, population
+GAZETTEER_PATH = os.environ.get("GAZETTEER_PATH", os.path.join(os.path.dirname(__file__), "data", "gazetteer.tsv"))
+# Minimum trigram similarity (Jaccard) for a fuzzy match
+FUZZY_THRESHOLD = 0.55
+# Shortest/longest length a misspelling may have relative to the name it is matched to
+FUZZY_LENGTH_RATIO = 0.75
+
+# Common ways of writing a country or US state in a location description
+COUNTRY_ALIASES = {
+    "usa": "us", "u s a": "us", "u s": "us", "united states of america": "us", "america": "us",
+    "uk": "gb", "u k": "gb", "great britain": "gb", "britain": "gb", "england": "gb", "scotland": "gb", "wales": "gb",
+    "holland": "nl", "the netherlands": "nl", "czech republic": "cz", "uae": "ae", "korea": "kr", "deutschland": "de",
+    "espana": "es", "italia": "it", "nippon": "jp",
+}
+US_STATES = {
+    "al": "alabama", "ak": "alaska", "az": "arizona", "ar": "arkansas", "ca": "california", "co": "colorado",
+    "ct": "connecticut", "de": "delaware", "dc": "district of columbia", "fl": "florida", "ga": "georgia",
+    "hi": "hawaii", "id": "idaho", "il": "illinois", "in": "indiana", "ia": "iowa", "ks": "kansas", "ky": "kentucky",
+    "la": "louisiana", "me": "maine", "md": "maryland", "ma": "massachusetts", "mi": "michigan", "mn": "minnesota",
+    "ms": "mississippi", "mo": "missouri", "mt": "montana", "ne": "nebraska", "nv": "nevada", "nh": "new hampshire",
+    "nj": "new jersey", "nm": "new mexico", "ny": "new york", "nc": "north carolina", "nd": "north dakota",
+    "oh": "ohio", "ok": "oklahoma", "or": "oregon", "pa": "pennsylvania", "ri": "rhode island",
+    "sc": "south carolina", "sd": "south dakota", "tn": "tennessee", "tx": "texas", "ut": "utah", "vt": "vermont",
+    "va": "virginia", "wa": "washington", "wv": "west virginia", "wi": "wisconsin", "wy": "wyoming",
+}
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_name(text: str) -> str:
+    """Lowercase, strip accents and punctuation: 'Zürich' and 'zurich' normalize the same."""
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+    return _NON_WORD.sub(" ", text.lower()).strip()
+
+
+def _parts(description: Optional[str]) -> List[str]:
+    parts = [normalize_name(part) for part in (description or "").split(",")]
+    return [part for part in parts if part]
+
+
+def trigrams(name: str) -> Set[str]:
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class GazetteerEntry(NamedTuple):
+    name: str
+    admin: str
+    country_code: str
+    country: str
+    latitude: float
+    longitude: float
+    population: int
+
+    def qualifiers(self) -> Set[str]:
+        """Normalized names a description may use to narrow the match, e.g. 'france', 'fr', 'texas'."""
+        return {normalize_name(self.admin), normalize_name(self.country), self.country_code.lower()} - {""}
+
+    def as_location(self) -> Dict[str, Any]:
+        parts = [self.name] + [part for part in (self.admin, self.country) if part and part != self.name]
+        return {"location": ", ".join(dict.fromkeys(parts)), "latitude": self.latitude, "longitude": self.longitude}
+
+
+class Gazetteer:
+    """
+    Offline geocoder over the bundled city and landmark table.
+
+    The table is memory-mapped and indexed once on first use: an exact index from every
+    normalized name and alternate name to its rows, and a trigram index over those names for
+    misspellings. Rows are parsed from the mapping only when they are candidates. Trailing
+    parts of a description ("Portland, Maine", "Paris France") narrow the match to rows in
+    that admin area or country.
+
+    Example:
+        >>> from location_coordinates.gazetteer import gazetteer
+        >>> gazetteer.lookup("Kyoto, Japan")
+        {'location': 'Kyoto, Japan', 'latitude': 35.0116, 'longitude': 135.7681}
+    """
+
+    def __init__(self, path: str = GAZETTEER_PATH, fuzzy_threshold: float = FUZZY_THRESHOLD):
+        self.path = path
+        self.fuzzy_threshold = fuzzy_threshold
+        self._mmap: Optional[mmap.mmap] = None
+        self._offsets: List[int] = []
+        self._names: Dict[str, List[int]] = {}
+        self._trigrams: Dict[str, List[str]] = {}
+        self._qualifiers: Set[str] = set()
+        self._countries: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _load(self) -> None:
+        with self._lock:
+            if self._mmap is not None:
+                return
+            with open(self.path, "rb") as table:
+                mapped = mmap.mmap(table.fileno(), 0, access=mmap.ACCESS_READ)
+            names: Dict[str, List[int]] = defaultdict(list)
+            offset = 0
+            while offset < len(mapped):
+                end = mapped.find(b"\n", offset)
+                end = len(mapped) if end == -1 else end
+                line = mapped[offset:end].decode("utf-8")
+                if line.strip() and not line.startswith("#"):
+                    fields = line.split("\t")
+                    row = len(self._offsets)
+                    self._offsets.append(offset)
+                    for name in [fields[0]] + [alias for alias in fields[1].split("|") if alias]:
+                        names[normalize_name(name)].append(row)
+                    self._qualifiers.update({normalize_name(fields[2]), normalize_name(fields[4]), fields[3].lower()})
+                    self._countries[normalize_name(fields[4])] = self._countries[fields[3].lower()] = fields[3].lower()
+                offset = end + 1
+
+            index: Dict[str, List[str]] = defaultdict(list)
+            for name in names:
+                for trigram in trigrams(name):
+                    index[trigram].append(name)
+            self._names = dict(names)
+            self._trigrams = dict(index)
+            self._qualifiers.update(COUNTRY_ALIASES, US_STATES)
+            self._qualifiers.discard("")
+            self._mmap = mapped
+
+    def country_code(self, name: str) -> Optional[str]:
+        """Lowercase ISO country code for a country name, code or common alias such as 'USA' or 'UK'."""
+        self._load()
+        name = normalize_name(name)
+        return COUNTRY_ALIASES.get(name) or self._countries.get(name)
+
+    def _entry(self, row: int) -> GazetteerEntry:
+        offset = self._offsets[row]
+        end = self._mmap.find(b"\n", offset)
+        fields = self._mmap[offset:end if end != -1 else len(self._mmap)].decode("utf-8").rstrip("\r").split("\t")
+        return GazetteerEntry(fields[0], fields[2], fields[3], fields[4], float(fields[5]), float(fields[6]), int(fields[7] or 0))
+
+    def lookup(self, description: str) -> Optional[Dict[str, Any]]:
+        """Return {'location', 'latitude', 'longitude'} for a description, or None when it is not in the table."""
+        self._load()
+        parts = _parts(description)
+        if not parts:
+            return None
+
+        # "Paris, France", or "Paris France" where trailing words name a country or admin area
+        attempts = [(" ".join(parts), []), (parts[0], parts[1:])] + self._trailing_qualifiers(parts)
+        for name, qualifiers in attempts:
+            entry = self._best(self._names.get(name, []), qualifiers)
+            if entry:
+                return entry.as_location()
+        for name, qualifiers in attempts[1:]:
+            entry = self._fuzzy(name, qualifiers)
+            if entry:
+                return entry.as_location()
+        return None
+
+    def split_qualifiers(self, description: str) -> Tuple[str, List[str]]:
+        """
+        A description's name and its qualifiers, normalized: "Paris, TX" and "Paris TX" both give
+        ("paris", ["tx"]). Trailing words are only taken as a qualifier when they name a country
+        or admin area and the whole first part is not itself a known name, such as "New York".
+        """
+        self._load()
+        parts = _parts(description)
+        if not parts:
+            return "", []
+        splits = [] if parts[0] in self._names else self._trailing_qualifiers(parts)
+        # The longest qualifier, so "San Jose Costa Rica" reads like "San Jose, Costa Rica"
+        return splits[-1] if splits else (parts[0], parts[1:])
+
+    def _trailing_qualifiers(self, parts: List[str]) -> List[Tuple[str, List[str]]]:
+        """Readings of the first part as a name followed by trailing qualifier words, the shortest qualifier first."""
+        readings = []
+        words = parts[0].split()
+        for split in range(len(words) - 1, 0, -1):
+            qualifier = " ".join(words[split:])
+            if qualifier in self._qualifiers:
+                readings.append((" ".join(words[:split]), [qualifier] + parts[1:]))
+        return readings
+
+    def _best(self, rows: List[int], qualifiers: List[str]) -> Optional[GazetteerEntry]:
+        """The most populous row that satisfies every qualifier; landmarks (population 0) rank after cities."""
+        wanted = [self._expand(qualifier) for qualifier in qualifiers]
+        candidates = []
+        for row in rows:
+            entry = self._entry(row)
+            known = entry.qualifiers()
+            if all(options & known for options in wanted):
+                candidates.append(entry)
+        return max(candidates, key=lambda entry: entry.population, default=None)
+
+    def _expand(self, qualifier: str) -> Set[str]:
+        options = {qualifier}
+        if qualifier in COUNTRY_ALIASES:
+            options.add(COUNTRY_ALIASES[qualifier])
+        if qualifier in US_STATES:
+            options.add(US_STATES[qualifier])
+        return options
+
+    def _fuzzy(self, name: str, qualifiers: List[str]) -> Optional[GazetteerEntry]:
+        """
+        A single-word misspelling ('Barcelonna') of a single-word name of similar length. Anything
+        else ('Washington State', 'Kansas' against 'Kansas City') is left to the model.
+        """
+        if " " in name:
+            return None
+        query = trigrams(name)
+        shared: Dict[str, int] = defaultdict(int)
+        for trigram in query:
+            for candidate in self._trigrams.get(trigram, ()):
+                shared[candidate] += 1
+        scored = sorted(
+            ((count / (len(query) + len(trigrams(candidate)) - count), candidate) for candidate, count in shared.items()),
+            reverse=True,
+        )
+        for similarity, candidate in scored:
+            if similarity < self.fuzzy_threshold:
+                break
+            if " " in candidate or min(len(name), len(candidate)) / max(len(name), len(candidate)) < FUZZY_LENGTH_RATIO:
+                continue
+            entry = self._best(self._names[candidate], qualifiers)
+            if entry:
+                return entry
+        return None
+
+
+# Shared by every LocationCoordinatesTool in the process
+gazetteer = Gazetteer()
+
+
+# Example usage
+if __name__ == "__main__":
+    for description in ["Paris, France", "Portland, ME", "Kyoto Japan", "Barcelonna", "Eiffel Tower, Paris", "Paris, Texas"]:
+        print(description, "->", gazetteer.lookup(description))
@@ -0,0 +1,184 @@
+# geocode_cache.py
+
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from .gazetteer import US_STATES, gazetteer
+
+# SQLite file shared by every process and session; set GEOCODE_CACHE_PATH=off to disable the cache
+GEOCODE_CACHE_PATH = os.environ.get("GEOCODE_CACHE_PATH", "geocode_cache.sqlite")
+# Hit and miss counts are kept in memory and written to the file once this many have accumulated
+COUNTER_FLUSH_EVERY = 50
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS geocodes (
+    location_key TEXT PRIMARY KEY,
+    location TEXT NOT NULL,
+    latitude REAL NOT NULL,
+    longitude REAL NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def location_key(description: str) -> str:
+    """
+    Normalized cache key for a location description. Case, accents and punctuation are
+    dropped and countries are reduced to their code, so "Paris, France", "paris, FR" and
+    "PARIS, france" share one key. US state codes are expanded to the state name before
+    countries are looked up, as the gazetteer reads them, so "San Jose, CA" and
+    "San Jose, California" share one key too. Qualifiers written without a comma are split
+    off as the gazetteer splits them, so "Paris TX" shares the key of "Paris, Texas".
+    """
+    name, qualifiers = gazetteer.split_qualifiers(description)
+    if not name:
+        return ""
+    qualifiers = [US_STATES.get(qualifier) or gazetteer.country_code(qualifier) or qualifier for qualifier in qualifiers]
+    return "|".join([name] + qualifiers)
+
+
+class GeocodeCache:
+    """
+    Persistent geocode results keyed by normalized location.
+
+    Every call opens its own short-lived connection, so threads and processes can share one
+    file; WAL mode lets readers proceed while another process writes. Lookups only read:
+    hits and misses are counted in memory and added to the file's totals every
+    COUNTER_FLUSH_EVERY lookups and at exit, so they accumulate across sessions.
+
+    Example:
+        >>> from location_coordinates.geocode_cache import geocode_cache
+        >>> geocode_cache.get("Paris, FR")
+        >>> geocode_cache.stats()
+        {'hits': 12, 'misses': 3, 'entries': 3}
+    """
+
+    def __init__(self, path: str = GEOCODE_CACHE_PATH):
+        self.path = path
+        self._initialized = False
+        self._pending = {"hits": 0, "misses": 0}
+        self._lock = threading.Lock()
+        atexit.register(self.flush_counters)
+
+    @property
+    def enabled(self) -> bool:
+        return self.path.lower() not in ("", "off", "none")
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=10)
+        if not self._initialized:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+            self._initialized = True
+        return connection
+
+    def get(self, description: str) -> Optional[Dict[str, Any]]:
+        """Return the cached {'location', 'latitude', 'longitude'} for a description, counting a hit or a miss."""
+        key = location_key(description)
+        if not self.enabled or not key:
+            return None
+        connection = self._connect()
+        try:
+            row = connection.execute("SELECT location, latitude, longitude FROM geocodes WHERE location_key = ?", (key,)).fetchone()
+        finally:
+            connection.close()
+        self._count("hits" if row else "misses")
+        if row is None:
+            return None
+        return {"location": row[0], "latitude": row[1], "longitude": row[2]}
+
+    def put(self, description: str, result: Dict[str, Any]) -> None:
+        """
+        Store a geocode result under the description's key. The name the model returned is not
+        used as a key: a bare name it produced could overwrite the answer to another query.
+        Results without numeric coordinates are ignored.
+        """
+        if not self.enabled or not isinstance(result, dict):
+            return
+        try:
+            latitude, longitude = float(result["latitude"]), float(result["longitude"])
+        except (KeyError, TypeError, ValueError):
+            return
+        key = location_key(description)
+        if not key:
+            return
+        location = str(result.get("location") or description)
+        connection = self._connect()
+        try:
+            with connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO geocodes (location_key, location, latitude, longitude, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, location, latitude, longitude, time.time()),
+                )
+        finally:
+            connection.close()
+
+    def stats(self) -> Dict[str, int]:
+        """Hit and miss counts across all sessions, and the number of cached keys."""
+        if not self.enabled:
+            return {"hits": 0, "misses": 0, "entries": 0}
+        self.flush_counters()
+        connection = self._connect()
+        try:
+            counters = dict(connection.execute("SELECT name, value FROM counters").fetchall())
+            entries = connection.execute("SELECT COUNT(*) FROM geocodes").fetchone()[0]
+        finally:
+            connection.close()
+        return {"hits": counters.get("hits", 0), "misses": counters.get("misses", 0), "entries": entries}
+
+    def clear(self) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._pending = {"hits": 0, "misses": 0}
+        connection = self._connect()
+        try:
+            with connection:
+                connection.execute("DELETE FROM geocodes")
+                connection.execute("DELETE FROM counters")
+        finally:
+            connection.close()
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._pending[name] += 1
+            flush = sum(self._pending.values()) >= COUNTER_FLUSH_EVERY
+        if flush:
+            self.flush_counters()
+
+    def flush_counters(self) -> None:
+        """Add the hits and misses counted in memory to the totals in the file."""
+        with self._lock:
+            pending = {name: count for name, count in self._pending.items() if count}
+            self._pending = {"hits": 0, "misses": 0}
+        if not pending or not self.enabled:
+            return
+        connection = self._connect()
+        try:
+            with connection:
+                connection.executemany(
+                    "INSERT INTO counters (name, value) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                    list(pending.items()),
+                )
+        finally:
+            connection.close()
+
+
+# Shared by every LocationCoordinatesTool in the process
+geocode_cache = GeocodeCache()
+
+
+# Example usage
+if __name__ == "__main__":
+    geocode_cache.put("Paris, France", {"location": "Paris, France", "latitude": 48.8566, "longitude": 2.3522})
+    for description in ["Paris, France", "paris", "Paris, FR", "Lyon"]:
+        print(description, "->", geocode_cache.get(description))
+    print(geocode_cache.stats())
@@ -1,17 +1,28 @@
 # location_module.py
 
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from langchain.pydantic_v1 import BaseModel, Field
 from langchain.tools import BaseTool
-from typing import Optional, Type
+from typing import Optional, Type, List, Dict
 from langchain.callbacks.manager import (
     AsyncCallbackManagerForToolRun,
     CallbackManagerForToolRun,
 )
 from generic_agent import GenericAgent
+from termcolor import colored
+
+from .gazetteer import gazetteer
+from .geocode_cache import geocode_cache, location_key
+
+# Model geocoding calls in flight at once for one batch
+MAX_CONCURRENT_LOOKUPS = 4
+MISSING_LOCATION_ERROR = "Provide location_description or location_descriptions"
 
 class LocationQueryInput(BaseModel):
-    location_description: str = Field(description="Description of the location to find coordinates for")
+    location_description: Optional[str] = Field(default=None, description="Description of the location to find coordinates for")
+    location_descriptions: Optional[List[str]] = Field(default=None, description="Several location descriptions to resolve in one call, e.g. every destination of a trip")
 
 class LocationCoordinates(BaseModel):
     location: str = Field(description="Description of the location")
@@ -20,30 +31,105 @@ class LocationCoordinates(BaseModel):
 
 class LocationCoordinatesTool(BaseTool):
     name = "location_coordinates"
-    description = "Useful for finding the latitude and longitude of a location based on its description"
+    description = "Useful for finding the latitude and longitude of one location, or of several locations at once, based on their descriptions"
     args_schema: Type[BaseModel] = LocationQueryInput
+    # Answer from the bundled gazetteer and only ask the model for places it does not know
+    use_gazetteer: bool = True
+    max_concurrency: int = MAX_CONCURRENT_LOOKUPS
 
     def _run(
-            self, location_description: str, run_manager: Optional[CallbackManagerForToolRun] = None
+            self, location_description: Optional[str] = None, location_descriptions: Optional[List[str]] = None, run_manager: Optional[CallbackManagerForToolRun] = None
     ) -> str:
         """Use the tool."""
-        return self.query_location_coordinates(location_description)
+        descriptions = self._descriptions(location_description, location_descriptions)
+        if not descriptions:
+            return MISSING_LOCATION_ERROR
+        if location_descriptions:
+            return self.query_many_location_coordinates(descriptions)
+        return self.query_location_coordinates(descriptions[0])
 
     async def _arun(
-            self, location_description: str, run_manager: Optional[AsyncCallbackManagerForToolRun] = None
+            self, location_description: Optional[str] = None, location_descriptions: Optional[List[str]] = None, run_manager: Optional[AsyncCallbackManagerForToolRun] = None
     ) -> str:
         """Use the tool asynchronously."""
-        raise NotImplementedError("location_coordinates does not support async")
+        descriptions = self._descriptions(location_description, location_descriptions)
+        if not descriptions:
+            return MISSING_LOCATION_ERROR
+        if location_descriptions:
+            return await self.aquery_many_location_coordinates(descriptions)
+        return await self.aquery_location_coordinates(descriptions[0])
+
+    def _descriptions(self, location_description: Optional[str], location_descriptions: Optional[List[str]]) -> List[str]:
+        # Both arguments are optional, so the model may send neither, an empty list or blank strings
+        descriptions = list(location_descriptions or []) + ([location_description] if location_description else [])
+        return [description for description in descriptions if isinstance(description, str) and description.strip()]
+
+    def query_many_location_coordinates(self, location_descriptions: List[str]) -> List[Dict]:
+        """Query the coordinates for several locations, resolving each distinct location once and in parallel"""
+        unique = self._unique(location_descriptions)
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_concurrency, len(unique)))) as executor:
+            results = dict(zip(unique, executor.map(self.query_location_coordinates, unique.values())))
+        return [results[location_key(description) or description] for description in location_descriptions]
+
+    async def aquery_many_location_coordinates(self, location_descriptions: List[str]) -> List[Dict]:
+        """Query the coordinates for several locations concurrently without blocking the event loop"""
+        unique = self._unique(location_descriptions)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def resolve(description):
+            async with semaphore:
+                return await self.aquery_location_coordinates(description)
+
+        results = dict(zip(unique, await asyncio.gather(*(resolve(description) for description in unique.values()))))
+        return [results[location_key(description) or description] for description in location_descriptions]
+
+    def _unique(self, location_descriptions: List[str]) -> Dict[str, str]:
+        # Descriptions that normalize to the same key ("Paris, France" and "paris, FR") are resolved once
+        unique: Dict[str, str] = {}
+        for description in location_descriptions:
+            unique.setdefault(location_key(description) or description, description)
+        return unique
 
     def query_location_coordinates(self, location_description: str) -> str:
         """Query the coordinates for a given location description"""
+        local = self._lookup_local(location_description)
+        if local:
+            return local
 
         prompt = f"Find the coordinates for {location_description} Respond with final answer using LocationCoordinates output format and only the LocationCoordinates output format."
 
         generic_agent = GenericAgent(model_name="gpt-4o", pydantic_model=LocationCoordinates, tools=[])
 
         result = generic_agent.generate_response(prompt)
+        geocode_cache.put(location_description, result)
+
+        return result
+
+    async def aquery_location_coordinates(self, location_description: str) -> str:
+        """Query the coordinates for a given location description without blocking the event loop"""
+        local = self._lookup_local(location_description)
+        if local:
+            return local
+
+        prompt = f"Find the coordinates for {location_description} Respond with final answer using LocationCoordinates output format and only the LocationCoordinates output format."
+
+        generic_agent = GenericAgent(model_name="gpt-4o", pydantic_model=LocationCoordinates, tools=[])
+
+        result = await generic_agent.agenerate_response(prompt)
+        geocode_cache.put(location_description, result)
+
+        return result
 
+    def _lookup_local(self, location_description: str) -> Optional[dict]:
+        """Resolve from the gazetteer, then from places the model geocoded in earlier sessions"""
+        if self.use_gazetteer:
+            result = gazetteer.lookup(location_description)
+            if result:
+                print(colored(f"Found coordinates for '{location_description}' in the gazetteer: {result['location']}", "white", "on_grey"))
+                return result
+        result = geocode_cache.get(location_description)
+        if result:
+            print(colored(f"Found coordinates for '{location_description}' in the geocode cache: {result['location']}", "white", "on_grey"))
         return result
 
 # Example usage
@@ -0,0 +1,21 @@
+# support.py
+
+import importlib
+import sys
+import types
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def load_module(dotted_name: str) -> types.ModuleType:
+    """
+    Import a module of one of the repo's packages without running the package's __init__,
+    which pulls in langchain and the API clients. Only the module's own imports are needed.
+    """
+    package, _, _ = dotted_name.rpartition(".")
+    if package not in sys.modules:
+        stub = types.ModuleType(package)
+        stub.__path__ = [str(ROOT / package)]
+        sys.modules[package] = stub
+    return importlib.import_module(dotted_name)
@@ -0,0 +1,93 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from support import load_module
+
+event_cache = load_module("events_package.event_cache")
+
+START = datetime(2024, 6, 1)
+END = datetime(2024, 6, 30, 23, 59)
+
+
+def event(name, date="2024-06-10", time="20:00", venue="Arena", genre="Rock", event_id=""):
+    return SimpleNamespace(event_id=event_id, name=name, date=date, time=time, venue=venue, genre=genre)
+
+
+def test_event_key_falls_back_to_name_date_time_and_venue():
+    assert event_cache.event_key(event("Show", event_id="abc")) == "abc"
+    assert event_cache.event_key(event("Show")) == ("Show", "2024-06-10", "20:00", "Arena")
+
+
+def test_id_less_events_are_kept_apart_and_indexed():
+    window = event_cache.EventWindow("paris", START, END, complete=True)
+    first_page = [event("Jazz Night"), event("Rock Show", date="2024-06-12")]
+    second_page = [event("Jazz Night"), event("Jazz Brunch", time="11:00", genre="Jazz")]
+    window.add(first_page)
+    window.add(second_page)
+
+    assert len(window) == 3
+    assert [found.name for found in window.search("jazz", START, END)] == ["Jazz Brunch", "Jazz Night"]
+    assert [found.name for found in window.search("rock", START, END)] == ["Jazz Night", "Rock Show"]
+
+
+def test_search_prefers_events_matching_every_word():
+    window = event_cache.EventWindow("paris", START, END, complete=True)
+    window.add([event("Jazz Night", event_id="1", date="2024-06-09"), event("Jazz Festival", event_id="2", venue="Blue Note")])
+
+    assert [found.event_id for found in window.search("jazz blue", START, END)] == ["2"]
+    assert [found.event_id for found in window.search("jazz opera", START, END)] == ["1", "2"]
+    assert window.search("opera", START, END) == []
+
+
+def test_search_is_limited_to_the_requested_dates():
+    window = event_cache.EventWindow("paris", START, END, complete=True)
+    window.add([event("Early", event_id="1", date="2024-06-02"), event("Late", event_id="2", date="2024-06-28")])
+
+    assert [found.name for found in window.search("", datetime(2024, 6, 20), END)] == ["Late"]
+
+
+def test_accented_words_match_plain_ones():
+    window = event_cache.EventWindow("paris", START, END, complete=True)
+    window.add([event("Café Concert", event_id="1")])
+
+    assert len(window.search("cafe", START, END)) == 1
+
+
+def test_cache_lookup_needs_a_covering_unexpired_window():
+    cache = event_cache.EventCache(ttl_seconds=60)
+    cache.store("Paris", START, END, [event("Show", event_id="1")], complete=True)
+
+    assert cache.lookup("paris", datetime(2024, 6, 5), datetime(2024, 6, 20)) is not None
+    assert cache.lookup("Paris", datetime(2024, 5, 30), END) is None
+    assert cache.lookup("Lyon", START, END) is None
+
+    cache.ttl_seconds = 0
+    assert cache.lookup("Paris", START, END) is None
+
+
+def test_cache_keeps_at_most_max_windows():
+    cache = event_cache.EventCache(max_windows=1)
+    cache.store("Paris", START, END, [], complete=True)
+    cache.store("Lyon", START, END, [], complete=True)
+
+    assert cache.lookup("Paris", START, END) is None
+    assert cache.lookup("Lyon", START, END) is not None
+
+
+def test_merging_pages_keeps_distinct_id_less_events():
+    pytest.importorskip("langchain")
+    ticketmaster = load_module("events_package.ticketmaster")
+
+    def summary(name, event_id=""):
+        return ticketmaster.EventSummary(
+            event_id=event_id, name=name, date="2024-06-10", time="20:00", venue="Arena",
+            url="", min_price=None, currency="", image_url="", genre="Rock",
+        )
+
+    pages = [([summary("Jazz Night"), summary("Rock Show", "1")], 3), ([summary("Jazz Night"), summary("Jazz Brunch")], 3)]
+    events, total = ticketmaster.TicketmasterEventsTool._merge_results(None, pages)
+
+    assert [found.name for found in events] == ["Jazz Night", "Rock Show", "Jazz Brunch"]
+    assert total == 3
@@ -0,0 +1,43 @@
+import pytest
+
+from support import load_module
+
+gazetteer = load_module("location_coordinates.gazetteer")
+geocode_cache = load_module("location_coordinates.geocode_cache")
+
+
+@pytest.mark.parametrize("description, same_as", [
+    ("Paris, France", "paris, FR"),
+    ("PARIS, france", "Paris France"),
+    ("Paris TX", "Paris, Texas"),
+    ("Kyoto Japan", "Kyoto, JP"),
+    ("San Jose, CA", "San Jose California"),
+    ("Zürich, Switzerland", "zurich, ch"),
+])
+def test_equivalent_descriptions_share_a_key(description, same_as):
+    assert geocode_cache.location_key(description) == geocode_cache.location_key(same_as)
+
+
+def test_different_places_get_different_keys():
+    assert geocode_cache.location_key("Paris TX") != geocode_cache.location_key("Paris")
+    assert geocode_cache.location_key("Paris, France") != geocode_cache.location_key("Paris, Texas")
+
+
+def test_known_names_are_not_split():
+    assert gazetteer.gazetteer.split_qualifiers("New York") == ("new york", [])
+    assert gazetteer.gazetteer.split_qualifiers("Kyoto Japan") == ("kyoto", ["japan"])
+    assert gazetteer.gazetteer.split_qualifiers(" , ") == ("", [])
+
+
+def test_blank_descriptions_have_no_key():
+    assert geocode_cache.location_key("") == ""
+    assert geocode_cache.location_key(None) == ""
+
+
+def test_cache_counts_hits_and_misses(tmp_path):
+    cache = geocode_cache.GeocodeCache(str(tmp_path / "geocode_cache.sqlite"))
+    cache.put("Paris, France", {"location": "Paris, France", "latitude": 48.8566, "longitude": 2.3522})
+
+    assert cache.get("paris fr")["latitude"] == 48.8566
+    assert cache.get("Lyon, France") is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "entries": 1}
@@ -0,0 +1,62 @@
+from datetime import datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from support import load_module
+
+intervals = load_module("calendar_package.intervals")
+
+UTC = timezone.utc
+NEW_YORK = ZoneInfo("America/New_York")
+
+
+def at(day, hour, minute=0, tz=UTC):
+    return datetime(2024, 6, day, hour, minute, tzinfo=tz)
+
+
+def test_parse_busy_drops_empty_and_inverted_blocks():
+    busy = intervals.parse_busy([
+        {"start": "2024-06-01T09:00:00Z", "end": "2024-06-01T10:00:00Z"},
+        {"start": "2024-06-01T11:00:00Z", "end": "2024-06-01T11:00:00Z"},
+        {"start": "2024-06-01T13:00:00Z", "end": "2024-06-01T12:00:00Z"},
+    ])
+
+    assert busy == [(at(1, 9), at(1, 10))]
+
+
+def test_merge_joins_overlapping_and_touching_intervals_across_calendars():
+    first = [(at(1, 9), at(1, 10)), (at(1, 14), at(1, 15))]
+    second = [(at(1, 9, 30), at(1, 11)), (at(1, 11), at(1, 12)), (at(1, 14, 15), at(1, 14, 45))]
+
+    assert intervals.merge_intervals(first, second) == [(at(1, 9), at(1, 12)), (at(1, 14), at(1, 15))]
+
+
+def test_free_windows_are_the_gaps_inside_the_window():
+    busy = [(at(1, 7), at(1, 9)), (at(1, 12), at(1, 13)), (at(1, 17), at(1, 19))]
+
+    assert intervals.free_windows(busy, at(1, 8), at(1, 18)) == [(at(1, 9), at(1, 12)), (at(1, 13), at(1, 17))]
+    assert intervals.free_windows(busy, at(1, 8), at(1, 18), min_duration=timedelta(hours=4)) == [(at(1, 13), at(1, 17))]
+
+
+def test_working_hours_follow_daylight_saving_time():
+    # Clocks in New York go forward on 10 March 2024: 9:00 is 14:00 UTC before and 13:00 UTC after
+    start = datetime(2024, 3, 9, tzinfo=NEW_YORK)
+    end = datetime(2024, 3, 11, tzinfo=NEW_YORK)
+
+    windows = intervals.free_windows([], start, end, working_hours=(time(9), time(17)))
+
+    assert [(window_start.astimezone(UTC).hour, window_end.astimezone(UTC).hour) for window_start, window_end in windows] == [(14, 22), (13, 21)]
+    assert all(window_end - window_start == timedelta(hours=8) for window_start, window_end in windows)
+
+
+def test_working_hours_can_be_in_another_timezone():
+    windows = intervals.free_windows([], at(1, 0), at(2, 0), working_hours=(time(9), time(17)), tz=NEW_YORK)
+
+    assert windows == [(at(1, 13), at(1, 21))]
+
+
+def test_overnight_working_hours_include_the_shift_from_the_previous_evening():
+    busy = [(at(1, 23), at(2, 1))]
+
+    windows = intervals.free_windows(busy, at(1, 0), at(2, 12), working_hours=(time(22), time(6)))
+
+    assert windows == [(at(1, 0), at(1, 6)), (at(1, 22), at(1, 23)), (at(2, 1), at(2, 6))]
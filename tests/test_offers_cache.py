@@ -0,0 +1,124 @@
+import asyncio
+import threading
+
+import pytest
+
+from support import load_module
+
+offers_cache = load_module("hotel_finder.offers_cache")
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(offers_cache.time, "monotonic", clock)
+    return clock
+
+
+class Fetcher:
+    def __init__(self, *values):
+        self.values = list(values)
+        self.calls = 0
+        self.done = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        value = self.values[min(self.calls, len(self.values)) - 1]
+        self.done.set()
+        return value
+
+
+def cached(value):
+    return not isinstance(value, str)
+
+
+def test_equivalent_searches_share_a_key():
+    assert offers_cache.offers_cache_key(["parlo", " PARMD "], "2024-06-01", "2024-06-05T00:00:00", "2") == \
+        offers_cache.offers_cache_key(["PARMD", "PARLO", "parlo"], "2024-06-01", "2024-06-05", 2)
+
+
+def test_fresh_entries_are_served_without_fetching(clock):
+    cache = offers_cache.OffersCache(ttl_seconds=60, stale_seconds=60)
+    fetch = Fetcher(["offer"])
+
+    assert cache.get_or_fetch("key", fetch, cached) == ["offer"]
+    clock.now += 60
+    assert cache.get_or_fetch("key", fetch, cached) == ["offer"]
+    assert fetch.calls == 1
+
+
+def test_stale_entries_are_served_while_one_refresh_runs(clock):
+    cache = offers_cache.OffersCache(ttl_seconds=60, stale_seconds=60)
+    cache.put("key", ["old"])
+    clock.now += 90
+    release = threading.Event()
+    fetch = Fetcher(["new"])
+
+    def slow_fetch():
+        release.wait(5)
+        return fetch()
+
+    assert cache.get_or_fetch("key", slow_fetch, cached) == ["old"]
+    # A refresh is already running, so this one is not started
+    assert cache.get_or_fetch("key", slow_fetch, cached) == ["old"]
+    release.set()
+    assert fetch.done.wait(5)
+    for _ in range(100):
+        if not cache._refreshing:
+            break
+        threading.Event().wait(0.01)
+
+    assert fetch.calls == 1
+    assert cache.get_or_fetch("key", Fetcher(["unused"]), cached) == ["new"]
+
+
+def test_entries_past_the_stale_window_are_fetched_again(clock):
+    cache = offers_cache.OffersCache(ttl_seconds=60, stale_seconds=60)
+    cache.put("key", ["old"])
+    clock.now += 121
+
+    assert cache.get_or_fetch("key", Fetcher(["new"]), cached) == ["new"]
+
+
+def test_failures_are_not_cached(clock):
+    cache = offers_cache.OffersCache()
+    fetch = Fetcher("Failed to retrieve data: 500", ["offer"])
+
+    assert cache.get_or_fetch("key", fetch, cached) == "Failed to retrieve data: 500"
+    assert cache.get_or_fetch("key", fetch, cached) == ["offer"]
+    assert fetch.calls == 2
+
+
+def test_least_recently_used_entries_are_dropped(clock):
+    cache = offers_cache.OffersCache(max_entries=2)
+    cache.put("a", [1])
+    cache.put("b", [2])
+    cache.get_or_fetch("a", Fetcher(["unused"]), cached)
+    cache.put("c", [3])
+
+    assert cache.get_or_fetch("a", Fetcher(["unused"]), cached) == [1]
+    assert cache.get_or_fetch("b", Fetcher(["refetched"]), cached) == ["refetched"]
+
+
+def test_async_stale_entries_refresh_in_the_background(clock):
+    cache = offers_cache.OffersCache(ttl_seconds=60, stale_seconds=60)
+    cache.put("key", ["old"])
+    clock.now += 90
+
+    async def fetch():
+        return ["new"]
+
+    async def run():
+        stale = await cache.aget_or_fetch("key", fetch, cached)
+        await asyncio.gather(*cache._tasks)
+        return stale, await cache.aget_or_fetch("key", fetch, cached)
+
+    assert asyncio.run(run()) == (["old"], ["new"])
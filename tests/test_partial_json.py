@@ -0,0 +1,70 @@
+import json
+
+import pytest
+
+from support import load_module
+
+partial_json = load_module("generic_agent.partial_json")
+
+DOCUMENT = json.dumps({
+    "title": "A {tricky} \"trip\" [1]",
+    "destinations": [
+        {"location": "Paris", "note": "say \"bonjour\" \\ {not a brace}", "activities": [{"name": "Louvre"}]},
+        {"location": "Zürich é", "activities": []},
+    ],
+})
+
+
+def scan(document, paths, chunk_size):
+    found = []
+    parser = partial_json.PartialJSONParser(paths, lambda path, value: found.append((path, value)))
+    for position in range(0, len(document), chunk_size):
+        parser.feed(document[position:position + chunk_size])
+    return parser, found
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, len(DOCUMENT)])
+def test_values_are_reported_however_the_document_is_split(chunk_size):
+    _, found = scan(DOCUMENT, [("destinations", partial_json.ANY)], chunk_size)
+
+    assert found == [(("destinations", index), destination) for index, destination in enumerate(json.loads(DOCUMENT)["destinations"])]
+
+
+def test_escaped_quotes_and_brackets_inside_strings_are_not_structure():
+    _, found = scan(DOCUMENT, [("destinations", 0, "activities", partial_json.ANY), ()], 1)
+
+    assert found[0] == (("destinations", 0, "activities", 0), {"name": "Louvre"})
+    assert found[-1] == ((), json.loads(DOCUMENT))
+
+
+def test_unicode_escapes_are_decoded():
+    document = json.dumps({"destinations": [{"location": "Zürich"}]}, ensure_ascii=True)
+    _, found = scan(document, [("destinations", 0)], 4)
+
+    assert found == [(("destinations", 0), {"location": "Zürich"})]
+
+
+def test_values_are_reported_as_soon_as_they_close():
+    found = []
+    parser = partial_json.PartialJSONParser([("destinations", partial_json.ANY)], lambda path, value: found.append(value))
+    parser.feed('{"destinations": [{"location": "Par')
+    assert found == []
+    parser.feed('is"}, {"location"')
+    assert found == [{"location": "Paris"}]
+
+
+def test_malformed_documents_stop_reporting():
+    parser, found = scan('{"destinations": [{"location": "Paris"]}', [("destinations", partial_json.ANY)], 1)
+
+    assert parser.failed
+    assert found == []
+
+
+def test_errors_raised_by_the_callback_reach_the_caller():
+    def on_value(path, value):
+        raise RuntimeError("stop")
+
+    parser = partial_json.PartialJSONParser([("destinations", partial_json.ANY)], on_value)
+    with pytest.raises(RuntimeError):
+        parser.feed('{"destinations": [{"location": "Paris"}')
+    assert not parser.failed
@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+from support import load_module
+
+rate_limiter = load_module("http_client.rate_limiter")
+
+
+class Clock:
+    """Stands in for time.time and time.sleep: sleeping advances the clock."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limiter.time, "time", clock.time)
+    monkeypatch.setattr(rate_limiter.time, "sleep", clock.sleep)
+    return clock
+
+
+def test_a_full_bucket_serves_a_burst_without_waiting(clock):
+    bucket = rate_limiter.TokenBucket(rate=5, capacity=3)
+
+    assert [bucket.acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert clock.sleeps == []
+
+
+def test_callers_past_the_burst_are_queued_at_the_rate(clock):
+    bucket = rate_limiter.TokenBucket(rate=5, capacity=1)
+    bucket.acquire()
+
+    # Each wait covers one token at 5 per second
+    assert bucket.acquire() == pytest.approx(0.2)
+    assert bucket.acquire() == pytest.approx(0.2)
+    assert clock.now == pytest.approx(1000.4)
+
+
+def test_concurrent_reservations_queue_behind_each_other(clock):
+    bucket = rate_limiter.TokenBucket(rate=10, capacity=1)
+
+    assert [bucket._reserve(1) for _ in range(3)] == [0.0, pytest.approx(0.1), pytest.approx(0.2)]
+
+
+def test_the_balance_refills_up_to_capacity(clock):
+    bucket = rate_limiter.TokenBucket(rate=2, capacity=2)
+    bucket.acquire(2)
+    clock.now += 60
+
+    assert bucket.acquire(2) == 0.0
+    assert bucket.acquire() == pytest.approx(0.5)
+
+
+def test_async_acquire_waits_without_blocking(clock, monkeypatch):
+    waits = []
+
+    async def fake_sleep(seconds):
+        waits.append(seconds)
+
+    monkeypatch.setattr(rate_limiter.asyncio, "sleep", fake_sleep)
+    bucket = rate_limiter.TokenBucket(rate=4, capacity=1)
+
+    async def acquire_twice():
+        return [await bucket.aacquire(), await bucket.aacquire()]
+
+    assert asyncio.run(acquire_twice()) == [0.0, pytest.approx(0.25)]
+    assert waits == [pytest.approx(0.25)]
+    assert clock.sleeps == []
+
+
+@pytest.mark.skipif(rate_limiter.fcntl is None, reason="shared budgets need fcntl")
+def test_buckets_sharing_a_state_file_share_the_budget(clock, tmp_path):
+    state_file = str(tmp_path / "amadeus.bucket")
+    first = rate_limiter.TokenBucket(rate=1, capacity=1, state_file=state_file)
+    second = rate_limiter.TokenBucket(rate=1, capacity=1, state_file=state_file)
+
+    assert first._reserve(1) == 0.0
+    assert second._reserve(1) == pytest.approx(1.0)
+
+
+def test_rate_must_be_positive():
+    with pytest.raises(ValueError):
+        rate_limiter.TokenBucket(rate=0)
+
+
+def test_retry_after_prefers_the_header():
+    assert rate_limiter.retry_after_seconds({"Retry-After": "3"}, attempt=0) == 3.0
+    assert rate_limiter.retry_after_seconds({}, attempt=2) == 2.0
+    assert rate_limiter.retry_after_seconds({"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"}, attempt=10) == 8.0
+
+
+def test_limiters_are_chosen_by_host():
+    assert rate_limiter.rate_limiter_for_url("https://test.api.amadeus.com/v3/shopping/hotel-offers") is rate_limiter.get_rate_limiter("amadeus")
+    assert rate_limiter.rate_limiter_for_url("https://example.com/") is None
@@ -0,0 +1,63 @@
+import sqlite3
+
+from support import load_module
+
+response_cache = load_module("generic_agent.response_cache")
+
+
+def make_cache(tmp_path, **kwargs):
+    return response_cache.ResponseCache(str(tmp_path / "llm_cache.sqlite"), **kwargs)
+
+
+def test_stored_responses_are_returned_until_they_expire(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put("key", "gpt-4o", '{"content": "hi"}')
+
+    assert cache.get("key") == '{"content": "hi"}'
+    assert cache.get("other") is None
+
+    cache.max_age_seconds = -1
+    assert cache.get("key") is None
+    assert cache.evict() == 1
+
+
+def test_lookups_do_not_write_until_flushed(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put("key", "gpt-4o", "response")
+    cache.get("key")
+    cache.get("missing")
+
+    with sqlite3.connect(cache.path) as connection:
+        assert connection.execute("SELECT COUNT(*) FROM counters").fetchone()[0] == 0
+
+    assert cache.stats() == {"hits": 1, "misses": 1, "entries": 1, "bytes": len("response")}
+
+
+def test_counts_are_flushed_every_counter_flush_every_lookups(tmp_path):
+    cache = make_cache(tmp_path)
+    for _ in range(response_cache.COUNTER_FLUSH_EVERY):
+        cache.get("missing")
+
+    with sqlite3.connect(cache.path) as connection:
+        assert connection.execute("SELECT value FROM counters WHERE name = 'misses'").fetchone()[0] == response_cache.COUNTER_FLUSH_EVERY
+
+
+def test_eviction_keeps_the_most_recently_used_entries(tmp_path):
+    cache = make_cache(tmp_path, max_bytes=10)
+    cache.put("old", "gpt-4o", "aaaaaa")
+    cache.put("new", "gpt-4o", "bbbbbb")
+    # Reading the older entry makes it the most recently used
+    cache.get("old")
+
+    assert cache.evict() == 1
+    assert cache.get("old") == "aaaaaa"
+    assert cache.get("new") is None
+
+
+def test_response_key_depends_on_model_messages_and_schemas():
+    messages = [{"role": "user", "content": "Plan a trip"}]
+    key = response_cache.response_key("gpt-4o", messages, "schemas")
+
+    assert key == response_cache.response_key("gpt-4o", [dict(message) for message in messages], "schemas")
+    assert key != response_cache.response_key("gpt-4o-mini", messages, "schemas")
+    assert key != response_cache.response_key("gpt-4o", messages, "other schemas")
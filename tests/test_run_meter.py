@@ -0,0 +1,85 @@
+from types import SimpleNamespace
+
+from support import load_module
+
+run_meter = load_module("generic_agent.run_meter")
+
+
+def message(prompt_tokens, completion_tokens):
+    return SimpleNamespace(usage_metadata={"input_tokens": prompt_tokens, "output_tokens": completion_tokens})
+
+
+def test_turns_tokens_and_tools_are_totalled():
+    meter = run_meter.RunMeter(model_name="gpt-4o")
+    meter.start()
+    meter.record_turn(message(1000, 100), 0.5, ["geocode"])
+    meter.record_tool("geocode", 0.25)
+    meter.record_turn(message(2000, 200), 0.5, [])
+
+    summary = meter.summary()
+    assert (summary["turns"], summary["prompt_tokens"], summary["completion_tokens"]) == (2, 3000, 300)
+    assert summary["cost_usd"] == (3000 * 2.50 + 300 * 10.00) / 1_000_000
+    assert summary["tool_seconds"] == {"geocode": 0.25}
+
+
+def test_responses_without_usage_count_no_tokens():
+    assert run_meter.token_usage(SimpleNamespace(response_metadata={})) == {"prompt_tokens": 0, "completion_tokens": 0}
+    assert run_meter.token_cost("unknown-model", 1000, 1000) is None
+
+
+def test_budget_limits_are_reported():
+    meter = run_meter.RunMeter(run_meter.Budget(max_turns=2, max_tokens=5000))
+    meter.start()
+    meter.record_turn(message(1000, 0), 0.1, [])
+    assert meter.exceeded() is None
+    meter.record_turn(message(1000, 0), 0.1, [])
+    assert meter.exceeded() == "max_turns (2) reached"
+
+    meter = run_meter.RunMeter(run_meter.Budget(max_turns=None, max_tokens=5000))
+    meter.start()
+    meter.record_turn(message(4000, 1000), 0.1, [])
+    assert meter.exceeded() == "max_tokens (5000) reached"
+
+
+def test_start_begins_a_fresh_run():
+    meter = run_meter.RunMeter()
+    meter.start()
+    meter.record_turn(message(10, 1), 0.1, [])
+    run_id = meter.run_id
+    meter.start()
+
+    assert meter.steps == [] and meter.run_id != run_id
+
+
+def test_nested_runs_add_to_their_parent_without_using_its_turns():
+    parent = run_meter.RunMeter(run_meter.Budget(max_turns=2, max_tokens=5000))
+    parent.start()
+    parent.record_turn(message(1000, 100), 0.1, ["location"])
+    nested = run_meter.RunMeter(parent=parent)
+    nested.start()
+    nested.record_turn(message(500, 50), 0.1, [])
+    nested.record_tool("search", 0.2)
+
+    assert parent.turns == 1 and nested.turns == 1
+    assert parent.prompt_tokens == 1500 and parent.completion_tokens == 150
+    assert [call["nested"] for call in parent.tool_calls] == [True]
+    assert parent.exceeded() is None
+
+    # The parent's budget stops the nested run too
+    nested.record_turn(message(3500, 0), 0.1, [])
+    assert nested.exceeded() == "max_tokens (5000) reached"
+
+
+def test_only_the_outermost_meter_is_logged(tmp_path, monkeypatch):
+    log = tmp_path / "runs.jsonl"
+    monkeypatch.setattr(run_meter, "RUN_METER_LOG", str(log))
+    parent = run_meter.RunMeter()
+    parent.start()
+    nested = run_meter.RunMeter(parent=parent)
+    nested.start()
+    nested.record_turn(message(10, 1), 0.1, [])
+    nested.finish()
+    assert not log.exists()
+
+    parent.finish()
+    assert log.read_text().count('"type": "run"') == 1